@@ -0,0 +1,458 @@
+# time every algorithm on synthetic graphs of increasing size, record peak memory, and
+# write the results as json so runs from different versions can be compared
+#
+#     python benchmark.py --sizes 1e3,1e4,1e5 --output results.json
+#     python benchmark.py --sizes 1e3,1e4,1e5 --compare results.json
+#     python benchmark.py --sizes 1e3,1e4,1e5 --memory --compare results.json
+
+
+import argparse
+import gc
+import json
+import multiprocessing
+import platform
+import random
+import resource
+import sys
+import threading
+import time
+
+from coloring import color_graph_greedy_d, color_graph_greedy, color_graph_greedy_constant_space
+from weighted_directed_acyclic_graph import TopologicalOrderDfs, topological_order_kahns, shortest_path as topological_shortest_path
+from weighted_directed_cyclic_graph import shortest_path_djikstras, shortest_path_djikstras_priority_queue
+from unweighted_undirected_cyclic_graph import shortest_path_bfs
+from graph_generators import generators, build_weighted_directed_graph, build_unweighted_undirected_graph, build_unweighted_undirected_colored_graph
+
+
+# each benchmark takes the graphs built for one generator and size, and a list of
+# (start node, target node) queries, and runs the algorithm once. benchmarks of classes
+# return the instance
+
+def run_shortest_path_bfs(graphs, queries):
+    for start_node, target_node in queries:
+        shortest_path_bfs(graphs['unweighted_undirected'], start_node, target_node)
+
+def run_shortest_path_djikstras(graphs, queries):
+    for start_node, target_node in queries:
+        shortest_path_djikstras(graphs['weighted_directed'], start_node, target_node)
+
+def run_shortest_path_djikstras_priority_queue(graphs, queries):
+    for start_node, target_node in queries:
+        shortest_path_djikstras_priority_queue(graphs['weighted_directed'], start_node, target_node)
+
+# returns the instance, so the memory profiler can see what it keeps after ordering
+
+def run_topological_order_dfs(graphs, queries):
+    topological_order_dfs = TopologicalOrderDfs(graphs['weighted_directed'])
+    topological_order_dfs.order_graph()
+    return topological_order_dfs
+
+def run_topological_order_kahns(graphs, queries):
+    topological_order_kahns(graphs['weighted_directed'])
+
+def run_topological_shortest_path(graphs, queries):
+    topologically_ordered_nodes = topological_order_kahns(graphs['weighted_directed'])
+    for start_node, target_node in queries:
+        topological_shortest_path(graphs['weighted_directed'], topologically_ordered_nodes, start_node, target_node)
+
+def coloring_benchmark(coloring_algorithm):
+
+    def run_coloring_algorithm(graphs, queries):
+        graph = graphs['unweighted_undirected_colored']
+        for node in graph:
+            node.color = None
+
+        d = max([len(node.neighbors) for node in graph] or [0])
+        coloring_algorithm(graph, range(1, d + 2))
+
+    return run_coloring_algorithm
+
+
+# (name, benchmark, generators it runs on (None means all), largest number of nodes)
+#
+# the brute force coloring is exponential so it isn't benchmarked, and the O(N^2)
+# algorithms stop at a smaller size than the rest
+
+acyclic_generators = ['layered_dag']
+
+benchmarks = [
+    ('shortest_path_bfs',                      run_shortest_path_bfs,                      None,               None),
+    ('shortest_path_djikstras',                run_shortest_path_djikstras,                None,               10 ** 4),
+    ('shortest_path_djikstras_priority_queue', run_shortest_path_djikstras_priority_queue, None,               None),
+    ('TopologicalOrderDfs',                    run_topological_order_dfs,                  acyclic_generators, None),
+    ('topological_order_kahns',                run_topological_order_kahns,                acyclic_generators, None),
+    ('shortest_path',                          run_topological_shortest_path,              acyclic_generators, None),
+    ('color_graph_greedy_d',                   coloring_benchmark(color_graph_greedy_d),   None,               None),
+    ('color_graph_greedy',                     coloring_benchmark(color_graph_greedy),     None,               None),
+    ('color_graph_greedy_constant_space',      coloring_benchmark(color_graph_greedy_constant_space), None,    10 ** 5),
+]
+
+
+# peak memory
+#
+# every run happens in a forked child process, so the peak resident set size the child
+# reports only covers the graphs it inherited and the memory the algorithm used, not
+# earlier runs. ru_maxrss is in kilobytes on linux and bytes on mac
+
+def peak_memory_kb():
+    peak_memory = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    if sys.platform == 'darwin':
+        peak_memory //= 1024
+    return peak_memory
+
+
+# memory profiling
+#
+# with --memory, every run also measures the memory the algorithm itself allocates, in
+# its own forked child before the timed runs, so the profiler doesn't slow down the timed
+# runs and the timed runs don't leave freed memory behind for the profiled one to reuse.
+# tracemalloc (python 3.4) traces every allocation, so it gives the exact peak bytes and
+# how many allocations are still alive when the algorithm returns (memory it leaks or
+# keeps on an instance).
+#
+# without tracemalloc (python 2) we sample the resident set size on a thread instead,
+# which only sees memory the allocator got from the operating system, in pages, and
+# misses spikes shorter than the sampling interval. python 2 can't count allocations
+# either, so we count the objects the garbage collector tracks (lists, dictionaries,
+# instances, but not ints or strings) that are still alive when the algorithm returns.
+# the first run of an algorithm also fills python's type caches, so the objects are
+# counted on a second run, after the peak is sampled on the first
+#
+# benchmarks that return an instance (like TopologicalOrderDfs) also report the bytes the
+# instance still holds, not counting the graph it was given. sys.getsizeof gives each
+# attribute's size without the objects inside it, which are the graph's labels
+#
+# peak bytes per node is what the threshold check compares, so a change that makes an
+# algorithm hold more per node (like duplicate heap entries) fails at every size. sampled
+# peaks move by whole pages and allocator arenas from run to run, so they're only
+# compared when both runs peaked above min_peak_bytes. kept bytes per node comes from
+# sys.getsizeof, which doesn't change between runs, so it's always compared
+
+try:
+    import tracemalloc
+except ImportError:
+    tracemalloc = None
+
+
+def resident_memory_bytes():
+    try:
+        with open('/proc/self/statm') as statm:
+            return int(statm.read().split()[1]) * resource.getpagesize()
+    except IOError:
+        return peak_memory_kb() * 1024
+
+
+class MemorySampler(threading.Thread):
+
+    def __init__(self, interval=0.001):
+        threading.Thread.__init__(self)
+        self.daemon = True
+        self.interval = interval
+        self.peak_bytes = resident_memory_bytes()
+        self.stopped = threading.Event()
+
+    def run(self):
+        while not self.stopped.is_set():
+            self.peak_bytes = max(self.peak_bytes, resident_memory_bytes())
+            time.sleep(self.interval)
+
+    def stop(self):
+        self.stopped.set()
+        self.join()
+        self.peak_bytes = max(self.peak_bytes, resident_memory_bytes())
+
+
+# the bytes an instance's attributes hold, leaving out the graphs it was given
+
+def kept_bytes(instance, graphs):
+
+    if instance is None:
+        return 0
+
+    graph_ids = set(id(graph) for graph in graphs.itervalues())
+
+    return sys.getsizeof(instance) + sum(
+        sys.getsizeof(value) for value in vars(instance).itervalues() if id(value) not in graph_ids
+    )
+
+
+def measure_memory(benchmark, graphs, queries):
+
+    gc.collect()
+
+    if tracemalloc:
+        tracemalloc.start()
+        instance = benchmark(graphs, queries)
+
+        current_bytes, peak_bytes = tracemalloc.get_traced_memory()
+        retained_allocations = sum(statistic.count for statistic in tracemalloc.take_snapshot().statistics('filename'))
+        tracemalloc.stop()
+
+        return {
+            'memory_profiler':      'tracemalloc',
+            'peak_bytes':           peak_bytes,
+            'retained_bytes':       current_bytes,
+            'retained_allocations': retained_allocations,
+            'kept_bytes':           kept_bytes(instance, graphs),
+        }
+
+    # start the sampler first, so its own stack isn't counted
+    sampler = MemorySampler()
+    sampler.start()
+    time.sleep(sampler.interval)
+
+    gc.collect()
+    baseline_bytes = resident_memory_bytes()
+
+    benchmark(graphs, queries)
+    sampler.stop()
+
+    gc.collect()
+    retained_bytes = max(resident_memory_bytes() - baseline_bytes, 0)
+
+    # the second run, with the type caches already filled
+    baseline_objects = len(gc.get_objects())
+    instance = benchmark(graphs, queries)
+    gc.collect()
+    retained_objects = len(gc.get_objects()) - baseline_objects
+
+    return {
+        'memory_profiler':  'rss',
+        'peak_bytes':       max(sampler.peak_bytes - baseline_bytes, 0),
+        'retained_bytes':   retained_bytes,
+        'retained_objects': retained_objects,
+        'kept_bytes':       kept_bytes(instance, graphs),
+    }
+
+
+# run measure() in a forked child, and return the dictionary it returns
+
+def run_in_forked_child(measure):
+
+    def send_measurement(connection):
+        try:
+            connection.send(measure())
+        except Exception as e:
+            connection.send({'error': '%s: %s' % (type(e).__name__, e)})
+        connection.close()
+
+    parent_connection, child_connection = multiprocessing.Pipe(duplex=False)
+    process = multiprocessing.Process(target=send_measurement, args=(child_connection,))
+    process.start()
+    child_connection.close()
+
+    try:
+        result = parent_connection.recv()
+    except EOFError:
+        result = {'error': 'Process exited with code %s' % process.exitcode}
+
+    process.join()
+    return result
+
+
+def run_in_child_process(benchmark, graphs, queries, repeat, memory=False):
+
+    def measure_time():
+        times = []
+        for _ in xrange(repeat):
+            start_time = time.time()
+            benchmark(graphs, queries)
+            times.append(time.time() - start_time)
+
+        return {'seconds': min(times), 'peak_memory_kb': peak_memory_kb()}
+
+    result = {}
+
+    # the memory run goes first, in a child that hasn't run the algorithm yet
+    if memory:
+        result.update(run_in_forked_child(lambda: measure_memory(benchmark, graphs, queries)))
+        if 'error' in result:
+            return result
+
+    result.update(run_in_forked_child(measure_time))
+    return result
+
+
+def run_benchmarks(sizes, generator_names, benchmark_names=None, number_of_queries=3, repeat=1, seed=0,
+                   memory=False):
+
+    results = []
+
+    # the dfs topological ordering recurses once per node on the longest path
+    sys.setrecursionlimit(max(sys.getrecursionlimit(), max(sizes) + 1000))
+
+    for generator_name in generator_names:
+        for size in sizes:
+
+            nodes, edges = generators[generator_name](size, seed=seed)
+
+            graphs = {
+                'weighted_directed':             build_weighted_directed_graph(nodes, edges),
+                'unweighted_undirected':         build_unweighted_undirected_graph(nodes, edges),
+                'unweighted_undirected_colored': build_unweighted_undirected_colored_graph(nodes, edges),
+            }
+
+            query_generator = random.Random(seed)
+            queries = [(nodes[0], query_generator.choice(nodes)) for _ in xrange(number_of_queries)] if nodes else []
+
+            for name, benchmark, benchmark_generators, max_size in benchmarks:
+
+                if benchmark_names and name not in benchmark_names:
+                    continue
+                if benchmark_generators and generator_name not in benchmark_generators:
+                    continue
+
+                result = {
+                    'algorithm': name,
+                    'generator': generator_name,
+                    'nodes':     len(nodes),
+                    'edges':     len(edges),
+                }
+
+                if max_size and size > max_size:
+                    result['skipped'] = 'More than %d nodes' % max_size
+                else:
+                    result.update(run_in_child_process(benchmark, graphs, queries, repeat, memory))
+
+                    if 'peak_bytes' in result and nodes:
+                        result['bytes_per_node'] = float(result['peak_bytes']) / len(nodes)
+                        result['kept_bytes_per_node'] = float(result['kept_bytes']) / len(nodes)
+
+                print_result(result)
+                results.append(result)
+
+            del graphs
+
+    return results
+
+
+def print_result(result):
+
+    if 'seconds' in result:
+        outcome = '%10.4fs %10d KB' % (result['seconds'], result['peak_memory_kb'])
+
+        if 'peak_bytes' in result:
+            outcome += ' %12d B peak %10.1f B/node' % (result['peak_bytes'], result.get('bytes_per_node', 0))
+        if 'retained_allocations' in result:
+            outcome += ' %8d retained allocations' % result['retained_allocations']
+        if 'retained_objects' in result:
+            outcome += ' %8d retained objects' % result['retained_objects']
+        if result.get('kept_bytes'):
+            outcome += ' %10d B kept by instance' % result['kept_bytes']
+    else:
+        outcome = result.get('skipped') or 'ERROR: %s' % result['error']
+
+    print '%-40s %-12s %10d  %s' % (result['algorithm'], result['generator'], result['nodes'], outcome)
+
+
+# regressions
+#
+# compare the results with an earlier run. a result is a regression when it takes more
+# than tolerance times as long or as much memory (or peak bytes or kept bytes per node,
+# when both runs profiled memory) as the same algorithm, generator, and size did before.
+# sampled peaks below min_peak_bytes are noise, so they aren't compared per node
+
+MIN_PEAK_BYTES = 1 << 22
+
+def find_regressions(results, baseline_results, tolerance, min_peak_bytes=MIN_PEAK_BYTES):
+
+    baseline = {
+        (result['algorithm'], result['generator'], result['nodes']): result
+        for result in baseline_results
+    }
+
+    regressions = []
+
+    for result in results:
+        baseline_result = baseline.get((result['algorithm'], result['generator'], result['nodes']))
+
+        if not baseline_result or 'seconds' not in baseline_result or 'seconds' not in result:
+            continue
+
+        for measurement in ('seconds', 'peak_memory_kb', 'bytes_per_node', 'kept_bytes_per_node'):
+            if measurement not in result or measurement not in baseline_result:
+                continue
+
+            if measurement == 'bytes_per_node' and \
+               any(compared_result.get('memory_profiler') == 'rss' and compared_result['peak_bytes'] < min_peak_bytes
+                   for compared_result in (result, baseline_result)):
+                continue
+
+            if result[measurement] > baseline_result[measurement] * tolerance:
+                regressions.append((result, measurement, baseline_result[measurement]))
+
+    return regressions
+
+
+def parse_sizes(sizes):
+    return [int(float(size)) for size in sizes.split(',')]
+
+
+def main():
+
+    parser = argparse.ArgumentParser(description='Benchmark the graph algorithms on synthetic graphs')
+    parser.add_argument('--sizes', type=parse_sizes, default=parse_sizes('1e3,1e4,1e5'),
+                        help='comma separated numbers of nodes, up to 1e7')
+    parser.add_argument('--generators', default=','.join(sorted(generators)),
+                        help='comma separated generators: %s' % ', '.join(sorted(generators)))
+    parser.add_argument('--algorithms', default=None, help='comma separated algorithms (default all)')
+    parser.add_argument('--queries', type=int, default=3, help='shortest path queries per run')
+    parser.add_argument('--repeat', type=int, default=1, help='runs per measurement, the fastest is kept')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--memory', action='store_true',
+                        help='also profile peak bytes per node (tracemalloc, or resident memory sampling)')
+    parser.add_argument('--output', help='write the results to this json file')
+    parser.add_argument('--compare', help='compare the results with this json file')
+    parser.add_argument('--tolerance', type=float, default=1.25,
+                        help='allowed slowdown or memory growth before a result is a regression')
+    parser.add_argument('--min-peak-bytes', type=int, default=MIN_PEAK_BYTES,
+                        help='smallest sampled peak whose bytes per node are compared (default 4 MB)')
+    arguments = parser.parse_args()
+
+    benchmark_names = set(arguments.algorithms.split(',')) if arguments.algorithms else None
+
+    if arguments.memory and not tracemalloc:
+        print 'tracemalloc isn\'t available: peak bytes are sampled from the resident set size, and ' \
+              'allocation counts are unavailable (retained objects only counts gc tracked objects)'
+
+    results = run_benchmarks(arguments.sizes, arguments.generators.split(','), benchmark_names,
+                             arguments.queries, arguments.repeat, arguments.seed, arguments.memory)
+
+    if arguments.output:
+        with open(arguments.output, 'w') as output_file:
+            json.dump({
+                'python':   platform.python_version(),
+                'platform': platform.platform(),
+                'time':     time.time(),
+                'results':  results,
+            }, output_file, indent=2, sort_keys=True)
+
+    if arguments.compare:
+        with open(arguments.compare) as baseline_file:
+            baseline_results = json.load(baseline_file)['results']
+
+        regressions = find_regressions(results, baseline_results, arguments.tolerance, arguments.min_peak_bytes)
+
+        for result, measurement, baseline_measurement in regressions:
+            print 'REGRESSION: %s %s %d nodes %s %s -> %s' % (
+                result['algorithm'], result['generator'], result['nodes'],
+                measurement, baseline_measurement, result[measurement])
+
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
+
+
+# notes:
+#
+# peak memory includes the interpreter and the inherited graphs, so compare it between
+# runs of the same sizes rather than reading it as the algorithm's memory
+# pure python graphs of 1e7 nodes need tens of gigabytes
+# queries always start at the first node so the runs are repeatable
+# memory sampling holds the global interpreter lock between samples, so it can only
+# sample when the algorithm's thread switches (every few thousand bytecodes)
+# comparing memory profiled with tracemalloc to memory sampled from rss isn't meaningful,
+# use the same python for the baseline
@@ -24,7 +24,7 @@ class Node:
 
 import itertools
 
-def color_graph_brute_force(graph, colors):
+def color_graph_brute_force(graph, colors, stats=None):
 
     # get the cartesian product of all the colors, for every node
     # (every color for every color, for as many nodes as we need to color)
@@ -34,15 +34,24 @@ def color_graph_brute_force(graph, colors):
         for index, node in enumerate(graph):
             node.color = current_coloring[index]
 
-        if is_graph_legally_colored(graph):
+        if stats is not None:
+            stats.count('colorings_tried')
+
+        if is_graph_legally_colored(graph, stats):
+            if stats is not None:
+                stats.report('color_graph_brute_force')
             return
 
     raise Exception('Legal coloring impossible')
 
 
-def is_graph_legally_colored(graph):
+def is_graph_legally_colored(graph, stats=None):
 
     for node in graph:
+
+        if stats is not None:
+            stats.count('neighbor_color_checks', len(node.neighbors))
+
         for neighbor in node.neighbors:
 
             # ensure neighbors have different colors
@@ -63,7 +72,7 @@ def is_graph_legally_colored(graph):
 #                   the node at the other end
 # space:  O(D)      we store all the illegal and legal colors for every node
 
-def color_graph_greedy_d(graph, colors):
+def color_graph_greedy_d(graph, colors, stats=None):
 
     for node in graph:
 
@@ -77,6 +86,14 @@ def color_graph_greedy_d(graph, colors):
         # assign the first legal color
         node.color = [color for color in colors if color not in illegal_colors][0]
 
+        if stats is not None:
+            stats.count('nodes_visited')
+            stats.count('neighbor_color_checks', len(node.neighbors))
+            stats.count('color_checks', len(colors))
+
+    if stats is not None:
+        stats.report('color_graph_greedy_d')
+
 
 # time:   O(N+M)   where N is the number of nodes and M is the number of edges. we go
 #                  through every node once, every edge from each end twice to check
@@ -87,7 +104,7 @@ def color_graph_greedy_d(graph, colors):
 #                  the neighbors of the node with the maximum degree all have
 #                  different colors
 
-def color_graph_greedy(graph, colors):
+def color_graph_greedy(graph, colors, stats=None):
 
     for node in graph:
 
@@ -103,13 +120,21 @@ def color_graph_greedy(graph, colors):
         # more color than the number of illegal colors
         node.color = next(color for color in colors if color not in illegal_colors)
 
+        if stats is not None:
+            stats.count('nodes_visited')
+            stats.count('neighbor_color_checks', len(node.neighbors))
+            stats.count('color_checks', list(colors).index(node.color) + 1)
+
+    if stats is not None:
+        stats.report('color_graph_greedy')
+
 
 # time:   O(NM^2)   where N is the number of nodes and M is the number of edges. we go
 #                   through every node once, and every edge twice for every color up
 #                   to at most one more color than the number of illegal colors
 # space:  O(1)      we use generators so we don't store any colors
 
-def color_graph_greedy_constant_space(graph, colors):
+def color_graph_greedy_constant_space(graph, colors, stats=None):
 
     for node in graph:
 
@@ -123,6 +148,15 @@ def color_graph_greedy_constant_space(graph, colors):
             (neighbor.color for neighbor in node.neighbors if neighbor.color)
         )
 
+        if stats is not None:
+            color_checks = list(colors).index(node.color) + 1
+            stats.count('nodes_visited')
+            stats.count('neighbor_color_checks', len(node.neighbors) * color_checks)
+            stats.count('color_checks', color_checks)
+
+    if stats is not None:
+        stats.report('color_graph_greedy_constant_space')
+
 
 # notes:
 #
@@ -0,0 +1,549 @@
+# store a graph as a few flat arrays so large graphs can be loaded from an edge list in
+# bounded memory, saved in a binary format, and opened with mmap without parsing
+
+
+# compact graphs use a compressed sparse row layout. every node label is mapped to an
+# integer id from 0 to N-1, and the edges are grouped by the id of the node they leave,
+# so the edges leaving node i are at indexes offsets[i] to offsets[i+1] of the targets
+# (direct successor ids) and weights arrays
+#
+#     labels:    ['A', 'B', 'C']
+#     offsets:   [0, 1, 3, 3]
+#     targets:   [1, 0, 2]
+#     weights:   [7, 3, 9]
+#
+# is the same graph as
+#
+#     {'A': [('B', 7)], 'B': [('A', 3), ('C', 9)], 'C': []}
+#
+# the arrays hold 4 bytes per edge (and 8 more per weighted edge) instead of a tuple, a
+# string reference, and an int object per edge
+
+from array import array
+
+NODE_ID_TYPECODE = 'I'
+WEIGHT_TYPECODE = 'd'
+
+class CompactGraph:
+
+    def __init__(self, labels, offsets, targets, weights=None, node_ids=None, sorted_label_ids=None):
+        self.labels = labels
+        self.offsets = offsets
+        self.targets = targets
+
+        # unweighted graphs don't store weights, every edge has a weight of 1
+        self.weights = weights
+
+        self.number_of_nodes = len(labels)
+        self.number_of_edges = len(targets)
+
+        # the label to id dictionary is built the first time it's needed, so opening
+        # a mapped graph doesn't have to read the whole label table
+        self.node_ids = node_ids
+
+        # mapped graphs also have the node ids sorted by label, so they can find a label
+        # with a binary search instead of building the dictionary. every process mapping
+        # the file shares the sorted ids, so lookups don't cost memory per process
+        self.sorted_label_ids = sorted_label_ids
+
+    def node_id(self, label):
+        if self.node_ids is not None:
+            return self.node_ids[label]
+
+        if self.sorted_label_ids is not None:
+            return self.search_label(label)
+
+        self.node_ids = {node_label: node_id for node_id, node_label in enumerate(self.labels)}
+        return self.node_ids[label]
+
+    # time:   O(logN)   comparisons of labels read from the mapped pages
+    # space:  O(1)
+
+    def search_label(self, label):
+
+        encoded_label = encode_label(label)
+        sorted_label_ids = self.sorted_label_ids
+
+        low, high = 0, len(sorted_label_ids)
+
+        while low < high:
+            middle = (low + high) // 2
+            if self.labels[sorted_label_ids[middle]] < encoded_label:
+                low = middle + 1
+            else:
+                high = middle
+
+        if low < len(sorted_label_ids):
+            node_id = sorted_label_ids[low]
+            if self.labels[node_id] == encoded_label:
+                return node_id
+
+        raise KeyError(label)
+
+    def has_node(self, label):
+        try:
+            self.node_id(label)
+        except KeyError:
+            return False
+        return True
+
+    def successor_ids(self, node_id):
+        return self.targets[self.offsets[node_id]:self.offsets[node_id + 1]]
+
+    def edge_weights(self, node_id):
+        start, end = self.offsets[node_id], self.offsets[node_id + 1]
+
+        if self.weights is None:
+            return (1,) * (end - start)
+
+        return self.weights[start:end]
+
+
+# building from a dictionary
+#
+# time:   O(N+M)   we go through every node and every edge once
+# space:  O(N+M)   the arrays hold every node and edge, and the node id dictionary holds
+#                  every label
+
+def build_compact_graph(graph, weighted=None):
+
+    labels = list(graph)
+    node_ids = {label: node_id for node_id, label in enumerate(labels)}
+
+    # weighted graphs hold (label, weight) tuples, unweighted graphs hold labels
+    if weighted is None:
+        weighted = any(isinstance(edge, tuple) for edges in graph.itervalues() for edge in edges)
+
+    offsets = array(NODE_ID_TYPECODE, [0])
+    targets = array(NODE_ID_TYPECODE)
+    weights = array(WEIGHT_TYPECODE) if weighted else None
+
+    for label in labels:
+        for edge in graph[label]:
+            if weighted:
+                direct_successor, edge_weight = edge
+                weights.append(edge_weight)
+            else:
+                direct_successor = edge
+
+            try:
+                targets.append(node_ids[direct_successor])
+            except KeyError:
+                raise Exception('Edge to node not in graph: %s' % direct_successor)
+
+        offsets.append(len(targets))
+
+    return CompactGraph(labels, offsets, targets, weights, node_ids)
+
+
+# streaming edge list loader
+#
+# edge list files have one edge per line, "source target" or "source target weight",
+# separated by whitespace. a line with a single label adds a node with no edges, and
+# lines starting with # are ignored
+#
+# we read the file in chunks of about chunk_size bytes and only keep the edges as three
+# flat arrays, so memory is bounded by the compact arrays and one chunk of text. then
+# we group the edges by their source with a counting sort
+#
+# time:   O(N+M)   where N is the number of nodes and M is the number of edges. we parse
+#                  every line once and place every edge once
+# space:  O(N+M)   the unsorted edge arrays and the sorted edge arrays hold all M edges,
+#                  and the node id dictionary holds all N labels
+
+def load_edge_list(path, directed=True, weighted=None, chunk_size=1 << 24):
+
+    labels = []
+    node_ids = {}
+
+    def intern(label):
+        node_id = node_ids.get(label)
+        if node_id is None:
+            node_id = node_ids[label] = len(labels)
+            labels.append(label)
+        return node_id
+
+    sources = array(NODE_ID_TYPECODE)
+    unsorted_targets = array(NODE_ID_TYPECODE)
+
+    # only buffer weights for weighted graphs. when we don't know yet, start buffering at
+    # the first weighted line, with a weight of 1 for every edge before it
+    unsorted_weights = array(WEIGHT_TYPECODE) if weighted else None
+
+    with open(path) as edge_list:
+        for lines in iter(lambda: edge_list.readlines(chunk_size), []):
+            for line in lines:
+                fields = line.split()
+
+                if not fields or fields[0].startswith('#'):
+                    continue
+
+                if len(fields) == 1:
+                    intern(fields[0])
+                    continue
+
+                source, target = intern(fields[0]), intern(fields[1])
+
+                if len(fields) > 2:
+                    edge_weight = float(fields[2])
+
+                    if weighted is None:
+                        weighted = True
+                        unsorted_weights = array(WEIGHT_TYPECODE, [1]) * len(sources)
+                else:
+                    edge_weight = 1
+
+                sources.append(source)
+                unsorted_targets.append(target)
+                if unsorted_weights is not None:
+                    unsorted_weights.append(edge_weight)
+
+                # undirected edges are stored once from each end
+                if not directed:
+                    sources.append(target)
+                    unsorted_targets.append(source)
+                    if unsorted_weights is not None:
+                        unsorted_weights.append(edge_weight)
+
+    offsets, targets, weights = sort_edges_by_source(len(labels), sources, unsorted_targets, unsorted_weights)
+
+    return CompactGraph(labels, offsets, targets, weights, node_ids)
+
+
+def sort_edges_by_source(number_of_nodes, sources, unsorted_targets, unsorted_weights=None):
+
+    # count the edges leaving each node, then turn the counts into offsets
+    offsets = array(NODE_ID_TYPECODE, [0]) * (number_of_nodes + 1)
+
+    for source in sources:
+        offsets[source + 1] += 1
+
+    for node_id in xrange(number_of_nodes):
+        offsets[node_id + 1] += offsets[node_id]
+
+    # place every edge at the next free index for its source
+    next_indexes = offsets[:-1]
+    targets = array(NODE_ID_TYPECODE, [0]) * len(sources)
+    weights = array(WEIGHT_TYPECODE, [0]) * len(sources) if unsorted_weights is not None else None
+
+    for edge_index, source in enumerate(sources):
+        index = next_indexes[source]
+        next_indexes[source] += 1
+
+        targets[index] = unsorted_targets[edge_index]
+        if weights is not None:
+            weights[index] = unsorted_weights[edge_index]
+
+    return offsets, targets, weights
+
+
+# binary format
+#
+# a fixed header followed by the arrays, all little endian
+#
+#     header          magic, version, number of nodes, number of edges, flags
+#     offsets         N+1 unsigned 32 bit ints
+#     targets         M unsigned 32 bit ints
+#     weights         M 64 bit floats (only if the weighted flag is set)
+#     label offsets   N+1 unsigned 32 bit ints into the label bytes
+#     sorted labels   N unsigned 32 bit node ids, in order of their labels' bytes (only if
+#                     the sorted labels flag is set)
+#     label bytes     the utf-8 labels, back to back
+#
+# version 2 added the sorted labels. version 1 files still open (they never have the
+# flag), and a flag this version doesn't know raises an error, since it could mean an
+# array we'd read past and misread everything after
+#
+# because every array has a fixed position, opening the file only reads the header and
+# the operating system pages in the parts of the arrays we touch. mapped files are also
+# shared between processes through the page cache
+
+import mmap
+import struct
+import sys
+
+MAGIC = 'GRAPHCSR'
+VERSION = 2
+WEIGHTED_FLAG = 1
+SORTED_LABELS_FLAG = 2
+
+# the flags each version can have
+version_flags = {
+    1: WEIGHTED_FLAG,
+    2: WEIGHTED_FLAG | SORTED_LABELS_FLAG,
+}
+
+header_struct = struct.Struct('<8sIIII')
+
+
+def encode_label(label):
+    if isinstance(label, unicode):
+        return label.encode('utf-8')
+    return str(label)
+
+
+def write_array(output_file, values, typecode):
+    values = array(typecode, values)
+    if sys.byteorder != 'little':
+        values.byteswap()
+    values.tofile(output_file)
+
+
+def save_compact_graph(compact_graph, path):
+
+    flags = SORTED_LABELS_FLAG
+    if compact_graph.weights is not None:
+        flags |= WEIGHTED_FLAG
+
+    encoded_labels = [encode_label(label) for label in compact_graph.labels]
+    label_offsets = array(NODE_ID_TYPECODE, [0])
+    for encoded_label in encoded_labels:
+        label_offsets.append(label_offsets[-1] + len(encoded_label))
+
+    sorted_label_ids = sorted(xrange(len(encoded_labels)), key=encoded_labels.__getitem__)
+
+    with open(path, 'wb') as output_file:
+        output_file.write(header_struct.pack(MAGIC, VERSION, compact_graph.number_of_nodes,
+                                             compact_graph.number_of_edges, flags))
+
+        write_array(output_file, compact_graph.offsets, NODE_ID_TYPECODE)
+        write_array(output_file, compact_graph.targets, NODE_ID_TYPECODE)
+        if flags & WEIGHTED_FLAG:
+            write_array(output_file, compact_graph.weights, WEIGHT_TYPECODE)
+        write_array(output_file, label_offsets, NODE_ID_TYPECODE)
+        write_array(output_file, sorted_label_ids, NODE_ID_TYPECODE)
+
+        for encoded_label in encoded_labels:
+            output_file.write(encoded_label)
+
+
+# read only views of the arrays in a mapped file. indexing unpacks values straight
+# from the mapped pages, so nothing is copied until it's used
+
+class MappedArray:
+
+    def __init__(self, buffer, position, typecode, length):
+        self.buffer = buffer
+        self.position = position
+        self.typecode = typecode
+        self.length = length
+
+        self.item_struct = struct.Struct('<' + typecode)
+        self.itemsize = self.item_struct.size
+
+    def __len__(self):
+        return self.length
+
+    def __getitem__(self, index):
+
+        if isinstance(index, slice):
+            start, stop, step = index.indices(self.length)
+            if step != 1:
+                return [self[i] for i in xrange(start, stop, step)]
+
+            count = max(stop - start, 0)
+            return struct.unpack_from('<%d%s' % (count, self.typecode), self.buffer,
+                                      self.position + start * self.itemsize)
+
+        if index < 0:
+            index += self.length
+        if not 0 <= index < self.length:
+            raise IndexError('Mapped array index out of range')
+
+        return self.item_struct.unpack_from(self.buffer, self.position + index * self.itemsize)[0]
+
+    def __iter__(self):
+        for index in xrange(self.length):
+            yield self[index]
+
+
+class MappedLabels:
+
+    def __init__(self, buffer, label_offsets, position):
+        self.buffer = buffer
+        self.label_offsets = label_offsets
+        self.position = position
+
+    def __len__(self):
+        return len(self.label_offsets) - 1
+
+    def __getitem__(self, node_id):
+        if node_id < 0:
+            node_id += len(self)
+        start = self.position + self.label_offsets[node_id]
+        end = self.position + self.label_offsets[node_id + 1]
+        return self.buffer[start:end]
+
+    def __iter__(self):
+        for node_id in xrange(len(self)):
+            yield self[node_id]
+
+
+# time:   O(1)   we only read the header. lookups by label binary search the sorted
+#                labels, files without them build the label dictionary on the first
+#                lookup, which takes N time
+# space:  O(1)   the mapped pages are owned by the operating system's page cache
+
+def open_compact_graph(path):
+
+    with open(path, 'rb') as input_file:
+        buffer = mmap.mmap(input_file.fileno(), 0, access=mmap.ACCESS_READ)
+
+    return map_compact_graph(buffer)
+
+
+def map_compact_graph(buffer, position=0):
+
+    magic, version, number_of_nodes, number_of_edges, flags = header_struct.unpack_from(buffer, position)
+
+    if magic != MAGIC or version not in version_flags:
+        raise Exception('Not a compact graph file')
+
+    if flags & ~version_flags[version]:
+        raise Exception('Unknown compact graph flags: %d' % flags)
+
+    position += header_struct.size
+
+    offsets = MappedArray(buffer, position, NODE_ID_TYPECODE, number_of_nodes + 1)
+    position += offsets.itemsize * len(offsets)
+
+    targets = MappedArray(buffer, position, NODE_ID_TYPECODE, number_of_edges)
+    position += targets.itemsize * len(targets)
+
+    weights = None
+    if flags & WEIGHTED_FLAG:
+        weights = MappedArray(buffer, position, WEIGHT_TYPECODE, number_of_edges)
+        position += weights.itemsize * len(weights)
+
+    label_offsets = MappedArray(buffer, position, NODE_ID_TYPECODE, number_of_nodes + 1)
+    position += label_offsets.itemsize * len(label_offsets)
+
+    sorted_label_ids = None
+    if flags & SORTED_LABELS_FLAG:
+        sorted_label_ids = MappedArray(buffer, position, NODE_ID_TYPECODE, number_of_nodes)
+        position += sorted_label_ids.itemsize * len(sorted_label_ids)
+
+    labels = MappedLabels(buffer, label_offsets, position)
+
+    return CompactGraph(labels, offsets, targets, weights, sorted_label_ids=sorted_label_ids)
+
+
+# adapters
+#
+# the algorithms index graphs like dictionaries, so a view that builds each node's
+# adjacency list on demand lets shortest_path_bfs, both Dijkstra's functions,
+# topological_order_kahns, and shortest_path run on a compact graph unchanged. weighted
+# views hold (label, weight) tuples and unweighted views hold labels
+
+import collections
+
+class CompactGraphView(collections.Mapping):
+
+    def __init__(self, compact_graph, weighted=True):
+        self.compact_graph = compact_graph
+        self.weighted = weighted
+
+    def __getitem__(self, label):
+        compact_graph = self.compact_graph
+        labels = compact_graph.labels
+
+        node_id = compact_graph.node_id(label)
+        successor_ids = compact_graph.successor_ids(node_id)
+
+        if not self.weighted:
+            return [labels[successor_id] for successor_id in successor_ids]
+
+        return [(labels[successor_id], edge_weight) for successor_id, edge_weight
+                in zip(successor_ids, compact_graph.edge_weights(node_id))]
+
+    def __contains__(self, label):
+        return self.compact_graph.has_node(label)
+
+    def __iter__(self):
+        return iter(self.compact_graph.labels)
+
+    def __len__(self):
+        return self.compact_graph.number_of_nodes
+
+
+def weighted_view(compact_graph):
+    return CompactGraphView(compact_graph, weighted=True)
+
+
+def unweighted_view(compact_graph):
+    return CompactGraphView(compact_graph, weighted=False)
+
+
+# the coloring functions color node objects, so we build them from the compact graph. an
+# undirected graph must store every edge from both ends, like load_edge_list does when
+# directed is False
+#
+# the nodes are ordinary python objects, about a hundred bytes per node and eight per
+# edge, so every process that builds them holds its own copy of the graph. processes
+# attached to a shared graph should use color_compact_graph instead
+
+from coloring import Node
+
+def colored_nodes(compact_graph):
+
+    nodes = [Node(label) for label in compact_graph.labels]
+
+    for node_id, node in enumerate(nodes):
+        node.neighbors = [nodes[successor_id] for successor_id in compact_graph.successor_ids(node_id)]
+
+    return nodes
+
+
+# greedy coloring straight from the compact graph's arrays, going through the nodes in id
+# order like color_edge_stream. colors are numbers from 1 to D+1, in an array indexed by
+# node id (0 means not colored yet). nothing is built per node, so a process attached to
+# a shared graph only adds the colors array
+#
+# time:   O(N+M)
+# space:  O(N)     4 bytes per node for the colors array, plus the illegal colors of one node
+
+def color_compact_graph(compact_graph, stats=None):
+
+    node_colors = array(NODE_ID_TYPECODE, [0]) * compact_graph.number_of_nodes
+
+    for node_id in xrange(compact_graph.number_of_nodes):
+
+        illegal_colors = set()
+
+        for successor_id in compact_graph.successor_ids(node_id):
+            if successor_id == node_id:
+                raise Exception('Legal coloring impossible for node with loop: %s' % compact_graph.labels[node_id])
+
+            # neighbors with bigger ids aren't colored yet (0)
+            if node_colors[successor_id]:
+                illegal_colors.add(node_colors[successor_id])
+
+        color = 1
+        while color in illegal_colors:
+            color += 1
+        node_colors[node_id] = color
+
+        if stats is not None:
+            stats.count('nodes_visited')
+            stats.count('color_checks', color)
+
+    if stats is not None:
+        stats.report('color_compact_graph')
+
+    return node_colors
+
+
+# notes:
+#
+# 32 bit ids and offsets limit a graph to 2^32 nodes and edges
+# labels are read back as byte strings, and the sorted labels are sorted by their bytes
+# weights are read back as floats
+# memoryview casts instead of struct.unpack_from (python 3)
+# the counting sort needs the unsorted and sorted edges at the same time
+#
+# edge cases
+#     empty graph
+#     nodes with no edges
+#     loops, multiple edges
+#     edges to nodes not in graph
+#     version 1 files, unknown flags
@@ -0,0 +1,130 @@
+# index the connected components of an unweighted, undirected graph so shortest path
+# queries between nodes in different components return right away
+
+
+# graphs are represented by a dictionary of (string, list) pairs where the string
+# is the node label and the list holds the node's neighbors' labels
+
+graph = {
+    'A': ['B'],
+    'B': ['A'],
+    'C': [],
+}
+
+
+# union-find (disjoint sets)
+#
+# every node points to a parent node in its component, and the node at the top of each
+# component (the root) points to itself. two nodes are in the same component if they
+# have the same root. adding an edge joins two components by pointing one root at the
+# other, so the index stays up to date without rebuilding it
+#
+# we keep the trees flat by pointing the smaller component's root at the larger one's
+# (union by size) and by pointing nodes at their grandparents as we look for the root
+# (path halving)
+#
+# time:   O(N+M a(N))   to build the index, where a is the inverse Ackermann function
+#                       (at most 4 for any graph that fits in memory)
+#         O(a(N))       to check two nodes or add an edge, so effectively constant
+# space:  O(N)          the parents and sizes dictionaries hold every node
+
+class ConnectedComponents:
+
+    def __init__(self, graph):
+        self.parents = {}
+        self.sizes = {}
+
+        for node in graph:
+            self.add_node(node)
+
+        for node, neighbors in graph.iteritems():
+            for neighbor in neighbors:
+                self.add_edge(node, neighbor)
+
+    def add_node(self, node):
+        if node not in self.parents:
+            self.parents[node] = node
+            self.sizes[node] = 1
+
+    def find_root(self, node):
+        parents = self.parents
+
+        while parents[node] != node:
+
+            # point the node at its grandparent (path halving)
+            parents[node] = parents[parents[node]]
+            node = parents[node]
+
+        return node
+
+    def add_edge(self, node_1, node_2):
+        self.add_node(node_1)
+        self.add_node(node_2)
+
+        root_1 = self.find_root(node_1)
+        root_2 = self.find_root(node_2)
+
+        if root_1 == root_2:
+            return
+
+        # point the smaller component's root at the larger one's
+        if self.sizes[root_1] < self.sizes[root_2]:
+            root_1, root_2 = root_2, root_1
+
+        self.parents[root_2] = root_1
+        self.sizes[root_1] += self.sizes.pop(root_2)
+
+    def is_connected(self, node_1, node_2):
+        return self.find_root(node_1) == self.find_root(node_2)
+
+    def component_size(self, node):
+        return self.sizes[self.find_root(node)]
+
+    def number_of_components(self):
+        return len(self.sizes)
+
+
+# shortest path
+#
+# check the index before searching, so unreachable target nodes don't make us explore
+# the whole start node's component
+#
+# time:   O(1)     when the nodes are in different components
+#         O(N+M)   otherwise, the same as shortest_path_bfs
+# space:  O(N)
+
+from unweighted_undirected_cyclic_graph import shortest_path_bfs
+
+def shortest_path_bfs_with_components(graph, connected_components, start_node, target_node):
+
+    if (start_node not in graph) or (target_node not in graph):
+        raise Exception('Start or target node not in graph')
+
+    if not connected_components.is_connected(start_node, target_node):
+        return None
+
+    return shortest_path_bfs(graph, start_node, target_node)
+
+
+# adding an edge to the graph and the index together keeps them in sync
+
+def add_undirected_edge(graph, connected_components, node_1, node_2):
+
+    graph.setdefault(node_1, []).append(node_2)
+    graph.setdefault(node_2, []).append(node_1)
+
+    connected_components.add_edge(node_1, node_2)
+
+
+# notes:
+#
+# removing edges can split a component, which union-find can't undo (rebuild the index,
+# or use a dynamic connectivity structure)
+# directed graphs need strongly connected components for the same check
+# the index also answers "how many nodes can this node reach" (component_size)
+#
+# edge cases
+#     empty graph
+#     nodes with no edges
+#     loops, multiple edges
+#     nodes added by an edge
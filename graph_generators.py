@@ -0,0 +1,198 @@
+# generate synthetic graphs of any size for benchmarking
+
+
+# generators return a list of node labels and a list of (string, string, int) edges where
+# the strings are the labels of the nodes at each end and the int is the edge weight.
+# the builders turn them into the graph representations the algorithms use
+#
+# every generator takes a seed so the same arguments always give the same graph
+
+import random
+
+
+# random (Erdos-Renyi)
+#
+# pick M = N * average_degree / 2 edges uniformly at random between distinct nodes.
+# this is the G(N, M) model, which is close to G(N, p) with p = average_degree / N but
+# doesn't need to consider all N^2 pairs
+#
+# time:   O(N+M)
+# space:  O(N+M)
+
+def random_graph(number_of_nodes, average_degree=4, max_weight=100, seed=0):
+
+    generator = random.Random(seed)
+    nodes = [str(node) for node in xrange(number_of_nodes)]
+    edges = []
+
+    if number_of_nodes < 2:
+        return nodes, edges
+
+    for _ in xrange(number_of_nodes * average_degree // 2):
+        node_1 = generator.randrange(number_of_nodes)
+        node_2 = generator.randrange(number_of_nodes - 1)
+
+        # skip over node_1 so we never make a loop
+        if node_2 >= node_1:
+            node_2 += 1
+
+        edges.append((nodes[node_1], nodes[node_2], generator.randint(1, max_weight)))
+
+    return nodes, edges
+
+
+# grid (road-like)
+#
+# lay the nodes out on a square grid and connect every node to the nodes above, below,
+# left, and right of it in both directions. road networks have the same low, even degree
+# and large diameter
+#
+# time:   O(N)   every node has at most 4 edges
+# space:  O(N)
+
+def grid_graph(number_of_nodes, max_weight=100, seed=0):
+
+    generator = random.Random(seed)
+
+    width = max(int(number_of_nodes ** 0.5), 1)
+    nodes = [str(node) for node in xrange(number_of_nodes)]
+    edges = []
+
+    for node in xrange(number_of_nodes):
+        right, below = node + 1, node + width
+
+        neighbors = [below]
+        if right % width:
+            neighbors.append(right)
+
+        for neighbor in neighbors:
+            if neighbor < number_of_nodes:
+                edges.append((nodes[node], nodes[neighbor], generator.randint(1, max_weight)))
+                edges.append((nodes[neighbor], nodes[node], generator.randint(1, max_weight)))
+
+    return nodes, edges
+
+
+# power law (Barabasi-Albert)
+#
+# add nodes one at a time and connect each new node to edges_per_node existing nodes,
+# choosing nodes with probability proportional to their degree (preferential attachment).
+# we keep a list with every node once per edge end, so picking a random item from the
+# list picks a node proportionally to its degree
+#
+# time:   O(N+M)
+# space:  O(N+M)   the list of edge ends holds 2M items
+
+def power_law_graph(number_of_nodes, edges_per_node=3, max_weight=100, seed=0):
+
+    generator = random.Random(seed)
+    nodes = [str(node) for node in xrange(number_of_nodes)]
+    edges = []
+    edge_ends = []
+
+    for node in xrange(1, number_of_nodes):
+
+        if edge_ends:
+            neighbors = set(generator.choice(edge_ends) for _ in xrange(min(edges_per_node, node)))
+        else:
+            neighbors = set([0])
+
+        for neighbor in neighbors:
+            edges.append((nodes[node], nodes[neighbor], generator.randint(1, max_weight)))
+            edge_ends.append(node)
+            edge_ends.append(neighbor)
+
+    return nodes, edges
+
+
+# layered dag
+#
+# split the nodes into layers and only add edges from a layer to a later layer, so the
+# graph is acyclic. most edges go to the next layer, like a scheduling or build graph
+#
+# time:   O(N+M)
+# space:  O(N+M)
+
+def layered_dag(number_of_nodes, number_of_layers=None, edges_per_node=3, max_weight=100, seed=0):
+
+    generator = random.Random(seed)
+
+    if number_of_layers is None:
+        number_of_layers = max(int(number_of_nodes ** 0.5), 1)
+
+    layer_size = max(number_of_nodes // number_of_layers, 1)
+    nodes = [str(node) for node in xrange(number_of_nodes)]
+    edges = []
+
+    for node in xrange(number_of_nodes):
+        next_layer_start = (node // layer_size + 1) * layer_size
+
+        if next_layer_start >= number_of_nodes:
+            continue
+
+        for _ in xrange(edges_per_node):
+
+            # skip ahead one layer most of the time, and sometimes further
+            if generator.random() < 0.9:
+                neighbor = generator.randrange(next_layer_start, min(next_layer_start + layer_size, number_of_nodes))
+            else:
+                neighbor = generator.randrange(next_layer_start, number_of_nodes)
+
+            edges.append((nodes[node], nodes[neighbor], generator.randint(1, max_weight)))
+
+    return nodes, edges
+
+
+generators = {
+    'random':      random_graph,
+    'grid':        grid_graph,
+    'power_law':   power_law_graph,
+    'layered_dag': layered_dag,
+}
+
+
+# builders
+#
+# time:   O(N+M)
+# space:  O(N+M)
+
+def build_weighted_directed_graph(nodes, edges):
+
+    graph = {node: [] for node in nodes}
+
+    for direct_predecessor, direct_successor, weight in edges:
+        graph[direct_predecessor].append((direct_successor, weight))
+
+    return graph
+
+
+def build_unweighted_undirected_graph(nodes, edges):
+
+    graph = {node: [] for node in nodes}
+
+    for node_1, node_2, weight in edges:
+        graph[node_1].append(node_2)
+        graph[node_2].append(node_1)
+
+    return graph
+
+
+from coloring import Node
+
+def build_unweighted_undirected_colored_graph(nodes, edges):
+
+    graph = {node: Node(node) for node in nodes}
+
+    for node_1, node_2, weight in edges:
+        graph[node_1].neighbors.append(graph[node_2])
+        graph[node_2].neighbors.append(graph[node_1])
+
+    return [graph[node] for node in nodes]
+
+
+# notes:
+#
+# random graphs can have multiple edges between two nodes
+# grid graphs have the same edges in both directions with different weights
+# power law graphs have a few very high degree nodes (hubs)
+# layered dags with one layer have no edges
@@ -0,0 +1,297 @@
+# find the shortest path from a start node to a target node in a large weighted, directed
+# graph with no negative edges, by splitting the graph into partitions ahead of time and
+# searching a small overlay graph between them (multi level Dijkstra's algorithm)
+
+
+# graphs are represented by a dictionary of (string, list) pairs where the string
+# is the node label and the list holds tuples of the node's direct successors
+# (string, int) where the string is the direct successor's label and the int is
+# the weight of the edge to the direct successor
+
+graph = {
+    'A': [('B', 7)],
+    'B': [('A', 3), ('C', 9)],
+    'C': [],
+}
+
+
+# partitions
+#
+# grow each partition with a breadth first search from the first node that isn't in one
+# yet, following edges in both directions, until it has partition_size nodes. the
+# searches keep partitions connected, so most edges stay inside one partition
+#
+# boundary nodes are the nodes at either end of an edge between two partitions. every
+# path that goes through a partition enters and leaves it at boundary nodes
+#
+# time:   O(N+M)   every node is added to one partition, and we check every edge twice
+# space:  O(N+M)   the predecessors dictionary holds every edge
+
+from collections import deque
+
+def bfs_partitions(graph, partition_size):
+
+    direct_predecessors = {node: [] for node in graph}
+    for node, edges in graph.iteritems():
+        for direct_successor, edge_weight in edges:
+            direct_predecessors[direct_successor].append(node)
+
+    partitions = {}
+    partition = 0
+
+    for first_node in sorted(graph):
+        if first_node in partitions:
+            continue
+
+        partitions[first_node] = partition
+        partition_nodes = 1
+        nodes_with_unvisited_neighbors = deque([first_node])
+
+        while nodes_with_unvisited_neighbors and (partition_nodes < partition_size):
+            node = nodes_with_unvisited_neighbors.popleft()
+
+            neighbors = [direct_successor for direct_successor, edge_weight in graph[node]] + direct_predecessors[node]
+
+            for neighbor in neighbors:
+                if (neighbor not in partitions) and (partition_nodes < partition_size):
+                    partitions[neighbor] = partition
+                    partition_nodes += 1
+                    nodes_with_unvisited_neighbors.append(neighbor)
+
+        partition += 1
+
+    return partitions
+
+
+# boundary distances
+#
+# for each partition, search from every boundary node to the other boundary nodes using
+# only the partition's own edges. each pair with a path becomes a shortcut edge in the
+# overlay graph, and we keep the path so queries can expand the shortcut again
+#
+# partitions don't depend on each other, so a process pool computes them in parallel.
+# each task only pickles its partition's edges
+#
+# time:   O(B*(n+m)log(n))   per partition, where B is the number of boundary nodes and n
+#                            and m are the partition's nodes and edges
+# space:  O(B^2 * n)         the shortcuts and their paths
+
+from weighted_directed_cyclic_graph import shortest_paths_djikstras
+
+def boundary_distances(task):
+
+    partition_graph, boundary_nodes = task
+    shortcuts = {}
+
+    for boundary_node in boundary_nodes:
+        shortest_paths = shortest_paths_djikstras(partition_graph, boundary_node, boundary_nodes)
+
+        for target_node, (path, distance) in shortest_paths.iteritems():
+            if path:
+                shortcuts[(boundary_node, target_node)] = (distance, path)
+
+    return shortcuts
+
+
+# partitioned graph
+#
+#     partitioned_graph = PartitionedGraph(graph, partition_size=1000)
+#     partitioned_graph.shortest_path('A', 'G')
+#
+# the overlay graph holds every boundary node, with its shortcut edges and its edges to
+# other partitions. a query searches a graph made of the start and target partitions'
+# own edges plus the overlay for every other partition, with
+# shortest_path_djikstras_priority_queue. any path through another partition enters and
+# leaves it at boundary nodes, so a shortcut is at least as short, and the search finds
+# the shortest path. then shortcuts are expanded back into their paths
+#
+# when a region of the graph changes, rebuild_partitions recomputes the shortcuts for
+# just the partitions that changed, and keeps the rest
+#
+# time:   O(P*B*(n+m)log(n) / processes)   to build, for P partitions
+#         O((n+m+V+E)log(n+V))             per query, where V and E are the overlay's
+#                                          nodes and edges
+# space:  O(N+M + P*B^2*n)                 the partitions and the shortcuts
+
+import multiprocessing
+
+from weighted_directed_cyclic_graph import shortest_path_djikstras_priority_queue
+
+class PartitionedGraph:
+
+    def __init__(self, graph, partition_size=1000, processes=None, partitions=None):
+
+        self.graph = graph
+        self.processes = processes
+
+        # nodes by partition, and partitions by node
+        self.partitions = partitions if partitions is not None else bfs_partitions(graph, partition_size)
+        self.partition_nodes = {}
+        for node, partition in self.partitions.iteritems():
+            self.partition_nodes.setdefault(partition, set()).add(node)
+
+        self.find_boundary_nodes()
+
+        # (boundary node, boundary node): (distance, path) pairs by partition
+        self.shortcuts = {}
+        self.compute_shortcuts(self.partition_nodes)
+
+        self.build_overlay_graph()
+
+    def partition_of(self, node):
+        try:
+            return self.partitions[node]
+        except KeyError:
+            raise Exception('Node not in any partition, partition the graph again: %s' % node)
+
+    def find_boundary_nodes(self):
+
+        self.boundary_nodes = {partition: set() for partition in self.partition_nodes}
+
+        for node, edges in self.graph.iteritems():
+            for direct_successor, edge_weight in edges:
+                if self.partition_of(node) != self.partition_of(direct_successor):
+                    self.boundary_nodes[self.partition_of(node)].add(node)
+                    self.boundary_nodes[self.partition_of(direct_successor)].add(direct_successor)
+
+    def partition_graph(self, partition):
+
+        nodes = self.partition_nodes[partition]
+
+        return {
+            node: [(direct_successor, edge_weight) for direct_successor, edge_weight in self.graph[node]
+                   if direct_successor in nodes]
+            for node in nodes
+        }
+
+    def compute_shortcuts(self, partitions):
+
+        partitions = sorted(partitions)
+        tasks = [(self.partition_graph(partition), sorted(self.boundary_nodes[partition])) for partition in partitions]
+
+        # one process can skip the pool and the pickling
+        if self.processes == 1 or len(tasks) <= 1:
+            results = map(boundary_distances, tasks)
+        else:
+            pool = multiprocessing.Pool(self.processes)
+            try:
+                results = pool.map(boundary_distances, tasks)
+            finally:
+                pool.close()
+                pool.join()
+
+        for partition, shortcuts in zip(partitions, results):
+            self.shortcuts[partition] = shortcuts
+
+    def build_overlay_graph(self):
+
+        self.overlay_graph = {
+            node: [] for boundary_nodes in self.boundary_nodes.itervalues() for node in boundary_nodes
+        }
+
+        for shortcuts in self.shortcuts.itervalues():
+            for (boundary_node, target_node), (distance, path) in shortcuts.iteritems():
+                self.overlay_graph[boundary_node].append((target_node, distance))
+
+        for node in self.overlay_graph:
+            for direct_successor, edge_weight in self.graph[node]:
+                if self.partitions[node] != self.partitions[direct_successor]:
+                    self.overlay_graph[node].append((direct_successor, edge_weight))
+
+    # the graph changed inside the given partitions. nodes keep their partitions, so new
+    # nodes need a partition in partitions (or a new partitioning)
+    #
+    # time:   O(N+M) to find the boundary nodes again, plus the changed partitions' shortcuts
+    # space:  O(N+M)
+
+    def rebuild_partitions(self, graph, changed_partitions, partitions=None):
+
+        self.graph = graph
+
+        for node, partition in (partitions or {}).iteritems():
+            self.partitions[node] = partition
+
+        self.partition_nodes = {}
+        for node in graph:
+            self.partition_nodes.setdefault(self.partition_of(node), set()).add(node)
+
+        # an edge between partitions changes the boundary nodes on both ends, and
+        # partitions with new boundary nodes need new shortcuts too
+        previous_boundary_nodes = self.boundary_nodes
+        self.find_boundary_nodes()
+
+        changed_partitions = set(changed_partitions)
+        for partition, boundary_nodes in self.boundary_nodes.iteritems():
+            if boundary_nodes != previous_boundary_nodes.get(partition):
+                changed_partitions.add(partition)
+
+        for partition in list(self.shortcuts):
+            if partition not in self.partition_nodes:
+                del self.shortcuts[partition]
+
+        self.compute_shortcuts(changed_partitions & set(self.partition_nodes))
+        self.build_overlay_graph()
+
+    def query_graph(self, start_node, target_node):
+
+        local_partitions = set([self.partitions[start_node], self.partitions[target_node]])
+
+        query_graph = {
+            node: edges for node, edges in self.overlay_graph.iteritems()
+            if self.partitions[node] not in local_partitions
+        }
+
+        for partition in local_partitions:
+            for node in self.partition_nodes[partition]:
+                query_graph[node] = self.graph[node]
+
+        return query_graph
+
+    def shortest_path(self, start_node, target_node):
+
+        if (start_node not in self.graph) or (target_node not in self.graph):
+            raise Exception('Start or target node not in graph')
+
+        local_partitions = set([self.partitions[start_node], self.partitions[target_node]])
+
+        path = shortest_path_djikstras_priority_queue(self.query_graph(start_node, target_node),
+                                                      start_node, target_node)
+
+        if path is None:
+            return None
+
+        # expand the shortcuts through other partitions
+        shortest_path = [start_node]
+
+        for node, next_node in zip(path, path[1:]):
+            partition = self.partitions[node]
+
+            if (partition not in local_partitions) and (self.partitions[next_node] == partition):
+                distance, shortcut_path = self.shortcuts[partition][(node, next_node)]
+                shortest_path.extend(shortcut_path[1:])
+            else:
+                shortest_path.append(next_node)
+
+        return shortest_path
+
+
+# notes:
+#
+# label propagation partitions cut fewer edges than bfs partitions, but take several
+# passes over the graph. any partitioning works, pass it as partitions
+# fewer boundary nodes mean fewer shortcuts, the shortcuts grow with the square of them
+# more levels (partitions of partitions) keep the overlay small for huge graphs
+# the query graph copies the overlay's adjacency lists, a view that chose between them
+# per node would skip that
+# shortcut paths could be left out and found again with a search inside the partition
+# negative edges give wrong paths, like the other Dijkstra's functions
+#
+# edge cases
+#     empty graph
+#     start node and target node are the same
+#     start node or target node aren't in graph
+#     start node and target node in the same partition
+#     shortest path leaves and reenters the start node's partition
+#     partitions with no boundary nodes (disconnected)
+#     no path (disconnected or wrong directions)
+#     multiple edges, loops
@@ -0,0 +1,212 @@
+# find the shortest path from a start node to a target node in a graph that's too big
+# to build, like a game's state space or a huge grid, by asking for each node's
+# neighbors only when the search reaches it
+
+
+# graphs are represented by a function that takes a node and returns its neighbors'
+# labels (unweighted) or tuples of its direct successors and edge weights (weighted).
+# nodes can be any hashable value, like (x, y) tuples for a grid
+#
+#     def neighbors(node):
+#         x, y = node
+#         return [(x + 1, y), (x, y + 1)]
+#
+# a dictionary graph works too, pass graph.__getitem__ (or a function that returns []
+# for nodes that aren't in it)
+#
+# there's no list of nodes, so the search can't check that the target node is in the
+# graph. a target node that can't be reached makes the search run until it's seen every
+# node it can reach, so graphs that never end need max_visited_nodes
+
+
+# visited node limit
+#
+# the searches only store state (a previous node, a distance) for nodes they've
+# discovered, so memory grows with the part of the graph we explore, not the whole graph.
+# max_visited_nodes caps the number of discovered nodes. when the search would discover
+# more, it raises VisitedNodeLimitError instead of returning, because we don't know if
+# there's a path
+
+class VisitedNodeLimitError(Exception):
+
+    def __init__(self, max_visited_nodes):
+        super(VisitedNodeLimitError, self).__init__('Visited node limit reached: %d' % max_visited_nodes)
+        self.max_visited_nodes = max_visited_nodes
+
+
+# node labels aren't strings, so a falsy label like 0 or '' is a real node. we
+# backtrack until the previous node is None instead of until it's falsy
+
+def backtrack_shortest_path(shortest_path_previous_nodes, target_node):
+
+    reverse_shortest_path = []
+    current_node = target_node
+
+    while current_node is not None:
+        reverse_shortest_path.append(current_node)
+        current_node = shortest_path_previous_nodes[current_node]
+
+    return list(reversed(reverse_shortest_path))
+
+
+# breadth first search
+#
+# the same search as shortest_path_bfs, with the visited set folded into the previous
+# nodes dictionary (a node is visited when it has an entry) since it holds the same keys
+#
+# time:   O(V+E)   where V is the number of nodes discovered and E is the number of edges
+#                  out of the nodes we visit. we never look at the rest of the graph
+# space:  O(V)     the previous nodes dictionary and the queue
+
+from collections import deque
+
+def shortest_path_bfs(neighbors, start_node, target_node, max_visited_nodes=None):
+
+    if start_node == target_node:
+        return None
+
+    shortest_path_previous_nodes = {start_node: None}
+    visited_nodes_with_unvisited_neighbors = deque([start_node])
+
+    while visited_nodes_with_unvisited_neighbors:
+        node = visited_nodes_with_unvisited_neighbors.popleft()
+
+        for neighbor in neighbors(node):
+            if neighbor not in shortest_path_previous_nodes:
+
+                if (max_visited_nodes is not None) and (len(shortest_path_previous_nodes) >= max_visited_nodes):
+                    raise VisitedNodeLimitError(max_visited_nodes)
+
+                shortest_path_previous_nodes[neighbor] = node
+
+                # stop as soon as we discover the target node, its path can't get shorter
+                if neighbor == target_node:
+                    return backtrack_shortest_path(shortest_path_previous_nodes, target_node)
+
+                visited_nodes_with_unvisited_neighbors.append(neighbor)
+
+    return None
+
+
+# Dijkstra's algorithm
+#
+# the same lazy priority queue as settled_nodes_djikstras. nodes are pushed when they're
+# discovered instead of heapifying every node up front, which we couldn't do anyway
+#
+# time:   O((V+E)logV)   where V is the number of nodes discovered and E is the number of
+#                        edges out of the nodes we visit
+# space:  O(V+E)         the dictionaries and visited set hold every discovered node, and the
+#                        heap holds a (distance, node) pair for every shorter distance
+
+import heapq
+
+def shortest_path_djikstras(neighbors, start_node, target_node, max_visited_nodes=None):
+
+    if start_node == target_node:
+        return None
+
+    shortest_path_distances = {start_node: 0}
+    shortest_path_direct_predecessors = {start_node: None}
+
+    priority_queue = [(0, start_node)]
+    visited_nodes = set()
+
+    while priority_queue:
+
+        current_node_distance, current_node = heapq.heappop(priority_queue)
+
+        # stop when we visit the target node, its distance is final
+        if current_node == target_node:
+            return backtrack_shortest_path(shortest_path_direct_predecessors, target_node)
+
+        # only visit a node once, at its shortest distance
+        if current_node in visited_nodes:
+            continue
+
+        visited_nodes.add(current_node)
+
+        for direct_successor, edge_weight in neighbors(current_node):
+
+            distance_from_current_node = current_node_distance + edge_weight
+
+            if direct_successor not in shortest_path_distances:
+                if (max_visited_nodes is not None) and (len(shortest_path_distances) >= max_visited_nodes):
+                    raise VisitedNodeLimitError(max_visited_nodes)
+
+            elif distance_from_current_node >= shortest_path_distances[direct_successor]:
+                continue
+
+            # update the direct successor's shortest path
+            shortest_path_distances[direct_successor] = distance_from_current_node
+            shortest_path_direct_predecessors[direct_successor] = current_node
+
+            heapq.heappush(priority_queue, (distance_from_current_node, direct_successor))
+
+    return None
+
+
+# grids
+#
+# a grid graph describes its nodes instead of listing them. nodes are (x, y) tuples, and
+# each node's neighbors are the cells next to it (and diagonal to it, with diagonal=True)
+# that are inside the grid and open. width and height can be None for a grid that never
+# ends in that direction
+#
+#     grid = GridGraph(10 ** 6, 10 ** 6, is_open=lambda cell: cell not in walls)
+#     shortest_path_bfs(grid, (0, 0), (500, 700), max_visited_nodes=10 ** 7)
+#     shortest_path_djikstras(grid.weighted_neighbors, (0, 0), (500, 700))
+#
+# edge weights come from edge_weight(cell, neighbor), 1 by default
+#
+# time:   O(1)   to find a node's neighbors, plus is_open and edge_weight
+# space:  O(1)   the grid doesn't store any nodes
+
+orthogonal_steps = ((1, 0), (0, 1), (-1, 0), (0, -1))
+diagonal_steps = ((1, 1), (-1, 1), (-1, -1), (1, -1))
+
+class GridGraph:
+
+    def __init__(self, width=None, height=None, is_open=None, diagonal=False, edge_weight=None):
+        self.width = width
+        self.height = height
+        self.is_open = is_open
+        self.steps = orthogonal_steps + diagonal_steps if diagonal else orthogonal_steps
+        self.edge_weight = edge_weight
+
+    def contains(self, cell):
+        x, y = cell
+
+        if (self.width is not None) and not (0 <= x < self.width):
+            return False
+        if (self.height is not None) and not (0 <= y < self.height):
+            return False
+
+        return (self.is_open is None) or self.is_open(cell)
+
+    def __call__(self, cell):
+        x, y = cell
+        return [neighbor for neighbor in ((x + dx, y + dy) for dx, dy in self.steps) if self.contains(neighbor)]
+
+    def weighted_neighbors(self, cell):
+        if self.edge_weight is None:
+            return [(neighbor, 1) for neighbor in self(cell)]
+
+        return [(neighbor, self.edge_weight(cell, neighbor)) for neighbor in self(cell)]
+
+
+# notes:
+#
+# the limit counts discovered nodes, not visited ones, because discovered nodes are
+# what we store. a search that hits the limit may have been close to the target node
+# bidirectional search or A* (with a heuristic like the grid distance) would discover
+# far fewer nodes, but bidirectional search needs each node's predecessors too
+# the searches ask for a node's neighbors once, so neighbor functions don't need caching
+# negative edge weights give wrong paths, like the other Dijkstra's functions
+#
+# edge cases
+#     start node and target node are the same
+#     start node or target node aren't in graph (no neighbors, or never discovered)
+#     falsy node labels (0, '', (0, 0) is truthy)
+#     no path in a graph that never ends (max_visited_nodes)
+#     limit reached exactly as the target node is discovered
+#     multiple edges, loops
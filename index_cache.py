@@ -0,0 +1,240 @@
+# save indexes derived from a graph (topological orderings, connected components, and so on)
+# to disk, keyed by the graph's version, so processes that load the same graph can load
+# them instead of computing them again
+
+
+# fingerprints
+#
+# a fingerprint is a sha256 hash of the graph's contents: every node label in sorted
+# order, each followed by its adjacency list in order. any change to a node or an edge
+# changes the fingerprint, so indexes for an old version of the graph are never loaded
+# for a new one
+#
+# time:   O(N+M + NlogN)   we hash every node and edge once, after sorting the labels
+# space:  O(N)             the sorted labels
+
+import hashlib
+
+def graph_fingerprint(graph):
+
+    fingerprint = hashlib.sha256()
+
+    for node in sorted(graph):
+        fingerprint.update(repr(node))
+        fingerprint.update('\0')
+        fingerprint.update(repr(graph[node]))
+        fingerprint.update('\0')
+
+    return fingerprint.hexdigest()
+
+
+# a compact graph file already holds the whole graph, so hashing the file's bytes
+# fingerprints it without building a dictionary
+
+def file_fingerprint(path, block_size=1 << 20):
+
+    fingerprint = hashlib.sha256()
+
+    with open(path, 'rb') as input_file:
+        for block in iter(lambda: input_file.read(block_size), ''):
+            fingerprint.update(block)
+
+    return fingerprint.hexdigest()
+
+
+# index files
+#
+# an index is a list of node labels and an array of ints, one per label or none at all.
+# a node ordering is just the labels in order, and a per node index (like a component
+# number) has each node's value at its label's position. storing the labels means loading
+# an index doesn't need the graph's labels (sorting them costs more than most indexes)
+#
+#     header   magic, version, typecode, number of labels, number of values, number of
+#              label bytes
+#     values   little endian values
+#     labels   the utf-8 labels, separated by zero bytes
+#
+# loading reads both parts in bulk, with array.fromfile and one split, instead of
+# unpacking one value at a time
+
+import os
+import struct
+import sys
+from array import array
+
+from compact_graph import encode_label
+
+MAGIC = 'GRAPHIDX'
+VERSION = 2
+
+header_struct = struct.Struct('<8sIcIII')
+
+
+def save_index(path, labels, values=(), typecode='i'):
+
+    encoded_labels = [encode_label(label) for label in labels]
+    if any('\0' in encoded_label for encoded_label in encoded_labels):
+        raise Exception('Labels can\'t contain zero bytes')
+    label_bytes = '\0'.join(encoded_labels)
+
+    values = array(typecode, values)
+    if sys.byteorder != 'little':
+        values.byteswap()
+
+    # write to a temporary name and rename it, so no process reads half a file
+    temporary_path = '%s.%d.tmp' % (path, os.getpid())
+
+    with open(temporary_path, 'wb') as output_file:
+        output_file.write(header_struct.pack(MAGIC, VERSION, typecode, len(encoded_labels), len(values),
+                                             len(label_bytes)))
+        values.tofile(output_file)
+        output_file.write(label_bytes)
+
+    os.rename(temporary_path, path)
+
+
+# time:   O(N)   two bulk reads and a split
+# space:  O(N)
+
+def load_index(path):
+
+    with open(path, 'rb') as input_file:
+        header = input_file.read(header_struct.size)
+
+        if len(header) != header_struct.size:
+            raise Exception('Not an index file: %s' % path)
+
+        magic, version, typecode, number_of_labels, number_of_values, number_of_label_bytes = \
+            header_struct.unpack(header)
+
+        if magic != MAGIC or version != VERSION:
+            raise Exception('Not an index file: %s' % path)
+
+        values = array(typecode)
+        values.fromfile(input_file, number_of_values)
+        if sys.byteorder != 'little':
+            values.byteswap()
+
+        label_bytes = input_file.read(number_of_label_bytes)
+
+    # splitting no bytes gives one empty label, which is only right if we saved one
+    labels = label_bytes.split('\0') if number_of_labels else []
+
+    return labels, values
+
+
+# index cache
+#
+# cached indexes live in one directory, as <key hash>.<index name>.index files
+#
+#     index_cache = IndexCache('/var/cache/graphs')
+#     topologically_ordered_nodes = index_cache.topological_order_kahns(graph, key)
+#
+# the first call with a key computes the index and saves it. later calls (in any process)
+# with the same key load the saved file
+#
+# the key says which version of the graph this is, and it has to change whenever the
+# graph does. it should be cheap, like file_fingerprint of the file the graph was loaded
+# from, or a version number the caller bumps on every change. without a key we use
+# graph_fingerprint, which always matches the graph's contents (even after it's changed
+# in place) but hashes every node and edge, about as slow as computing a linear time
+# index again
+#
+# time:   O(N)     to load a cached index, plus the key
+#         O(N+M)   plus computing the index, the first time
+# space:  O(N)     the loaded index
+
+import hashlib
+
+from connected_components import ConnectedComponents
+from weighted_directed_acyclic_graph import TopologicalOrderDfs, topological_order_kahns
+
+class IndexCache:
+
+    def __init__(self, directory):
+        self.directory = directory
+
+        if not os.path.isdir(directory):
+            os.makedirs(directory)
+
+    # hash the key, so any string makes a safe file name
+
+    def key_hash(self, graph, key):
+        if key is None:
+            key = graph_fingerprint(graph)
+        return hashlib.sha256(key).hexdigest()
+
+    def index_path(self, graph, key, index_name):
+        return os.path.join(self.directory, '%s.%s.index' % (self.key_hash(graph, key), index_name))
+
+    # build(graph) returns (labels, values)
+
+    def index(self, graph, key, index_name, build):
+
+        path = self.index_path(graph, key, index_name)
+
+        if not os.path.exists(path):
+            labels, values = build(graph)
+            save_index(path, labels, values)
+
+        return load_index(path)
+
+    def topological_order_dfs(self, graph, key=None):
+
+        def build(graph):
+            return TopologicalOrderDfs(graph).order_graph(), ()
+
+        return self.index(graph, key, 'topological_order_dfs', build)[0]
+
+    def topological_order_kahns(self, graph, key=None):
+
+        def build(graph):
+            return topological_order_kahns(graph), ()
+
+        return self.index(graph, key, 'topological_order_kahns', build)[0]
+
+    # the component number of every node in an undirected graph, as a dictionary
+
+    def connected_components(self, graph, key=None):
+
+        def build(graph):
+            connected_components = ConnectedComponents(graph)
+            component_numbers = {}
+
+            labels = list(graph)
+            return labels, [component_numbers.setdefault(connected_components.find_root(label), len(component_numbers))
+                            for label in labels]
+
+        labels, component_numbers = self.index(graph, key, 'connected_components', build)
+
+        return dict(zip(labels, component_numbers))
+
+    # remove every cached index except the ones for the given keys
+
+    def remove_stale(self, *keys):
+
+        key_hashes = set(hashlib.sha256(key).hexdigest() for key in keys)
+
+        for file_name in os.listdir(self.directory):
+            if file_name.endswith('.index') and file_name.split('.', 1)[0] not in key_hashes:
+                os.remove(os.path.join(self.directory, file_name))
+
+
+# notes:
+#
+# a key that doesn't change with the graph loads a stale index, nothing can check it
+# without looking at the whole graph
+# graph fingerprints cost O(N+M), for indexes that cost about the same to compute (like
+# Kahn's algorithm) pass a key
+# labels are hashed with repr, so 'A' and u'A' have different fingerprints
+# labels are read back as byte strings, like compact graph files, and can't contain zero
+# bytes
+# adjacency list order is part of the fingerprint, because orderings depend on it
+# two processes building the same missing index both write it, the last rename wins
+#
+# edge cases
+#     empty graph
+#     graph changed in place between calls (new key, or no key)
+#     partial orderings (Kahn's algorithm on a cyclic graph)
+#     cache directory doesn't exist
+#     the empty label
@@ -0,0 +1,88 @@
+# count the work an algorithm does and time its phases, so we can tell why a query was
+# slow (heap churn, stale pops, a huge frontier)
+
+
+# every algorithm takes an optional stats argument. when it's None (the default) the
+# algorithms only pay for an "if stats is not None" check, and never call into this
+# module. when it's given, the algorithm counts its work with count and maximum, times
+# its phases with start_timer and stop_timer, and calls report once when it returns.
+# we check for None rather than truthiness, so stats objects that define __len__ (an
+# empty counter) or __nonzero__ are still called
+#
+# any object with these methods can be passed as stats, so counters can go straight to
+# a metrics client instead of a Stats object
+#
+#     stats = Stats(callback=lambda algorithm, counters, timers: log(algorithm, counters))
+#     shortest_path_djikstras_priority_queue(graph, 'A', 'G', stats=stats)
+#     stats.counters['stale_pops']
+#
+# counters
+#
+#     nodes_visited     nodes taken from the queue, heap, or ordering and expanded
+#     edges_checked     edges looked at from a visited node
+#     edges_relaxed     edges that gave a shorter distance to their node
+#     queue_max_size    the largest the bfs queue got
+#     heap_pushes       (distance, node) pairs pushed after heapifying the graph
+#     heap_pops         pairs popped from the heap
+#     stale_pops        popped pairs for nodes already visited at a shorter distance
+#     heap_max_size     the largest the heap got
+#     min_scans         searches through the unvisited nodes for the closest one
+#     min_scan_nodes    unvisited nodes looked at by those searches
+#     colorings_tried   colorings checked by the brute force coloring
+#     neighbor_color_checks   neighbor colors looked at while coloring (at most, for the
+#                       constant space coloring)
+#     color_checks      colors tested against the neighbors' colors
+
+from collections import defaultdict
+from timeit import default_timer
+
+class Stats:
+
+    def __init__(self, callback=None):
+        self.counters = defaultdict(int)
+        self.timers = defaultdict(float)
+        self.callback = callback
+
+        self.timer_starts = {}
+
+    def count(self, counter, amount=1):
+        self.counters[counter] += amount
+
+    def maximum(self, counter, value):
+        if value > self.counters[counter]:
+            self.counters[counter] = value
+
+    def start_timer(self, phase):
+        self.timer_starts[phase] = default_timer()
+
+    def stop_timer(self, phase):
+        self.timers[phase] += default_timer() - self.timer_starts.pop(phase)
+
+    def report(self, algorithm):
+        if self.callback:
+            self.callback(algorithm, dict(self.counters), dict(self.timers))
+
+    def reset(self):
+        self.counters.clear()
+        self.timers.clear()
+        self.timer_starts.clear()
+
+
+# a callback that prints each report, for debugging
+
+def print_report(algorithm, counters, timers):
+
+    print algorithm
+
+    for counter, value in sorted(counters.iteritems()):
+        print '\t%-24s %d' % (counter, value)
+
+    for phase, seconds in sorted(timers.iteritems()):
+        print '\t%-24s %.6fs' % (phase, seconds)
+
+
+# notes:
+#
+# stats objects aren't thread safe, use one per thread
+# counters accumulate across calls until reset
+# timers that are started but not stopped (an exception) are dropped by reset
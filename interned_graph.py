@@ -0,0 +1,238 @@
+# run the shortest path searches on integer node ids instead of string labels
+
+
+# the searches in the other modules key their dictionaries and sets on node labels, so
+# every relaxation hashes a string, and every query allocates dictionaries the size of the
+# graph. here the labels are interned once: every label gets a dense id from 0 to N-1 (the
+# compact graph layout from compact_graph.py), and each search keeps its state in lists
+# indexed by id that are allocated once and reused for every query
+#
+# resetting those lists between queries would take N time, so every query gets a new
+# epoch number instead. an entry only counts if its stamp equals the current epoch, so a
+# reset is one increment, and a query only touches the entries of the nodes it reaches
+#
+# results are translated back to labels once, at the end of each query
+
+import heapq
+
+from compact_graph import CompactGraph, build_compact_graph
+
+class SearchState:
+
+    def __init__(self, number_of_nodes):
+        self.distances = [0] * number_of_nodes
+        self.direct_predecessors = [0] * number_of_nodes
+        self.stamps = [0] * number_of_nodes
+        self.visited_stamps = [0] * number_of_nodes
+        self.epoch = 0
+
+    def reset(self):
+        self.epoch += 1
+
+
+# time:   O(N+M) to intern the graph once
+# space:  O(N+M) the compact graph and the search state lists
+
+class InternedShortestPaths:
+
+    def __init__(self, graph, topologically_ordered_nodes=None):
+
+        if isinstance(graph, CompactGraph):
+            self.compact_graph = graph
+        else:
+            self.compact_graph = build_compact_graph(graph)
+
+        self.state = SearchState(self.compact_graph.number_of_nodes)
+
+        # the topological order as ids, and the position of each id in it, for the dag search
+        self.topologically_ordered_ids = None
+        if topologically_ordered_nodes is not None:
+            self.topologically_ordered_ids = [self.compact_graph.node_id(node) for node in topologically_ordered_nodes]
+            self.topological_positions = [0] * self.compact_graph.number_of_nodes
+
+            for position, node_id in enumerate(self.topologically_ordered_ids):
+                self.topological_positions[node_id] = position
+
+    def node_ids(self, start_node, target_node):
+        try:
+            return self.compact_graph.node_id(start_node), self.compact_graph.node_id(target_node)
+        except KeyError:
+            raise Exception('Start or target node not in graph')
+
+    def path_labels(self, start_id, target_id):
+
+        state = self.state
+        labels = self.compact_graph.labels
+
+        # if the target node doesn't have a previous node, there's no shortest path
+        if (target_id == start_id) or (state.stamps[target_id] != state.epoch):
+            return None
+
+        # backtrack the shortest path
+        reverse_shortest_path = []
+        current_id = target_id
+
+        while current_id != start_id:
+            reverse_shortest_path.append(labels[current_id])
+            current_id = state.direct_predecessors[current_id]
+
+        reverse_shortest_path.append(labels[start_id])
+
+        return list(reversed(reverse_shortest_path))
+
+
+    # breadth first search
+    #
+    # the queue is a list we append to and read with an index, since only one thread uses
+    # the search state
+    #
+    # time:   O(N+M)   in the worst case, but only for the nodes reached before the target
+    # space:  O(N)     the queue holds every node in the worst case
+
+    def shortest_path_bfs(self, start_node, target_node):
+
+        start_id, target_id = self.node_ids(start_node, target_node)
+
+        compact_graph = self.compact_graph
+        state = self.state
+        state.reset()
+
+        epoch = state.epoch
+        stamps = state.stamps
+        direct_predecessors = state.direct_predecessors
+
+        stamps[start_id] = epoch
+        queue = [start_id]
+        queue_index = 0
+
+        while queue_index < len(queue):
+            current_id = queue[queue_index]
+            queue_index += 1
+
+            # stop when we reach the target node
+            if current_id == target_id:
+                break
+
+            for neighbor_id in compact_graph.successor_ids(current_id):
+                if stamps[neighbor_id] != epoch:
+                    stamps[neighbor_id] = epoch
+                    direct_predecessors[neighbor_id] = current_id
+                    queue.append(neighbor_id)
+
+        return self.path_labels(start_id, target_id)
+
+
+    # Dijkstra's algorithm (priority queue)
+    #
+    # time:   O((N+M)logN)
+    # space:  O(N+M)   the heap holds a (distance, id) pair for every shorter distance
+
+    def shortest_path_djikstras(self, start_node, target_node):
+
+        start_id, target_id = self.node_ids(start_node, target_node)
+
+        compact_graph = self.compact_graph
+        state = self.state
+        state.reset()
+
+        epoch = state.epoch
+        stamps = state.stamps
+        visited_stamps = state.visited_stamps
+        distances = state.distances
+        direct_predecessors = state.direct_predecessors
+
+        # a node has a distance if its stamp is the current epoch, and it's
+        # visited if its visited stamp is the current epoch
+        stamps[start_id] = epoch
+        distances[start_id] = 0
+        priority_queue = [(0, start_id)]
+
+        while len(priority_queue):
+
+            current_distance, current_id = heapq.heappop(priority_queue)
+
+            # only visit a node once, at its shortest distance
+            if visited_stamps[current_id] == epoch:
+                continue
+            visited_stamps[current_id] = epoch
+
+            # stop when we reach the target node
+            if current_id == target_id:
+                break
+
+            for direct_successor_id, edge_weight in zip(compact_graph.successor_ids(current_id),
+                                                        compact_graph.edge_weights(current_id)):
+
+                distance_from_current_node = current_distance + edge_weight
+
+                if (stamps[direct_successor_id] != epoch) or (distance_from_current_node < distances[direct_successor_id]):
+                    stamps[direct_successor_id] = epoch
+                    distances[direct_successor_id] = distance_from_current_node
+                    direct_predecessors[direct_successor_id] = current_id
+
+                    heapq.heappush(priority_queue, (distance_from_current_node, direct_successor_id))
+
+        return self.path_labels(start_id, target_id)
+
+
+    # shortest path (topological ordering)
+    #
+    # the topological order is translated to ids once, when the object is created
+    #
+    # time:   O(N+M)   in the worst case the start node is first and the target node is last
+    # space:  O(N)
+
+    def shortest_path_dag(self, start_node, target_node):
+
+        if self.topologically_ordered_ids is None:
+            raise Exception('No topological order')
+
+        start_id, target_id = self.node_ids(start_node, target_node)
+
+        compact_graph = self.compact_graph
+        state = self.state
+        state.reset()
+
+        epoch = state.epoch
+        stamps = state.stamps
+        distances = state.distances
+        direct_predecessors = state.direct_predecessors
+
+        topologically_ordered_ids = self.topologically_ordered_ids
+        start_index = self.topological_positions[start_id]
+        target_index = self.topological_positions[target_id]
+
+        stamps[start_id] = epoch
+        distances[start_id] = 0
+
+        for index in xrange(start_index, target_index):
+            current_id = topologically_ordered_ids[index]
+
+            # nodes the start node can't reach can't give shorter paths
+            if stamps[current_id] != epoch:
+                continue
+
+            for direct_successor_id, edge_weight in zip(compact_graph.successor_ids(current_id),
+                                                        compact_graph.edge_weights(current_id)):
+
+                distance_from_current_node = distances[current_id] + edge_weight
+
+                if (stamps[direct_successor_id] != epoch) or (distance_from_current_node < distances[direct_successor_id]):
+                    stamps[direct_successor_id] = epoch
+                    distances[direct_successor_id] = distance_from_current_node
+                    direct_predecessors[direct_successor_id] = current_id
+
+        return self.path_labels(start_id, target_id)
+
+
+# notes:
+#
+# one search state per object, so use one object per thread
+# python lists of ints are faster to index than arrays, but use more memory
+# epochs never need to wrap around in python (ints don't overflow)
+#
+# edge cases
+#     start node and target node are the same
+#     start node or target node aren't in graph
+#     loops, multiple edges
+#     no path
@@ -0,0 +1,240 @@
+# find the k shortest paths from a start node to a target node in a weighted, directed
+# graph with no negative edges. paths are loopless (no node appears twice)
+
+
+# graphs are represented by a dictionary of (string, list) pairs where the string is the
+# node label and the list holds tuples of the node's direct successors (string, int)
+# where the string is the direct successor's label and the int is the edge weight
+
+graph = {
+    'A': [('B', 7), ('C', 2)],
+    'B': [('C', 9)],
+    'C': [('B', 3)],
+}
+
+
+# Yen's algorithm
+#
+# the first path is the shortest path. every later path leaves ("spurs" from) an earlier
+# path at some node: it follows the earlier path's prefix (the root path) to the spur node,
+# then takes the shortest path to the target that doesn't reuse the root path's nodes and
+# doesn't leave the spur node along an edge that an already found path with the same root
+# path takes. those spur paths are candidates, and the shortest candidate is the next path
+#
+# we avoid repeating work between the searches in three ways
+#
+#     the shortest distance from every node to the target is found once, with one
+#     Dijkstra's over the reversed edges. removing nodes and edges can only make
+#     distances longer, so it's a lower bound we use to guide every spur search (A*),
+#     which only expands nodes that could be on a shorter spur path
+#
+#     root path distances are prefix sums of the path they came from, so they're never
+#     searched for again
+#
+#     each path remembers the index it spurred from its parent. nodes before that index
+#     have already been tried as spur nodes with the same root path, so we only spur from
+#     the index on (Lawler's improvement)
+#
+# candidates are kept in a heap of (distance, path, spur index), and a set of found paths
+# drops candidates that were reached from two different paths
+#
+# time:   O(KN(M+NlogN))   where K is the number of paths. every path spurs from at most
+#                          N nodes, and each spur search is a Dijkstra's in the worst
+#                          case. the lower bounds make most spur searches much smaller
+# space:  O(KN+M)          the found paths and candidates hold up to N nodes each, and
+#                          the reversed graph holds every edge
+
+import heapq
+
+def k_shortest_paths(graph, start_node, target_node, k):
+
+    shortest_paths = []
+
+    for distance, path in shortest_paths_in_order(graph, start_node, target_node):
+        if len(shortest_paths) == k:
+            break
+        shortest_paths.append(path)
+
+    return shortest_paths
+
+
+def shortest_paths_in_order(graph, start_node, target_node):
+
+    if (start_node not in graph) or (target_node not in graph):
+        raise Exception('Start or target node not in graph')
+
+    distances_to_target = shortest_distances_to_target(graph, target_node)
+
+    first_path = shortest_path_avoiding(graph, start_node, target_node, distances_to_target, set(), set())
+
+    if not first_path:
+        return
+
+    # (distance, path, index of the first node we spur from)
+    candidates = [(path_distance(graph, first_path), first_path, 0)]
+    found_paths = []
+    seen_paths = set([tuple(first_path)])
+
+    while len(candidates):
+
+        distance, path, first_spur_index = heapq.heappop(candidates)
+        found_paths.append(path)
+
+        yield distance, path
+
+        # prefix sums of the path's edge weights, so root path distances are free
+        root_path_distances = [0]
+        for node, next_node in zip(path, path[1:]):
+            root_path_distances.append(root_path_distances[-1] + edge_weight(graph, node, next_node))
+
+        for spur_index in xrange(first_spur_index, len(path) - 1):
+
+            spur_node = path[spur_index]
+            root_path = path[:spur_index + 1]
+
+            # don't leave the spur node the way any found path with this root path does
+            removed_edges = set(
+                (spur_node, found_path[spur_index + 1]) for found_path in found_paths
+                if found_path[:spur_index + 1] == root_path
+            )
+
+            # don't go back through the root path (the path would have a loop)
+            removed_nodes = set(root_path[:-1])
+
+            spur_path = shortest_path_avoiding(graph, spur_node, target_node, distances_to_target,
+                                               removed_nodes, removed_edges)
+
+            if not spur_path:
+                continue
+
+            candidate_path = root_path[:-1] + spur_path
+
+            if tuple(candidate_path) in seen_paths:
+                continue
+            seen_paths.add(tuple(candidate_path))
+
+            candidate_distance = root_path_distances[spur_index] + path_distance(graph, spur_path)
+            heapq.heappush(candidates, (candidate_distance, candidate_path, spur_index))
+
+
+# shortest distances to the target
+#
+# Dijkstra's algorithm from the target node over the reversed edges
+
+def shortest_distances_to_target(graph, target_node):
+
+    reversed_graph = {node: [] for node in graph}
+
+    for node, direct_successors in graph.iteritems():
+        for direct_successor, edge_weight in direct_successors:
+            reversed_graph[direct_successor].append((node, edge_weight))
+
+    shortest_path_distances = {target_node: 0}
+    priority_queue = [(0, target_node)]
+    visited_nodes = set()
+
+    while len(priority_queue):
+
+        current_node_distance, current_node = heapq.heappop(priority_queue)
+
+        if current_node in visited_nodes:
+            continue
+        visited_nodes.add(current_node)
+
+        for direct_predecessor, edge_weight in reversed_graph[current_node]:
+            distance_from_current_node = current_node_distance + edge_weight
+
+            if distance_from_current_node < shortest_path_distances.get(direct_predecessor, float('inf')):
+                shortest_path_distances[direct_predecessor] = distance_from_current_node
+                heapq.heappush(priority_queue, (distance_from_current_node, direct_predecessor))
+
+    return shortest_path_distances
+
+
+# spur search
+#
+# A* from the start node to the target node that skips the removed nodes and edges. the
+# distances to the target in the full graph never overestimate the distances once nodes
+# and edges are removed, so the first time we pop the target we have its shortest path.
+# nodes that can't reach the target in the full graph can't reach it now, so they're
+# never pushed
+
+def shortest_path_avoiding(graph, start_node, target_node, distances_to_target, removed_nodes, removed_edges):
+
+    if start_node not in distances_to_target:
+        return None
+
+    shortest_path_distances = {start_node: 0}
+    shortest_path_direct_predecessors = {start_node: None}
+
+    priority_queue = [(distances_to_target[start_node], start_node)]
+    visited_nodes = set()
+
+    while len(priority_queue):
+
+        estimated_distance, current_node = heapq.heappop(priority_queue)
+
+        if current_node in visited_nodes:
+            continue
+
+        if current_node == target_node:
+            break
+
+        visited_nodes.add(current_node)
+
+        for direct_successor, edge_weight in graph[current_node]:
+
+            if (direct_successor in removed_nodes) or ((current_node, direct_successor) in removed_edges):
+                continue
+
+            if direct_successor not in distances_to_target:
+                continue
+
+            distance_from_current_node = shortest_path_distances[current_node] + edge_weight
+
+            if distance_from_current_node < shortest_path_distances.get(direct_successor, float('inf')):
+                shortest_path_distances[direct_successor] = distance_from_current_node
+                shortest_path_direct_predecessors[direct_successor] = current_node
+
+                heapq.heappush(priority_queue, (distance_from_current_node + distances_to_target[direct_successor],
+                                                direct_successor))
+
+    if target_node not in shortest_path_direct_predecessors:
+        return None
+
+    # backtrack the shortest path
+    reverse_shortest_path = []
+    current_node = target_node
+
+    while current_node is not None:
+        reverse_shortest_path.append(current_node)
+        current_node = shortest_path_direct_predecessors[current_node]
+
+    return list(reversed(reverse_shortest_path))
+
+
+# the lightest edge between two nodes (there can be multiple edges)
+
+def edge_weight(graph, node, direct_successor):
+    return min(weight for successor, weight in graph[node] if successor == direct_successor)
+
+
+def path_distance(graph, path):
+    return sum(edge_weight(graph, node, next_node) for node, next_node in zip(path, path[1:]))
+
+
+# notes:
+#
+# Eppstein's algorithm is faster but allows paths with loops
+# paths that only differ by which of multiple edges they take are the same path
+# the start node and target node being the same gives the one node path
+# negative edges break the lower bounds (use Johnson's reweighting first)
+#
+# edge cases
+#     less than 2 nodes in graph
+#     start node and target node are the same
+#     start node or target node aren't in graph
+#     loop
+#     multiple edges
+#     fewer than k paths
+#     no path (disconnected or wrong directions)
@@ -0,0 +1,106 @@
+# find the hop distances from many source nodes to every node in an unweighted,
+# undirected graph with one breadth first search per batch of sources
+
+
+# graphs are represented by a dictionary of (string, list) pairs where the string
+# is the node label and the list holds the node's neighbors' labels
+
+graph = {
+    'A': ['B'],
+    'B': ['A', 'C'],
+    'C': ['B'],
+}
+
+
+# multi-source breadth first search (MS-BFS)
+#
+# one bfs per source goes over the same edges again and again. instead, give each source in
+# a batch a bit, and give each node a bitset of the sources that have reached it (seen) and
+# of the sources whose frontier it's in. each level, every frontier node passes its bitset
+# to its neighbors in one operation, and a neighbor keeps the bits it hasn't seen yet. so
+# an edge is looked at once per level for the whole batch instead of once per source
+#
+# python ints are bitsets of any size, so a batch can have 64 sources or many more
+#
+#     seen:       A 0b011  B 0b010  C 0b100        sources B (bit 1) and A (bit 0)
+#     frontier:   A 0b001  C 0b100                 have reached B, etc.
+#
+# time:   O(S/W * (N+M) * D + SN)   where S is the number of sources, W is the batch size,
+#                                   and D is the number of levels. each batch visits every
+#                                   node and edge once per level it's in the frontier, and
+#                                   every distance is written once
+# space:  O(SN)                     the distance matrix. the bitsets take N*W bits per batch
+
+def hop_distances_multi_source_bfs(graph, sources, batch_size=64):
+
+    for source in sources:
+        if source not in graph:
+            raise Exception('Source node not in graph: %s' % source)
+
+    # work on dense ids so the bitsets can live in lists
+    nodes = list(graph)
+    node_ids = {node: node_id for node_id, node in enumerate(nodes)}
+    neighbor_ids = [[node_ids[neighbor] for neighbor in graph[node]] for node in nodes]
+
+    # distances[i][j] is the number of edges from sources[i] to nodes[j],
+    # or None if there's no path
+    distances = [[None] * len(nodes) for source in sources]
+
+    for batch_start in xrange(0, len(sources), batch_size):
+        batch_sources = sources[batch_start:batch_start + batch_size]
+        batch_distances = distances[batch_start:batch_start + batch_size]
+
+        search_batch(neighbor_ids, [node_ids[source] for source in batch_sources], batch_distances)
+
+    return nodes, distances
+
+
+def search_batch(neighbor_ids, source_ids, batch_distances):
+
+    seen = [0] * len(neighbor_ids)
+    frontier = {}
+
+    for bit, source_id in enumerate(source_ids):
+        seen[source_id] |= 1 << bit
+        frontier[source_id] = frontier.get(source_id, 0) | (1 << bit)
+        batch_distances[bit][source_id] = 0
+
+    level = 0
+
+    while frontier:
+        level += 1
+        next_frontier = {}
+
+        for node_id, sources_bits in frontier.iteritems():
+            for neighbor_id in neighbor_ids[node_id]:
+
+                # the sources that reach the neighbor for the first time
+                new_sources_bits = sources_bits & ~seen[neighbor_id]
+
+                if new_sources_bits:
+                    seen[neighbor_id] |= new_sources_bits
+                    next_frontier[neighbor_id] = next_frontier.get(neighbor_id, 0) | new_sources_bits
+
+        # write the distances for every bit set in each new frontier node
+        for node_id, sources_bits in next_frontier.iteritems():
+            while sources_bits:
+                lowest_bit = sources_bits & -sources_bits
+                batch_distances[lowest_bit.bit_length() - 1][node_id] = level
+                sources_bits ^= lowest_bit
+
+        frontier = next_frontier
+
+
+# notes:
+#
+# sources that are close together share the most work, so sort sources by component or
+# by locality before batching
+# bigger batches share more edges but python int operations get slower with width
+# works on directed graphs too (distances along edge directions)
+#
+# edge cases
+#     empty list of sources
+#     the same source twice
+#     source nodes aren't in graph
+#     loops, multiple edges
+#     unreachable nodes (disconnected)
@@ -0,0 +1,341 @@
+# answer hop distance queries between any two nodes in an unweighted, undirected graph
+# in microseconds, from an index built once, instead of running a breadth first search
+# per query
+
+
+# graphs are represented by a dictionary of (string, list) pairs where the string
+# is the node label and the list holds the node's neighbors' labels (or a compact graph
+# from compact_graph.py that stores every edge from both ends)
+
+graph = {
+    'A': ['B'],
+    'B': ['A', 'C'],
+    'C': ['B'],
+}
+
+
+# 2-hop labeling
+#
+# every node gets a label: a list of (hub, distance) pairs for some of the other nodes.
+# the labels are built so that for any two connected nodes, some hub on a shortest path
+# between them is in both labels. then the distance is the smallest
+#
+#     distance(a, hub) + distance(hub, b)
+#
+# over the hubs the two labels share. labels are sorted by hub, so we find the shared
+# hubs by merging the two labels like merge sort does
+#
+# pruned landmark labeling
+#
+# go through the nodes from highest degree to lowest, and run a breadth first search
+# from each one, adding it as a hub to the label of every node the search reaches. but
+# when the labels we've built so far already give a distance to a node that's as short
+# as the search's, don't label it and don't search past it. high degree nodes are on
+# most shortest paths, so the first few searches cover most of the graph and the later
+# ones stop almost immediately
+#
+# every label entry also stores the node before it on the search from its hub. that node
+# wasn't pruned (the search went through it), so it has an entry for the same hub, and
+# following the entries back rebuilds the shortest path from the node to the hub
+#
+# time:   O(N*(N+M)) to build in the worst case, much less when a few nodes have high
+#                    degree. O(L) per distance query, where L is the label size
+# space:  O(N*L)     the labels. L is typically tens to hundreds of entries
+
+from array import array
+from bisect import bisect_left
+from collections import deque
+
+from compact_graph import NODE_ID_TYPECODE, CompactGraph, build_compact_graph
+
+# distances are at most N-1, so this stands in for infinity in the int arrays
+UNREACHED = 0xFFFFFFFF
+
+class PrunedLandmarkLabeling:
+
+    # node ids are ranks in degree order, so sorting labels by hub id sorts them by rank
+    #
+    #     labels:          node labels, by id
+    #     label_offsets:   node i's label entries are at indexes label_offsets[i] to
+    #                      label_offsets[i+1] of hubs, distances and parents
+    #     hubs:            the hub's id
+    #     distances:       the distance from the node to the hub
+    #     parents:         the id of the next node on a shortest path to the hub
+
+    def __init__(self, labels, label_offsets, hubs, distances, parents, node_ids=None):
+        self.labels = labels
+        self.label_offsets = label_offsets
+        self.hubs = hubs
+        self.distances = distances
+        self.parents = parents
+
+        self.number_of_nodes = len(labels)
+        self.number_of_entries = len(hubs)
+
+        # built the first time it's needed, like CompactGraph.node_id
+        self.node_ids = node_ids
+
+    def node_id(self, label):
+        if self.node_ids is None:
+            self.node_ids = {node_label: node_id for node_id, node_label in enumerate(self.labels)}
+
+        return self.node_ids[label]
+
+    def node_ids_for(self, start_node, target_node):
+        try:
+            return self.node_id(start_node), self.node_id(target_node)
+        except KeyError:
+            raise Exception('Start or target node not in graph')
+
+    # merge the two sorted labels, and return the best (distance, hub, start index,
+    # target index), or None if they don't share a hub (the nodes aren't connected)
+
+    def best_hub(self, start_id, target_id):
+
+        hubs = self.hubs
+        distances = self.distances
+
+        start_index, start_end = self.label_offsets[start_id], self.label_offsets[start_id + 1]
+        target_index, target_end = self.label_offsets[target_id], self.label_offsets[target_id + 1]
+
+        best = None
+
+        while (start_index < start_end) and (target_index < target_end):
+            start_hub = hubs[start_index]
+            target_hub = hubs[target_index]
+
+            if start_hub < target_hub:
+                start_index += 1
+            elif start_hub > target_hub:
+                target_index += 1
+            else:
+                distance = distances[start_index] + distances[target_index]
+
+                if (best is None) or (distance < best[0]):
+                    best = (distance, start_hub, start_index, target_index)
+
+                start_index += 1
+                target_index += 1
+
+        return best
+
+    def distance(self, start_node, target_node):
+
+        start_id, target_id = self.node_ids_for(start_node, target_node)
+
+        best = self.best_hub(start_id, target_id)
+
+        return best[0] if best else None
+
+    # time:   O(L + D*logL)   the merge, then a binary search of the label of every node on
+    #                         the path, where D is the distance
+    # space:  O(D)            the path
+
+    def shortest_path(self, start_node, target_node):
+
+        start_id, target_id = self.node_ids_for(start_node, target_node)
+
+        if start_id == target_id:
+            return None
+
+        best = self.best_hub(start_id, target_id)
+
+        if best is None:
+            return None
+
+        distance, hub, start_index, target_index = best
+
+        start_to_hub = self.path_to_hub(start_id, start_index, hub)
+        target_to_hub = self.path_to_hub(target_id, target_index, hub)
+
+        return [self.labels[node_id] for node_id in start_to_hub + list(reversed(target_to_hub))[1:]]
+
+    def path_to_hub(self, node_id, index, hub):
+
+        path = [node_id]
+
+        while node_id != hub:
+            node_id = self.parents[index]
+            path.append(node_id)
+
+            # find the hub in the next node's label
+            index = bisect_left(self.hubs, hub, self.label_offsets[node_id], self.label_offsets[node_id + 1])
+
+        return path
+
+
+# time:   O(N*(N+M)) in the worst case, see above
+# space:  O(N*L + N+M)
+
+def build_pruned_landmark_labeling(graph):
+
+    if isinstance(graph, CompactGraph):
+        compact_graph = graph
+    else:
+        compact_graph = build_compact_graph(graph, weighted=False)
+
+    offsets = compact_graph.offsets
+    number_of_nodes = compact_graph.number_of_nodes
+
+    # rank the nodes by degree, highest first
+    ranked_ids = sorted(xrange(number_of_nodes), key=lambda node_id: offsets[node_id] - offsets[node_id + 1])
+    ranks = [0] * number_of_nodes
+    for rank, node_id in enumerate(ranked_ids):
+        ranks[node_id] = rank
+
+    neighbors = [[ranks[successor_id] for successor_id in compact_graph.successor_ids(node_id)]
+                 for node_id in ranked_ids]
+
+    label_hubs = [[] for _ in xrange(number_of_nodes)]
+    label_distances = [[] for _ in xrange(number_of_nodes)]
+    label_parents = [[] for _ in xrange(number_of_nodes)]
+
+    # the root's label as an array by hub, and the search's distances and parents. they're
+    # allocated once, and only the entries we set are reset after each search
+    root_distances = [UNREACHED] * number_of_nodes
+    search_distances = [UNREACHED] * number_of_nodes
+    search_parents = [0] * number_of_nodes
+
+    for root in xrange(number_of_nodes):
+
+        root_hubs = label_hubs[root]
+        for hub, distance in zip(root_hubs, label_distances[root]):
+            root_distances[hub] = distance
+
+        search_distances[root] = 0
+        search_parents[root] = root
+        reached_nodes = [root]
+        visited_nodes_with_unvisited_neighbors = deque([root])
+
+        while visited_nodes_with_unvisited_neighbors:
+            node = visited_nodes_with_unvisited_neighbors.popleft()
+            distance = search_distances[node]
+
+            # prune if the labels already give a distance this short
+            if any(root_distances[hub] + hub_distance <= distance
+                   for hub, hub_distance in zip(label_hubs[node], label_distances[node])):
+                continue
+
+            label_hubs[node].append(root)
+            label_distances[node].append(distance)
+            label_parents[node].append(search_parents[node])
+
+            for neighbor in neighbors[node]:
+                if search_distances[neighbor] == UNREACHED:
+                    search_distances[neighbor] = distance + 1
+                    search_parents[neighbor] = node
+                    reached_nodes.append(neighbor)
+                    visited_nodes_with_unvisited_neighbors.append(neighbor)
+
+        for node in reached_nodes:
+            search_distances[node] = UNREACHED
+        for hub in root_hubs:
+            root_distances[hub] = UNREACHED
+
+    # flatten the labels into arrays
+    label_offsets = array(NODE_ID_TYPECODE, [0])
+    hubs = array(NODE_ID_TYPECODE)
+    distances = array(NODE_ID_TYPECODE)
+    parents = array(NODE_ID_TYPECODE)
+
+    for node in xrange(number_of_nodes):
+        hubs.extend(label_hubs[node])
+        distances.extend(label_distances[node])
+        parents.extend(label_parents[node])
+        label_offsets.append(len(hubs))
+
+    labels = [compact_graph.labels[node_id] for node_id in ranked_ids]
+
+    return PrunedLandmarkLabeling(labels, label_offsets, hubs, distances, parents)
+
+
+# binary format
+#
+# the same layout as compact graph files, a fixed header followed by little endian
+# arrays, so saved labelings are mapped instead of parsed
+#
+#     header          magic, version, number of nodes, number of label entries
+#     label offsets   N+1 unsigned 32 bit ints
+#     hubs            one unsigned 32 bit int per entry
+#     distances       one unsigned 32 bit int per entry
+#     parents         one unsigned 32 bit int per entry
+#     node offsets    N+1 unsigned 32 bit ints into the node label bytes
+#     node bytes      the utf-8 node labels, back to back
+
+import mmap
+import struct
+
+from compact_graph import MappedArray, MappedLabels, encode_label, write_array
+
+MAGIC = 'GRAPHPLL'
+VERSION = 1
+
+header_struct = struct.Struct('<8sIII')
+
+
+def save_pruned_landmark_labeling(labeling, path):
+
+    encoded_labels = [encode_label(label) for label in labeling.labels]
+    node_label_offsets = array(NODE_ID_TYPECODE, [0])
+    for encoded_label in encoded_labels:
+        node_label_offsets.append(node_label_offsets[-1] + len(encoded_label))
+
+    with open(path, 'wb') as output_file:
+        output_file.write(header_struct.pack(MAGIC, VERSION, labeling.number_of_nodes, labeling.number_of_entries))
+
+        write_array(output_file, labeling.label_offsets, NODE_ID_TYPECODE)
+        write_array(output_file, labeling.hubs, NODE_ID_TYPECODE)
+        write_array(output_file, labeling.distances, NODE_ID_TYPECODE)
+        write_array(output_file, labeling.parents, NODE_ID_TYPECODE)
+        write_array(output_file, node_label_offsets, NODE_ID_TYPECODE)
+
+        for encoded_label in encoded_labels:
+            output_file.write(encoded_label)
+
+
+# time:   O(1)   we only read the header
+# space:  O(1)   the mapped pages are owned by the operating system's page cache
+
+def open_pruned_landmark_labeling(path):
+
+    with open(path, 'rb') as input_file:
+        buffer = mmap.mmap(input_file.fileno(), 0, access=mmap.ACCESS_READ)
+
+    magic, version, number_of_nodes, number_of_entries = header_struct.unpack_from(buffer, 0)
+
+    if magic != MAGIC or version != VERSION:
+        raise Exception('Not a pruned landmark labeling file')
+
+    position = header_struct.size
+
+    arrays = []
+    for length in (number_of_nodes + 1, number_of_entries, number_of_entries, number_of_entries,
+                   number_of_nodes + 1):
+        arrays.append(MappedArray(buffer, position, NODE_ID_TYPECODE, length))
+        position += arrays[-1].itemsize * length
+
+    label_offsets, hubs, distances, parents, node_label_offsets = arrays
+
+    labels = MappedLabels(buffer, node_label_offsets, position)
+
+    return PrunedLandmarkLabeling(labels, label_offsets, hubs, distances, parents)
+
+
+# notes:
+#
+# degree order is a cheap stand in for the best order (by how many shortest paths go
+# through each node), which is too expensive to compute
+# the labeling is exact, there's no approximation, only the order changes the label sizes
+# multiple edges and loops don't change distances, the search ignores them
+# mapped queries unpack each entry they read, so they're slower than in memory ones
+# 32 bit entries limit a labeling to 2^32 label entries
+# labels are read back as byte strings, like compact graph files
+# adding an edge can shorten distances through any hub, so changing the graph means
+# building again
+#
+# edge cases
+#     empty graph
+#     start node and target node are the same (distance 0, no path)
+#     start node or target node aren't in graph
+#     no path (disconnected)
+#     multiple edges, loops
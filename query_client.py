@@ -0,0 +1,156 @@
+# a client for query_server.py, and a load generator that reports latency percentiles
+#
+#     python query_client.py graph.txt --unix /tmp/graph.sock --type dijkstra --clients 16 --queries 1000
+
+
+import json
+import socket
+
+
+class QueryClient:
+
+    def __init__(self, unix_socket_path=None, host='127.0.0.1', port=8765):
+
+        if unix_socket_path:
+            self.socket = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            self.socket.connect(unix_socket_path)
+        else:
+            self.socket = socket.create_connection((host, port))
+
+        self.file = self.socket.makefile('rw')
+
+    def request(self, request):
+        self.file.write(json.dumps(request) + '\n')
+        self.file.flush()
+
+        response = json.loads(self.file.readline())
+
+        if 'error' in response:
+            raise Exception(response['error'])
+
+        return response
+
+    def shortest_path(self, request_type, start_node, target_node):
+        return self.request({'type': request_type, 'start': start_node, 'target': target_node})['path']
+
+    def bfs(self, start_node, target_node):
+        return self.shortest_path('bfs', start_node, target_node)
+
+    def dijkstra(self, start_node, target_node):
+        return self.shortest_path('dijkstra', start_node, target_node)
+
+    def dag_shortest_path(self, start_node, target_node):
+        return self.shortest_path('dag_shortest_path', start_node, target_node)
+
+    def color(self, node):
+        return self.request({'type': 'color', 'node': node})['color']
+
+    def stats(self):
+        return self.request({'type': 'stats'})
+
+    def close(self):
+        self.file.close()
+        self.socket.close()
+
+
+# load generator
+#
+# each client thread keeps one query in flight. queries start from a small set of hot
+# start nodes so concurrent queries can share batches, like real traffic where a few
+# sources are popular
+
+import random
+import threading
+import time
+
+from query_server import latency_percentiles
+
+
+def generate_load(labels, request_type, number_of_clients, queries_per_client, hot_start_nodes=10,
+                  unix_socket_path=None, host='127.0.0.1', port=8765, seed=0):
+
+    generator = random.Random(seed)
+    start_nodes = [generator.choice(labels) for _ in xrange(hot_start_nodes)]
+
+    latencies = []
+    errors = []
+    lock = threading.Lock()
+
+    def run_client(client_seed):
+        client_generator = random.Random(client_seed)
+        client = QueryClient(unix_socket_path, host, port)
+
+        for _ in xrange(queries_per_client):
+            start_node = client_generator.choice(start_nodes)
+            target_node = client_generator.choice(labels)
+
+            start_time = time.time()
+            try:
+                if request_type == 'color':
+                    client.color(target_node)
+                else:
+                    client.shortest_path(request_type, start_node, target_node)
+            except Exception as e:
+                with lock:
+                    errors.append(str(e))
+                continue
+
+            with lock:
+                latencies.append(time.time() - start_time)
+
+        client.close()
+
+    threads = [threading.Thread(target=run_client, args=(seed + client_number,))
+               for client_number in xrange(number_of_clients)]
+
+    start_time = time.time()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.time() - start_time
+
+    return {
+        'queries':             len(latencies),
+        'errors':              len(errors),
+        'queries_per_second':  len(latencies) / elapsed if elapsed else None,
+        'latency_percentiles': latency_percentiles(latencies),
+    }
+
+
+def main():
+
+    import argparse
+    from compact_graph import load_edge_list
+
+    parser = argparse.ArgumentParser(description='Send concurrent queries to a query server')
+    parser.add_argument('edge_list', help='the edge list the server loaded, to pick nodes from')
+    parser.add_argument('--unix', help='unix socket path (default is localhost tcp)')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--type', default='dijkstra', choices=['bfs', 'dijkstra', 'dag_shortest_path', 'color'])
+    parser.add_argument('--clients', type=int, default=8)
+    parser.add_argument('--queries', type=int, default=100, help='queries per client')
+    parser.add_argument('--hot-start-nodes', type=int, default=10)
+    parser.add_argument('--seed', type=int, default=0)
+    arguments = parser.parse_args()
+
+    labels = list(load_edge_list(arguments.edge_list).labels)
+
+    result = generate_load(labels, arguments.type, arguments.clients, arguments.queries,
+                           arguments.hot_start_nodes, arguments.unix, port=arguments.port, seed=arguments.seed)
+
+    print json.dumps(result, indent=2, sort_keys=True)
+
+    client = QueryClient(arguments.unix, port=arguments.port)
+    print json.dumps(client.stats(), indent=2, sort_keys=True)
+    client.close()
+
+
+if __name__ == '__main__':
+    main()
+
+
+# notes:
+#
+# client latencies include the socket round trip, server latencies don't
+# one connection per client thread, clients aren't thread safe
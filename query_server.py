@@ -0,0 +1,331 @@
+# answer shortest path and coloring queries over a local socket for a graph that's loaded
+# once, batching concurrent queries from the same start node into one search
+#
+#     python query_server.py graph.txt --unix /tmp/graph.sock
+#     python query_server.py graph.txt --port 8765 --undirected
+
+
+# protocol
+#
+# clients send one json request per line and get one json response per line, in order
+#
+#     {"type": "dijkstra", "start": "A", "target": "G"}
+#     {"path": ["A", "C", "G"]}
+#
+# types
+#
+#     bfs                 shortest path by number of edges (shortest_paths_bfs)
+#     dijkstra            shortest path by weight (shortest_paths_djikstras)
+#     dag_shortest_path   shortest path by weight in an acyclic graph (shortest_paths)
+#     color               the node's color from a greedy coloring of the graph
+#     stats               latency percentiles and batch sizes for each type
+#
+# errors come back as {"error": "..."}, including for requests that aren't json objects
+
+
+# batching
+#
+# the first query for a (type, start node) pair opens a batch and waits batch_window
+# seconds. queries for the same pair that arrive in the meantime join the batch. then one
+# search from the start node to every target node in the batch answers all of them. so
+# ten clients asking for paths from the same start node cost one search instead of ten
+#
+# searches run on a pool of executor threads, so the threads reading from sockets only
+# parse requests and wait. the searches hold python's global interpreter lock, so more
+# executor threads don't make searches faster, but they keep a slow search from blocking
+# the queries behind it
+
+import json
+import threading
+import time
+from collections import defaultdict, deque
+from multiprocessing.pool import ThreadPool
+
+from coloring import color_graph_greedy
+from compact_graph import load_edge_list, weighted_view, unweighted_view, colored_nodes
+from unweighted_undirected_cyclic_graph import shortest_paths_bfs
+from weighted_directed_acyclic_graph import topological_order_kahns, shortest_paths as topological_shortest_paths
+from weighted_directed_cyclic_graph import shortest_paths_djikstras
+
+query_types = ('bfs', 'dijkstra', 'dag_shortest_path', 'color')
+
+
+class Batch:
+
+    def __init__(self):
+        self.target_nodes = set()
+        self.done = threading.Event()
+        self.paths = None
+        self.error = None
+
+
+class QueryServer:
+
+    def __init__(self, compact_graph, batch_window=0.002, executor_threads=4, latency_samples=10000):
+
+        # the searches index plain dictionaries, which is faster than the views
+        self.weighted_graph = dict(weighted_view(compact_graph))
+        self.unweighted_graph = dict(unweighted_view(compact_graph))
+        self.compact_graph = compact_graph
+
+        self.batch_window = batch_window
+        self.executor = ThreadPool(executor_threads)
+
+        self.open_batches = {}
+        self.batches_lock = threading.Lock()
+
+        # derived once, the first time they're needed
+        self.topologically_ordered_nodes = None
+        self.node_colors = None
+        self.derived_lock = threading.Lock()
+
+        # the most recent latencies and batch sizes for each type
+        self.latencies = defaultdict(lambda: deque(maxlen=latency_samples))
+        self.batch_sizes = defaultdict(lambda: deque(maxlen=latency_samples))
+
+    def handle_request(self, request):
+
+        # valid json can still be a list, a string or a number
+        if not isinstance(request, dict):
+            return {'error': 'Request must be a json object'}
+
+        start_time = time.time()
+        request_type = request.get('type')
+
+        try:
+            if request_type == 'stats':
+                return self.stats()
+
+            if request_type == 'color':
+                response = {'color': self.color(request['node'])}
+            elif request_type in ('bfs', 'dijkstra', 'dag_shortest_path'):
+                response = {'path': self.shortest_path(request_type, request['start'], request['target'])}
+            else:
+                raise Exception('Unknown request type: %s' % request_type)
+
+        except KeyError as e:
+            response = {'error': 'Missing field: %s' % e.args[0]}
+        except Exception as e:
+            response = {'error': str(e)}
+
+        # only known types get latencies, an unknown type can be anything (even a list,
+        # which can't be a dictionary key)
+        if request_type in query_types:
+            self.latencies[request_type].append(time.time() - start_time)
+
+        return response
+
+    def shortest_path(self, request_type, start_node, target_node):
+
+        # check the nodes first so one bad query can't fail the rest of its batch
+        if (start_node not in self.weighted_graph) or (target_node not in self.weighted_graph):
+            raise Exception('Start or target node not in graph')
+
+        key = (request_type, start_node)
+
+        with self.batches_lock:
+            batch = self.open_batches.get(key)
+
+            if batch is None:
+                batch = self.open_batches[key] = Batch()
+
+                # let more queries join the batch, then run it on the executor
+                timer = threading.Timer(self.batch_window, self.executor.apply_async, (self.run_batch, (key, batch)))
+                timer.daemon = True
+                timer.start()
+
+            batch.target_nodes.add(target_node)
+
+        batch.done.wait()
+
+        if batch.error:
+            raise Exception(batch.error)
+
+        return batch.paths[target_node]
+
+    def run_batch(self, key, batch):
+
+        # close the batch so new queries open a new one
+        with self.batches_lock:
+            del self.open_batches[key]
+
+        request_type, start_node = key
+        target_nodes = list(batch.target_nodes)
+        self.batch_sizes[request_type].append(len(target_nodes))
+
+        try:
+            if request_type == 'bfs':
+                batch.paths = shortest_paths_bfs(self.unweighted_graph, start_node, target_nodes)
+            elif request_type == 'dijkstra':
+                batch.paths = {
+                    target_node: path for target_node, (path, distance)
+                    in shortest_paths_djikstras(self.weighted_graph, start_node, target_nodes).iteritems()
+                }
+            else:
+                batch.paths = topological_shortest_paths(self.weighted_graph, self.topological_order(),
+                                                         start_node, target_nodes)
+        except Exception as e:
+            batch.error = str(e)
+
+        batch.done.set()
+
+    def topological_order(self):
+        with self.derived_lock:
+            if self.topologically_ordered_nodes is None:
+                topologically_ordered_nodes = topological_order_kahns(self.weighted_graph)
+
+                if len(topologically_ordered_nodes) != len(self.weighted_graph):
+                    raise Exception('Graph is cyclic')
+
+                self.topologically_ordered_nodes = topologically_ordered_nodes
+
+        return self.topologically_ordered_nodes
+
+    # the coloring treats every edge as undirected, so load the graph with
+    # undirected edges (or both directions of each edge) to color it
+
+    def color(self, node):
+        with self.derived_lock:
+            if self.node_colors is None:
+                nodes = colored_nodes(self.compact_graph)
+                color_graph_greedy(nodes, xrange(1, len(nodes) + 2))
+                self.node_colors = {colored_node.label: colored_node.color for colored_node in nodes}
+
+        if node not in self.node_colors:
+            raise Exception('Node not in graph')
+
+        return self.node_colors[node]
+
+    def stats(self):
+        return {
+            request_type: {
+                'count':              len(latencies),
+                'latency_percentiles': latency_percentiles(latencies),
+                'mean_batch_size':    mean(self.batch_sizes.get(request_type)),
+            }
+            for request_type, latencies in self.latencies.items()
+        }
+
+    def close(self):
+        self.executor.close()
+        self.executor.join()
+
+
+# nearest rank percentiles, in milliseconds. the pth percentile is the smallest latency
+# that's at least as big as p percent of them, the ceil(p/100 * n)th one
+#
+# time:   O(nlogn)   the sort
+# space:  O(n)
+
+import math
+
+def latency_percentiles(latencies, percentiles=(50, 90, 99, 99.9)):
+
+    sorted_latencies = sorted(latencies)
+
+    if not sorted_latencies:
+        return {}
+
+    return {
+        str(percentile): 1000 * sorted_latencies[max(int(math.ceil(len(sorted_latencies) * percentile / 100.0)) - 1, 0)]
+        for percentile in percentiles
+    }
+
+
+def mean(values):
+    return float(sum(values)) / len(values) if values else None
+
+
+# sockets
+#
+# every connection gets a thread that reads requests one line at a time
+
+import SocketServer
+
+class QueryRequestHandler(SocketServer.StreamRequestHandler):
+
+    def handle(self):
+        for line in iter(self.rfile.readline, ''):
+            if not line.strip():
+                continue
+
+            try:
+                response = self.server.query_server.handle_request(json.loads(line))
+            except ValueError:
+                response = {'error': 'Invalid json'}
+
+            self.wfile.write(json.dumps(response) + '\n')
+            self.wfile.flush()
+
+
+class ThreadingTCPQueryServer(SocketServer.ThreadingMixIn, SocketServer.TCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+class ThreadingUnixQueryServer(SocketServer.ThreadingMixIn, SocketServer.UnixStreamServer):
+    daemon_threads = True
+
+
+def serve(query_server, unix_socket_path=None, host='127.0.0.1', port=8765):
+
+    if unix_socket_path:
+        socket_server = ThreadingUnixQueryServer(unix_socket_path, QueryRequestHandler)
+    else:
+        socket_server = ThreadingTCPQueryServer((host, port), QueryRequestHandler)
+
+    socket_server.query_server = query_server
+    return socket_server
+
+
+def main():
+
+    import argparse
+    import os
+
+    parser = argparse.ArgumentParser(description='Serve graph queries over a local socket')
+    parser.add_argument('edge_list', help='edge list file, "source target [weight]" per line')
+    parser.add_argument('--undirected', action='store_true', help='add every edge in both directions')
+    parser.add_argument('--unix', help='unix socket path (default is localhost tcp)')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--batch-window', type=float, default=0.002, help='seconds a batch stays open')
+    parser.add_argument('--executor-threads', type=int, default=4)
+    arguments = parser.parse_args()
+
+    compact_graph = load_edge_list(arguments.edge_list, directed=not arguments.undirected)
+    query_server = QueryServer(compact_graph, arguments.batch_window, arguments.executor_threads)
+
+    if arguments.unix and os.path.exists(arguments.unix):
+        os.remove(arguments.unix)
+
+    socket_server = serve(query_server, arguments.unix, port=arguments.port)
+    print 'serving %d nodes and %d edges on %s' % (compact_graph.number_of_nodes, compact_graph.number_of_edges,
+                                                   arguments.unix or 'localhost:%d' % arguments.port)
+
+    try:
+        socket_server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        socket_server.server_close()
+        query_server.close()
+
+
+if __name__ == '__main__':
+    main()
+
+
+# notes:
+#
+# asyncio isn't available in python 2, so connections use threads (SocketServer)
+# a process pool attached to a shared graph (shared_graph_store.py) would run searches
+# in parallel, at the cost of pickling the paths back
+# batches only share a start node, not targets (a query for the same pair twice in one
+# batch is answered once)
+# the batch window adds its length to every query's latency
+#
+# edge cases
+#     start node or target node aren't in graph
+#     cyclic graph for dag_shortest_path
+#     invalid json, requests that aren't objects, unknown types, missing fields
+#     clients that disconnect mid request
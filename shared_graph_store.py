@@ -0,0 +1,113 @@
+# share one copy of a graph between worker processes without pickling or copying it
+
+
+# passing a graph dictionary to a process pool pickles it into every worker, so memory
+# grows with the number of workers. instead we write the graph once, in the binary
+# compact graph format from compact_graph.py, to a named block of shared memory. workers
+# attach to it by name and map it read only, so they all read the same physical pages
+# and memory stays flat as we add workers
+#
+# shared memory blocks are files in /dev/shm (the same place posix shm_open puts them).
+# where /dev/shm doesn't exist we fall back to the temporary directory, which is still
+# shared between processes through the page cache
+#
+#     name = share_compact_graph(build_compact_graph(graph))
+#
+#     # in each worker
+#     graph = weighted_view(attach_shared_graph(name))
+#     shortest_path_djikstras_priority_queue(graph, 'A', 'G')
+#
+#     # when every worker is done
+#     unlink_shared_graph(name)
+#
+# the attached compact graph works with the views and colored_nodes from compact_graph.py,
+# so shortest_path_bfs, both Dijkstra's functions, the topological orderings,
+# shortest_path, and the coloring functions can all use it. colored_nodes builds a node
+# object per node in each worker though, so workers that color should use
+# color_compact_graph, which colors from the shared arrays
+#
+# workers find node ids with a binary search of the compact graph's sorted labels, which
+# are in the shared block too, so no worker builds its own label dictionary
+
+import os
+import tempfile
+import uuid
+
+from compact_graph import save_compact_graph, open_compact_graph
+
+SHARED_MEMORY_DIRECTORY = '/dev/shm'
+
+
+def shared_graph_path(name):
+
+    if os.path.sep in name:
+        raise Exception('Shared graph names can\'t contain %s' % os.path.sep)
+
+    if os.path.isdir(SHARED_MEMORY_DIRECTORY):
+        return os.path.join(SHARED_MEMORY_DIRECTORY, name)
+
+    return os.path.join(tempfile.gettempdir(), name)
+
+
+# time:   O(N+M)   we write every node and edge once
+# space:  O(N+M)   in shared memory, the process doesn't keep a copy
+
+def share_compact_graph(compact_graph, name=None):
+
+    if name is None:
+        name = 'graph-%s' % uuid.uuid4().hex
+
+    path = shared_graph_path(name)
+
+    # write to a temporary name and rename it, so workers never attach to half a graph
+    temporary_path = '%s.%d.tmp' % (path, os.getpid())
+    save_compact_graph(compact_graph, temporary_path)
+    os.rename(temporary_path, path)
+
+    return name
+
+
+# time:   O(1)   we only map the block and read the header
+# space:  O(1)   the pages belong to the shared memory block
+
+def attach_shared_graph(name):
+
+    try:
+        return open_compact_graph(shared_graph_path(name))
+    except (IOError, OSError):
+        raise Exception('No shared graph named %s' % name)
+
+
+# removing the name doesn't free the memory until every attached process is done with
+# it, so it's safe to unlink while workers are still running
+
+def unlink_shared_graph(name):
+    os.remove(shared_graph_path(name))
+
+
+# process pools
+#
+# attach once per worker process (not once per task) by passing attach_worker as the
+# pool's initializer. tasks then read the graph from worker_graph
+#
+#     pool = multiprocessing.Pool(8, initializer=attach_worker, initargs=(name,))
+
+worker_graph = None
+
+def attach_worker(name):
+    global worker_graph
+    worker_graph = attach_shared_graph(name)
+
+
+# notes:
+#
+# shared graphs are read only, write a new block and switch names to change a graph
+# /dev/shm is limited to half the machine's memory by default
+# blocks outlive the processes that made them until they're unlinked (or the machine
+# restarts)
+# multiprocessing.shared_memory (python 3.8) does the same with a different name format
+#
+# edge cases
+#     empty graph
+#     attaching to a name that doesn't exist
+#     unlinking while workers are attached
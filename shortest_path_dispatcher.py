@@ -0,0 +1,176 @@
+# find the shortest path from a start node to a target node in any graph, using the
+# fastest algorithm that's correct for the graph
+
+
+# graphs are either weighted and directed, a dictionary of (string, list) pairs where the
+# list holds (string, int) tuples of direct successors and edge weights, or unweighted, a
+# dictionary of (string, list) pairs where the list holds neighbors' labels
+
+graph = {
+    'A': [('B', 7)],
+    'B': [('A', 3), ('C', 9)],
+    'C': [],
+}
+
+
+# choosing an algorithm
+#
+# we look at every edge once to find the properties below (and anything the algorithm
+# needs, like a topological ordering), then pick the first algorithm that fits
+#
+#     unweighted, or every weight   shortest_path_bfs                        O(N+M)
+#     equal and not negative
+#     negative edges, acyclic       shortest_path (topological ordering)     O(N+M)
+#     negative edges, cyclic        shortest_path_spfa                       O(NM)
+#     acyclic                       shortest_path (topological ordering)     O(N+M)
+#     small integer weights         shortest_path_dials                      O(N*C+M)
+#     anything else                 shortest_path_djikstras_priority_queue   O((N+M)logN)
+#
+# shortest_path_djikstras is never picked, it's O(N^2)
+#
+# explain_shortest_path(graph) returns the properties and the chosen algorithm
+#
+# time:   O(N+M)   to find the properties, then the chosen algorithm's time
+# space:  O(N+M)   the properties hold an unweighted copy of graphs with equal weights
+#                  and a topological ordering of acyclic graphs
+
+from unweighted_undirected_cyclic_graph import shortest_path_bfs
+from weighted_directed_acyclic_graph import topological_order_kahns, shortest_path as topological_shortest_path
+from weighted_directed_cyclic_graph import shortest_path_djikstras_priority_queue, shortest_path_dials
+from weighted_directed_cyclic_graph_negative_edges import shortest_path_spfa
+
+# the largest edge weight we use Dial's algorithm for
+MAX_SMALL_INTEGER_WEIGHT = 1000
+
+class GraphProperties:
+
+    def __init__(self, graph):
+
+        self.number_of_nodes = len(graph)
+        self.number_of_edges = sum(len(edges) for edges in graph.itervalues())
+
+        self.weighted = any(isinstance(edge, tuple) for edges in graph.itervalues() for edge in edges)
+
+        weights = set()
+        if self.weighted:
+            weights = set(edge_weight for edges in graph.itervalues() for direct_successor, edge_weight in edges)
+
+        self.equal_weights = len(weights) <= 1
+        self.negative_edges = any(weight < 0 for weight in weights)
+        self.max_weight = max(weights) if weights else None
+        self.small_integer_weights = all(
+            isinstance(weight, (int, long)) and 0 <= weight <= MAX_SMALL_INTEGER_WEIGHT for weight in weights
+        )
+
+        # Kahn's algorithm leaves out every node in or after a cycle
+        self.topologically_ordered_nodes = None
+        self.acyclic = False
+
+        if self.weighted:
+            topologically_ordered_nodes = topological_order_kahns(graph)
+            self.acyclic = len(topologically_ordered_nodes) == len(graph)
+
+            if self.acyclic:
+                self.topologically_ordered_nodes = topologically_ordered_nodes
+
+        # bfs needs neighbors' labels, not (label, weight) tuples
+        self.unweighted_graph = graph
+        if self.weighted and self.equal_weights and not self.negative_edges:
+            self.unweighted_graph = {
+                node: [direct_successor for direct_successor, edge_weight in edges]
+                for node, edges in graph.iteritems()
+            }
+
+        self.algorithm = self.choose_algorithm()
+
+    def choose_algorithm(self):
+
+        if (not self.weighted) or (self.equal_weights and not self.negative_edges):
+            return 'shortest_path_bfs'
+
+        if self.acyclic:
+            return 'shortest_path'
+
+        if self.negative_edges:
+            return 'shortest_path_spfa'
+
+        if self.small_integer_weights:
+            return 'shortest_path_dials'
+
+        return 'shortest_path_djikstras_priority_queue'
+
+    def __repr__(self):
+        return ('<GraphProperties %s: nodes=%d edges=%d weighted=%s equal_weights=%s negative_edges=%s '
+                'acyclic=%s small_integer_weights=%s max_weight=%s>' % (
+                    self.algorithm, self.number_of_nodes, self.number_of_edges, self.weighted,
+                    self.equal_weights, self.negative_edges, self.acyclic, self.small_integer_weights,
+                    self.max_weight))
+
+
+def explain_shortest_path(graph):
+    return GraphProperties(graph)
+
+
+def dispatch_shortest_path(graph, properties, start_node, target_node):
+
+    if (start_node not in graph) or (target_node not in graph):
+        raise Exception('Start or target node not in graph')
+
+    algorithm = properties.algorithm
+
+    if algorithm == 'shortest_path_bfs':
+        return shortest_path_bfs(properties.unweighted_graph, start_node, target_node)
+
+    if algorithm == 'shortest_path':
+        return topological_shortest_path(graph, properties.topologically_ordered_nodes, start_node, target_node)
+
+    if algorithm == 'shortest_path_spfa':
+        return shortest_path_spfa(graph, start_node, target_node)
+
+    if algorithm == 'shortest_path_dials':
+        return shortest_path_dials(graph, start_node, target_node, properties.max_weight)
+
+    return shortest_path_djikstras_priority_queue(graph, start_node, target_node)
+
+
+# looks at the graph again on every call, so a graph changed in place always gets the
+# right algorithm
+
+def shortest_path(graph, start_node, target_node):
+    return dispatch_shortest_path(graph, explain_shortest_path(graph), start_node, target_node)
+
+
+# many queries on one graph
+#
+#     dispatcher = ShortestPathDispatcher(graph)
+#     dispatcher.shortest_path('A', 'G')
+#
+# keeps the properties between queries, so only the first one pays O(N+M) to find them.
+# the properties live as long as the dispatcher, and after changing the graph call
+# refresh() so the next query looks at it again
+
+class ShortestPathDispatcher:
+
+    def __init__(self, graph):
+        self.graph = graph
+        self.refresh()
+
+    def refresh(self):
+        self.properties = explain_shortest_path(self.graph)
+
+    def shortest_path(self, start_node, target_node):
+        return dispatch_shortest_path(self.graph, self.properties, start_node, target_node)
+
+
+# notes:
+#
+# a dispatcher's graph changed without refresh() can get a wrong algorithm
+# graphs with no edges count as unweighted
+# weights that are equal and negative need SPFA (any cycle is a negative cycle)
+#
+# edge cases
+#     empty graph
+#     start node or target node aren't in graph
+#     all weights equal, all weights 0
+#     float weights (never Dial's algorithm)
+#     negative edges with and without cycles
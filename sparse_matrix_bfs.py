@@ -0,0 +1,129 @@
+# find the shortest path from a start node to a target node in an unweighted graph by
+# expanding whole bfs levels at once with sparse matrix operations (numpy and scipy)
+
+
+# graphs are represented by a dictionary of (string, list) pairs where the string
+# is the node label and the list holds the node's neighbors' labels
+
+graph = {
+    'A': ['B'],
+    'B': ['A', 'C'],
+    'C': ['B'],
+}
+
+
+# breadth first search (linear algebra)
+#
+# convert the graph to a sparse adjacency matrix once. a bfs level is then a vector with a
+# 1 for every frontier node, and multiplying it by the transposed adjacency matrix counts
+# each node's edges from the frontier. the nodes with a count above 0 that don't have a
+# level yet are the next frontier. every level is one sparse matrix-vector product and a
+# few vector operations, instead of a trip through the interpreter per node and edge
+#
+# we only store each node's level, not its previous node. to backtrack the shortest path
+# we go from the target node to any node with an edge to it one level closer to the start
+#
+# time:   O(N+M)   to build the matrix once
+#         O(D(N+M))   per query where D is the number of levels. every product looks at the
+#                     nonzero entries and every vector operation is N, but both run in
+#                     compiled code
+# space:  O(N+M)   the matrix holds every edge, and the vectors hold every node
+
+import numpy
+import scipy.sparse
+
+class SparseMatrixBfs:
+
+    def __init__(self, graph):
+        self.nodes = list(graph)
+        self.node_ids = {node: node_id for node_id, node in enumerate(self.nodes)}
+
+        rows = []
+        columns = []
+
+        for node, neighbors in graph.iteritems():
+            for neighbor in neighbors:
+                rows.append(self.node_ids[node])
+                columns.append(self.node_ids[neighbor])
+
+        number_of_nodes = len(self.nodes)
+        adjacency_matrix = scipy.sparse.csr_matrix(
+            (numpy.ones(len(rows), dtype=numpy.int32), (rows, columns)),
+            shape=(number_of_nodes, number_of_nodes))
+
+        # row j of the transposed matrix holds the nodes with an edge to node j
+        self.incoming_matrix = adjacency_matrix.transpose().tocsr()
+
+    def levels(self, start_node, target_node=None):
+
+        if start_node not in self.node_ids:
+            raise Exception('Start or target node not in graph')
+
+        start_id = self.node_ids[start_node]
+        target_id = self.node_ids.get(target_node)
+
+        # -1 means the node hasn't been reached yet
+        levels = numpy.full(len(self.nodes), -1, dtype=numpy.int32)
+        levels[start_id] = 0
+
+        frontier = numpy.zeros(len(self.nodes), dtype=numpy.int32)
+        frontier[start_id] = 1
+
+        level = 0
+
+        while frontier.any():
+
+            # stop when we reach the target node
+            if (target_id is not None) and (levels[target_id] >= 0):
+                break
+
+            level += 1
+
+            # count the edges to each node from the frontier, and keep the unreached nodes
+            next_frontier = (self.incoming_matrix.dot(frontier) > 0) & (levels < 0)
+
+            levels[next_frontier] = level
+            frontier = next_frontier.astype(numpy.int32)
+
+        return levels
+
+    def shortest_path_bfs(self, start_node, target_node):
+
+        if (start_node not in self.node_ids) or (target_node not in self.node_ids):
+            raise Exception('Start or target node not in graph')
+
+        levels = self.levels(start_node, target_node)
+
+        current_id = self.node_ids[target_node]
+
+        # if the target node wasn't reached (or is the start node), there's no shortest path
+        if levels[current_id] <= 0:
+            return None
+
+        # backtrack the shortest path through nodes one level closer each step
+        incoming_matrix = self.incoming_matrix
+        reverse_shortest_path = [self.nodes[current_id]]
+
+        while levels[current_id] > 0:
+            direct_predecessors = incoming_matrix.indices[incoming_matrix.indptr[current_id]:incoming_matrix.indptr[current_id + 1]]
+            current_id = next(direct_predecessor for direct_predecessor in direct_predecessors
+                              if levels[direct_predecessor] == levels[current_id] - 1)
+            reverse_shortest_path.append(self.nodes[current_id])
+
+        return list(reversed(reverse_shortest_path))
+
+
+# notes:
+#
+# levels with only a few nodes cost N for the vector operations, a sparse frontier vector
+# or a switch to the queue based bfs (direction optimizing bfs) would fix that
+# a dense matrix of frontier columns would run many starts at once
+# works on directed graphs too (edges are followed in their direction)
+# when there are multiple shortest paths, the path can differ from shortest_path_bfs
+#
+# edge cases
+#     empty graph
+#     start node and target node are the same
+#     start node or target node aren't in graph
+#     loops, multiple edges
+#     no path (disconnected)
@@ -0,0 +1,204 @@
+# legally color an unweighted, undirected graph that's too big for memory using D+1 or
+# fewer colors where D is the maximum degree, keeping only the colors in memory and
+# reading the edges from disk
+
+
+# graphs are represented by an edge stream file: the number of nodes, then every edge as
+# a pair of integer node ids (0 to N-1), sorted by the first id. undirected edges are
+# stored once from each end, so each node's edges are all in one run of the file
+#
+#     header   magic, version, number of nodes
+#     edges    (source id, target id) pairs of little endian unsigned 32 bit ints
+#
+# the edges of load_edge_list(path, directed=False) from compact_graph.py are already
+# sorted this way, so save_edge_stream writes them out. edge lists bigger than memory
+# can be sorted on disk first (like sort -n -k1,1)
+
+import struct
+import sys
+from array import array
+
+from compact_graph import NODE_ID_TYPECODE
+
+MAGIC = 'GRAPHEDG'
+VERSION = 1
+
+header_struct = struct.Struct('<8sII')
+
+
+def write_edge_stream(path, number_of_nodes, edges, block_size=1 << 16):
+
+    with open(path, 'wb') as output_file:
+        output_file.write(header_struct.pack(MAGIC, VERSION, number_of_nodes))
+
+        # write blocks of edges instead of one edge at a time
+        block = array(NODE_ID_TYPECODE)
+
+        for source, target in edges:
+            block.append(source)
+            block.append(target)
+
+            if len(block) >= block_size:
+                write_block(output_file, block)
+                block = array(NODE_ID_TYPECODE)
+
+        write_block(output_file, block)
+
+
+def write_block(output_file, block):
+    if sys.byteorder != 'little':
+        block.byteswap()
+    block.tofile(output_file)
+
+
+def save_edge_stream(compact_graph, path):
+
+    def edges():
+        for source in xrange(compact_graph.number_of_nodes):
+            for target in compact_graph.successor_ids(source):
+                yield source, target
+
+    write_edge_stream(path, compact_graph.number_of_nodes, edges())
+
+
+# read the edges in blocks of about block_size bytes, so the disk only sees large
+# sequential reads, and yield each block as an array of alternating source and target ids
+
+def read_edge_stream(path, block_size=1 << 24):
+
+    input_file = open(path, 'rb')
+
+    magic, version, number_of_nodes = header_struct.unpack(input_file.read(header_struct.size))
+
+    if magic != MAGIC or version != VERSION:
+        input_file.close()
+        raise Exception('Not an edge stream file')
+
+    # whole edges only, so a block never ends between a source and its target
+    edge_size = 2 * array(NODE_ID_TYPECODE).itemsize
+    block_size = max(block_size // edge_size, 1) * edge_size
+
+    def blocks():
+        with input_file:
+            for data in iter(lambda: input_file.read(block_size), ''):
+                block = array(NODE_ID_TYPECODE)
+                block.fromstring(data)
+                if sys.byteorder != 'little':
+                    block.byteswap()
+                yield block
+
+    return number_of_nodes, blocks()
+
+
+# greedy (semi-streaming)
+#
+# the same greedy coloring as color_graph_greedy, going through the nodes in id order.
+# the edges are sorted by source, so one sequential pass reaches each node's edges
+# together, right when it's the node's turn. its neighbors with smaller ids are already
+# colored, so the colors array has everything the greedy choice needs. a node's illegal
+# colors come from at most D neighbors, so its first legal color is at most D+1
+#
+# nodes with no edges aren't in the stream, they get the first color at the end
+#
+# colors are numbers from 1 to D+1, in an array indexed by node id (0 means not colored
+# yet). map them to any D+1 colors with colors[node_color - 1]
+#
+# time:   O(N+M)   one pass over the edges, and at most one more color check than the
+#                  number of illegal colors for each node
+# space:  O(N)     4 bytes per node for the colors array, plus one block of edges and the
+#                  illegal colors of one node. the edges are never all in memory
+
+def color_edge_stream(path, block_size=1 << 24, stats=None):
+
+    number_of_nodes, blocks = read_edge_stream(path, block_size)
+
+    node_colors = array(NODE_ID_TYPECODE, [0]) * number_of_nodes
+
+    def color_node(node_id, illegal_colors):
+        color = 1
+        while color in illegal_colors:
+            color += 1
+        node_colors[node_id] = color
+
+        if stats is not None:
+            stats.count('nodes_visited')
+            stats.count('color_checks', color)
+
+    current_node_id = None
+    illegal_colors = set()
+
+    for block in blocks:
+
+        if stats is not None:
+            stats.count('blocks_read')
+            stats.count('edges_read', len(block) // 2)
+
+        for index in xrange(0, len(block), 2):
+            source, target = block[index], block[index + 1]
+
+            # the previous node's edges are done, color it
+            if source != current_node_id:
+                if current_node_id is not None:
+                    if source < current_node_id:
+                        raise Exception('Edge stream not sorted by source')
+                    color_node(current_node_id, illegal_colors)
+
+                current_node_id = source
+                illegal_colors = set()
+
+            if source == target:
+                raise Exception('Legal coloring impossible for node with loop: %d' % source)
+
+            # neighbors with bigger ids aren't colored yet (0)
+            if node_colors[target]:
+                illegal_colors.add(node_colors[target])
+
+    if current_node_id is not None:
+        color_node(current_node_id, illegal_colors)
+
+    # nodes with no edges
+    for node_id in xrange(number_of_nodes):
+        if not node_colors[node_id]:
+            node_colors[node_id] = 1
+
+    if stats is not None:
+        stats.report('color_edge_stream')
+
+    return node_colors
+
+
+# check the coloring with one more pass over the edges
+#
+# time:   O(M)
+# space:  O(1)   plus one block of edges
+
+def is_edge_stream_legally_colored(path, node_colors, block_size=1 << 24):
+
+    number_of_nodes, blocks = read_edge_stream(path, block_size)
+
+    for block in blocks:
+        for index in xrange(0, len(block), 2):
+            if node_colors[block[index]] == node_colors[block[index + 1]]:
+                return False
+
+    return True
+
+
+# notes:
+#
+# the colors array could be 1 or 2 bytes per node when D+1 is small enough
+# a node's edges out of order (not sorted by source) would be colored as two nodes,
+# so we check the order as we go
+# ordering nodes by degree (or saturation) needs a different order than the file's, so
+# the stream is only good for id order
+# the edge stream has to store both ends of every edge, a stream with one end would need
+# a pass per color to find the colors of neighbors with bigger ids
+# reading with mmap instead of read would let the operating system choose the block size
+#
+# edge cases
+#     empty graph
+#     nodes with no edges
+#     loop
+#     multiple edges
+#     edge stream not sorted by source
+#     blocks that end in the middle of a node's edges
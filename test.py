@@ -1,10 +1,28 @@
+import os
 import random
+import shutil
+import tempfile
+import time
 from collections import defaultdict
 
 from coloring import Node, color_graph_brute_force, color_graph_greedy_d, color_graph_greedy, color_graph_greedy_constant_space, is_graph_legally_colored
-from weighted_directed_acyclic_graph import TopologicalOrderDfs, topological_order_kahns, shortest_path as topological_shortest_path
-from weighted_directed_cyclic_graph import shortest_path_djikstras, shortest_path_djikstras_priority_queue
-from unweighted_undirected_cyclic_graph import shortest_path_bfs
+from weighted_directed_acyclic_graph import TopologicalOrderDfs, topological_order_kahns, shortest_path as topological_shortest_path, shortest_paths as topological_shortest_paths
+from weighted_directed_cyclic_graph import shortest_path_djikstras, shortest_path_djikstras_priority_queue, settled_nodes_djikstras, nearest_nodes, shortest_paths_djikstras, shortest_path_dials
+from unweighted_undirected_cyclic_graph import shortest_path_bfs, shortest_paths_bfs
+from instrumentation import Stats
+from weighted_directed_cyclic_graph_negative_edges import shortest_path_spfa, shortest_path_distances_spfa, NegativeCycleError, JohnsonsShortestPaths
+from interned_graph import InternedShortestPaths
+from connected_components import ConnectedComponents, shortest_path_bfs_with_components, add_undirected_edge
+from multi_source_bfs import hop_distances_multi_source_bfs
+import shared_graph_store
+from shortest_path_dispatcher import shortest_path as dispatched_shortest_path, explain_shortest_path, ShortestPathDispatcher
+from index_cache import IndexCache
+import implicit_graph
+from graph_partitioning import PartitionedGraph
+from streaming_coloring import save_edge_stream, color_edge_stream, is_edge_stream_legally_colored
+from pruned_landmark_labeling import build_pruned_landmark_labeling, save_pruned_landmark_labeling, open_pruned_landmark_labeling
+from k_shortest_paths import k_shortest_paths, path_distance
+from compact_graph import load_edge_list, build_compact_graph, save_compact_graph, open_compact_graph, weighted_view, unweighted_view, color_compact_graph
 
 
 def build_weighted_directed_graph(nodes, edges):
@@ -111,6 +129,9 @@ add_expected_failure('TopologicalOrderDfs', 'Start or target node not in graph')
 add_expected_failure('shortest_path_bfs', 'Start or target node not in graph')
 add_expected_failure('shortest_path_djikstras', 'Start or target node not in graph')
 add_expected_failure('shortest_path_djikstras_priority_queue', 'Start or target node not in graph')
+add_expected_failure('shortest_path_spfa', 'Start or target node not in graph')
+add_expected_failure('shortest_path_dials', 'Start or target node not in graph')
+add_expected_failure('JohnsonsShortestPaths', 'Start or target node not in graph')
 
 
 test = 'one node'
@@ -122,6 +143,9 @@ add_expected_failure('TopologicalOrderDfs', 'Start or target node not in graph')
 add_expected_failure('shortest_path_bfs', 'Start or target node not in graph')
 add_expected_failure('shortest_path_djikstras', 'Start or target node not in graph')
 add_expected_failure('shortest_path_djikstras_priority_queue', 'Start or target node not in graph')
+add_expected_failure('shortest_path_spfa', 'Start or target node not in graph')
+add_expected_failure('shortest_path_dials', 'Start or target node not in graph')
+add_expected_failure('JohnsonsShortestPaths', 'Start or target node not in graph')
 
 
 test = 'disconnected'
@@ -180,6 +204,8 @@ build_graphs([('A', 'B', -1), ('A', 'C', -3), ('A', 'D', -7), ('B', 'C', -3), ('
               ('D', 'E', -4), ('D', 'F', -9), ('E', 'F', -3), ('F', 'E', -2), ('F', 'G', -9)])
 add_shortest_path_tests('A', 'F', ['A', 'D', 'F'], ['A', 'D', 'E', 'F'])
 directed_cyclic_graphs.add(test)
+add_expected_failure('shortest_path_spfa', 'Negative cycle')
+add_expected_failure('JohnsonsShortestPaths', 'Negative cycle')
 
 
 test = 'loop'
@@ -198,6 +224,8 @@ test = 'negative loop'
 build_graphs([('A', 'B', 4), ('B', 'B', -3), ('B', 'C', 9)])
 add_shortest_path_tests('A', 'C', ['A', 'B', 'C'], ['A', 'B', 'B', 'C'])
 directed_cyclic_graphs.add(test)
+add_expected_failure('shortest_path_spfa', 'Negative cycle')
+add_expected_failure('JohnsonsShortestPaths', 'Negative cycle')
 add_expected_failure('color_graph_brute_force', 'Legal coloring impossible')
 add_expected_failure('color_graph_greedy_d', 'Legal coloring impossible for node with loop')
 add_expected_failure('color_graph_greedy', 'Legal coloring impossible for node with loop')
@@ -434,6 +462,114 @@ for topological_ordering_algorithm in topological_ordering_algorithms:
         pass_(cyclic=test_name in directed_cyclic_graphs)
 
 
+print '\n%s' % 'shortest_paths (many targets)'
+
+for test_name, graph_types in iter(sorted(test_graphs.iteritems())):
+    print '\t%s' % test_name.ljust(20),
+
+    if test_name in directed_cyclic_graphs:
+        print 'skipped'
+        continue
+
+    graph = graph_types['weighted_directed']
+    topologically_ordered_nodes = topological_order_kahns(graph)
+
+    start_node, target_node, shortest_path = shortest_paths[test_name][1]
+
+    if start_node not in graph:
+        print 'skipped'
+        continue
+
+    paths = topological_shortest_paths(graph, topologically_ordered_nodes, start_node, list(graph))
+
+    if any(paths[node] != topological_shortest_path(graph, topologically_ordered_nodes, start_node, node) for node in graph):
+        fail('Not shortest path')
+        continue
+
+    pass_()
+
+
+print '\n%s' % 'IndexCache'
+
+index_cache_directory = tempfile.mkdtemp()
+
+for test_name, graph_types in iter(sorted(test_graphs.iteritems())):
+    print '\t%s' % test_name.ljust(20),
+
+    graph = graph_types['weighted_directed']
+
+    # the first cache builds and saves the index, the second loads it, with
+    # the graph's fingerprint and with a key
+    key = '%s.weighted_directed' % test_name
+
+    for index_key in (None, key):
+        IndexCache(index_cache_directory).topological_order_kahns(graph, index_key)
+
+    if any(IndexCache(index_cache_directory).topological_order_kahns(graph, index_key) != topological_order_kahns(graph)
+           for index_key in (None, key)):
+        fail('Cached ordering doesn\'t match')
+        continue
+
+    # nodes share a cached component number exactly when they're connected
+    undirected_graph = graph_types['unweighted_undirected']
+    component_numbers = IndexCache(index_cache_directory).connected_components(undirected_graph)
+    connected_components = ConnectedComponents(undirected_graph)
+
+    if any((component_numbers[a] == component_numbers[b]) != connected_components.is_connected(a, b)
+           for a in undirected_graph for b in undirected_graph):
+        fail('Cached components don\'t match')
+        continue
+
+    # the same cache has to notice a graph that changed in place
+    index_cache = IndexCache(index_cache_directory)
+    changed_graph = {node: list(edges) for node, edges in graph.iteritems()}
+    index_cache.topological_order_kahns(changed_graph)
+
+    for node in sorted(changed_graph):
+        changed_graph[node].append(('new node', 1))
+    changed_graph['new node'] = []
+
+    # with a key, the caller's new key for the changed graph
+    if index_cache.topological_order_kahns(changed_graph) != topological_order_kahns(changed_graph) or \
+       index_cache.topological_order_kahns(changed_graph, key + '.changed') != topological_order_kahns(changed_graph):
+        fail('Cached ordering of changed graph doesn\'t match')
+        continue
+
+    pass_()
+
+# loading a cached index has to beat computing it again, or the cache can't cut start up
+# time. Kahn's algorithm is linear, so it's the hardest index to beat
+print '\t%s' % 'cached vs computed'.ljust(20),
+
+from graph_generators import generators, build_weighted_directed_graph as build_generated_graph
+
+nodes, edges = generators['layered_dag'](50000)
+large_graph = build_generated_graph(nodes, edges)
+
+index_cache = IndexCache(index_cache_directory)
+index_cache.topological_order_kahns(large_graph, 'layered_dag.50000')
+
+def fastest_time(function, repeat=3):
+    times = []
+    for _ in xrange(repeat):
+        start_time = time.time()
+        function()
+        times.append(time.time() - start_time)
+    return min(times)
+
+cached_time = fastest_time(lambda: index_cache.topological_order_kahns(large_graph, 'layered_dag.50000'))
+computed_time = fastest_time(lambda: topological_order_kahns(large_graph))
+
+if index_cache.topological_order_kahns(large_graph, 'layered_dag.50000') != topological_order_kahns(large_graph):
+    fail('Cached ordering doesn\'t match')
+elif cached_time >= computed_time:
+    fail('Cached ordering slower than computing it: %.4fs vs %.4fs' % (cached_time, computed_time))
+else:
+    pass_()
+
+shutil.rmtree(index_cache_directory)
+
+
 # weighted directed cyclic
 
 test = 'nodes vs weight'
@@ -479,27 +615,136 @@ for djikstras_algorithm in djikstras_algorithms:
         pass_()
 
 
-# unweighted undirected cyclic
+# negative edges
 
-test = 'nodes vs weight'
-add_shortest_path_tests('A', 'G', ['A', 'B', 'D', 'G'], ['A', 'C', 'E', 'F', 'G'])
+negative_edge_algorithms = [
+    shortest_path_spfa,
+    JohnsonsShortestPaths,
+]
 
-test = 'no directed path'
-add_shortest_path_tests('C', 'A', ['C', 'B', 'A'], None)
+for negative_edge_algorithm in negative_edge_algorithms:
+    print '\n%s' % negative_edge_algorithm.__name__
 
-print '\n%s' % 'shortest_path_bfs'
+    for test_name, graph_types in iter(sorted(test_graphs.iteritems())):
+
+        print '\t%s' % test_name.ljust(20),
+
+        graph = graph_types['weighted_directed']
+
+        start_node, target_node, shortest_path = shortest_paths[test_name][1]
+
+        expected_failure = get_expected_failure(test_name, negative_edge_algorithm)
+
+        try:
+            if negative_edge_algorithm is JohnsonsShortestPaths:
+                found_shortest_path = JohnsonsShortestPaths(graph).shortest_path(start_node, target_node)
+            else:
+                found_shortest_path = negative_edge_algorithm(graph, start_node, target_node)
+
+            if found_shortest_path != shortest_path:
+                fail('Not shortest path')
+                continue
+        except Exception as e:
+            verify_expected_failure(expected_failure, e)
+            continue
+        else:
+            if expected_failure:
+                fail('Failed to raise error: %s' % expected_failure[2])
+                continue
+
+        pass_()
+
+print '\n%s' % 'JohnsonsShortestPaths.all_pairs_shortest_distances'
 
 for test_name, graph_types in iter(sorted(test_graphs.iteritems())):
+
     print '\t%s' % test_name.ljust(20),
 
-    graph = graph_types['unweighted_undirected']
+    graph = graph_types['weighted_directed']
+
+    # Bellman-Ford from every source, where any negative cycle it reaches raises
+    try:
+        expected_distances = {start_node: shortest_path_distances_spfa(graph, [start_node])[0] for start_node in graph}
+    except NegativeCycleError:
+        expected_distances = None
+
+    try:
+        johnsons_shortest_paths = JohnsonsShortestPaths(graph)
+        all_pairs_shortest_distances = johnsons_shortest_paths.all_pairs_shortest_distances()
+    except NegativeCycleError:
+        if expected_distances is not None:
+            fail('Negative cycle in graph without one')
+            continue
+        pass_()
+        continue
+
+    if expected_distances is None:
+        fail('Failed to raise error: Negative cycle')
+        continue
+
+    if all_pairs_shortest_distances != expected_distances or \
+       any(johnsons_shortest_paths.shortest_distances(start_node) != expected_distances[start_node]
+           for start_node in graph):
+        fail('Not shortest distances')
+        continue
+
+    pass_()
+
+
+# interned node ids
+
+print '\n%s' % 'InternedShortestPaths.shortest_path_djikstras'
+
+for test_name, graph_types in iter(sorted(test_graphs.iteritems())):
+
+    print '\t%s' % test_name.ljust(20),
+
+    if 'negative' in test_name:
+        print 'skipped'
+        continue
+
+    interned_shortest_paths = InternedShortestPaths(graph_types['weighted_directed'])
 
     start_node, target_node, shortest_path = shortest_paths[test_name][1]
 
-    expected_failure = get_expected_failure(test_name, shortest_path_bfs)
+    expected_failure = get_expected_failure(test_name, shortest_path_djikstras_priority_queue)
 
     try:
-        if shortest_path_bfs(graph, start_node, target_node) != shortest_path:
+        # the second query reuses the search state from the first
+        interned_shortest_paths.shortest_path_djikstras(target_node, start_node)
+        if interned_shortest_paths.shortest_path_djikstras(start_node, target_node) != shortest_path:
+            fail('Not shortest path')
+            continue
+    except Exception as e:
+        verify_expected_failure(expected_failure, e)
+        continue
+    else:
+        if expected_failure:
+            fail('Failed to raise error: %s' % expected_failure[2])
+            continue
+
+    pass_()
+
+print '\n%s' % 'InternedShortestPaths.shortest_path_dag'
+
+for test_name, graph_types in iter(sorted(test_graphs.iteritems())):
+
+    print '\t%s' % test_name.ljust(20),
+
+    if test_name in directed_cyclic_graphs:
+        print 'skipped'
+        continue
+
+    graph = graph_types['weighted_directed']
+
+    interned_shortest_paths = InternedShortestPaths(graph, topological_order_kahns(graph))
+
+    start_node, target_node, shortest_path = shortest_paths[test_name][1]
+
+    expected_failure = get_expected_failure(test_name, topological_order_kahns)
+
+    try:
+        if interned_shortest_paths.shortest_path_dag(start_node, target_node) != shortest_path:
             fail('Not shortest path')
             continue
     except Exception as e:
@@ -512,6 +757,1300 @@ for test_name, graph_types in iter(sorted(test_graphs.iteritems())):
 
     pass_()
 
+
+# Dial's
+
+print '\n%s' % 'shortest_path_dials'
+
+for test_name, graph_types in iter(sorted(test_graphs.iteritems())):
+
+    print '\t%s' % test_name.ljust(20),
+
+    if 'negative' in test_name:
+        print 'skipped'
+        continue
+
+    graph = graph_types['weighted_directed']
+
+    start_node, target_node, shortest_path = shortest_paths[test_name][1]
+
+    expected_failure = get_expected_failure(test_name, shortest_path_dials)
+
+    try:
+        if shortest_path_dials(graph, start_node, target_node) != shortest_path:
+            fail('Not shortest path')
+            continue
+    except Exception as e:
+        verify_expected_failure(expected_failure, e)
+        continue
+    else:
+        if expected_failure:
+            fail('Failed to raise error: %s' % expected_failure[2])
+            continue
+
+    pass_()
+
+
+# dispatcher
+
+print '\n%s' % 'shortest_path (dispatcher)'
+
+dispatched_algorithms = {
+    'a':                  'shortest_path_dials',
+    'b':                  'shortest_path',
+    'bipartite':          'shortest_path_dials',
+    'c':                  'shortest_path_bfs',
+    'complete/nonplanar': 'shortest_path_dials',
+    'cycle':              'shortest_path_dials',
+    'cyclic':             'shortest_path_dials',
+    'disconnected':       'shortest_path_bfs',
+    'empty graph':        'shortest_path_bfs',
+    'leaf':               'shortest_path',
+    'line':               'shortest_path',
+    'loop':               'shortest_path_dials',
+    'multiple edges':     'shortest_path',
+    'negative cyclic':    'shortest_path_spfa',
+    'negative edges':     'shortest_path',
+    'negative loop':      'shortest_path_spfa',
+    'no directed path':   'shortest_path',
+    'nodes vs weight':    'shortest_path',
+    'one node':           'shortest_path_bfs',
+    'star':               'shortest_path',
+    'tree':               'shortest_path',
+    'wheel center':       'shortest_path_dials',
+    'wheel outside':      'shortest_path_dials',
+}
+
+for test_name, graph_types in iter(sorted(test_graphs.iteritems())):
+
+    print '\t%s' % test_name.ljust(20),
+
+    graph = graph_types['weighted_directed']
+
+    start_node, target_node, shortest_path = shortest_paths[test_name][1]
+
+    if explain_shortest_path(graph).algorithm != dispatched_algorithms[test_name]:
+        fail('Wrong algorithm: %s' % explain_shortest_path(graph).algorithm)
+        continue
+
+    # the dispatcher fails the same way as SPFA (negative cycles)
+    expected_failure = get_expected_failure(test_name, shortest_path_spfa)
+
+    try:
+        if dispatched_shortest_path(graph, start_node, target_node) != shortest_path or \
+           ShortestPathDispatcher(graph).shortest_path(start_node, target_node) != shortest_path:
+            fail('Not shortest path')
+            continue
+    except Exception as e:
+        verify_expected_failure(expected_failure, e)
+        continue
+    else:
+        if expected_failure:
+            fail('Failed to raise error: %s' % expected_failure[2])
+            continue
+
+    pass_()
+
+print '\n%s' % 'shortest_path (dispatcher, other graphs)'
+
+for test_name, graph_types in iter(sorted(test_graphs.iteritems())):
+
+    print '\t%s' % test_name.ljust(20),
+
+    start_node, target_node, shortest_path = shortest_paths[test_name][1]
+
+    if (start_node not in graph_types['weighted_directed']) or (target_node not in graph_types['weighted_directed']):
+        print 'skipped'
+        continue
+
+    # unweighted dictionaries always get a breadth first search
+    unweighted_graph = graph_types['unweighted_undirected']
+
+    if explain_shortest_path(unweighted_graph).algorithm != 'shortest_path_bfs' or \
+       dispatched_shortest_path(unweighted_graph, start_node, target_node) != \
+       shortest_path_bfs(unweighted_graph, start_node, target_node):
+        fail('Not breadth first search')
+        continue
+
+    if 'negative' in test_name:
+        pass_()
+        continue
+
+    # float weights on a cyclic graph rule out Dial's algorithm
+    float_graph = {node: [(direct_successor, edge_weight + 0.5) for direct_successor, edge_weight in edges]
+                   for node, edges in graph_types['weighted_directed'].iteritems()}
+
+    properties = explain_shortest_path(float_graph)
+    expected_algorithm = 'shortest_path_djikstras_priority_queue'
+    if len(set(edge_weight for edges in float_graph.itervalues() for direct_successor, edge_weight in edges)) <= 1:
+        expected_algorithm = 'shortest_path_bfs'
+    elif properties.acyclic:
+        expected_algorithm = 'shortest_path'
+
+    if properties.algorithm != expected_algorithm:
+        fail('Wrong algorithm: %s' % properties.algorithm)
+        continue
+
+    found_shortest_path = dispatched_shortest_path(float_graph, start_node, target_node)
+    expected_shortest_path = shortest_path_djikstras_priority_queue(float_graph, start_node, target_node)
+
+    if (found_shortest_path is None) != (expected_shortest_path is None) or \
+       (expected_shortest_path and path_distance(float_graph, found_shortest_path) !=
+                                   path_distance(float_graph, expected_shortest_path)):
+        fail('Not shortest path')
+        continue
+
+    # a dispatcher keeps its algorithm until it's refreshed, the function looks again
+    changed_graph = {node: list(edges) for node, edges in graph_types['weighted_directed'].iteritems()}
+    dispatcher = ShortestPathDispatcher(changed_graph)
+    changed_graph[start_node].append((target_node, -1))
+
+    if explain_shortest_path(changed_graph).algorithm not in ('shortest_path', 'shortest_path_spfa'):
+        fail('Negative edge not noticed')
+        continue
+
+    dispatcher.refresh()
+
+    if dispatcher.properties.algorithm != explain_shortest_path(changed_graph).algorithm:
+        fail('Dispatcher not refreshed')
+        continue
+
+    pass_()
+
+
+# implicit graphs
+
+print '\n%s' % 'implicit_graph.shortest_path_djikstras'
+
+for test_name, graph_types in iter(sorted(test_graphs.iteritems())):
+
+    print '\t%s' % test_name.ljust(20),
+
+    if 'negative' in test_name:
+        print 'skipped'
+        continue
+
+    graph = graph_types['weighted_directed']
+
+    start_node, target_node, shortest_path = shortest_paths[test_name][1]
+
+    # nodes that aren't in the graph have no neighbors, instead of raising
+    found_shortest_path = implicit_graph.shortest_path_djikstras(lambda node: graph.get(node, []),
+                                                                 start_node, target_node)
+
+    # another shortest path is fine when there are multiple
+    if (found_shortest_path is None) != (shortest_path is None) or \
+       (shortest_path and path_distance(graph, found_shortest_path) != path_distance(graph, shortest_path)):
+        fail('Not shortest path')
+        continue
+
+    pass_()
+
+
+# partitioned graphs
+
+print '\n%s' % 'PartitionedGraph'
+
+for test_name, graph_types in iter(sorted(test_graphs.iteritems())):
+
+    print '\t%s' % test_name.ljust(20),
+
+    if 'negative' in test_name:
+        print 'skipped'
+        continue
+
+    graph = graph_types['weighted_directed']
+
+    start_node, target_node, shortest_path = shortest_paths[test_name][1]
+
+    expected_failure = get_expected_failure(test_name, shortest_path_djikstras_priority_queue)
+
+    # partitions of two nodes, so most paths go through shortcuts. two processes compute
+    # the shortcuts in a pool, and have to give the same paths as one
+    try:
+        found_shortest_paths = [
+            PartitionedGraph(graph, partition_size=2, processes=processes).shortest_path(start_node, target_node)
+            for processes in (1, 2)
+        ]
+    except Exception as e:
+        verify_expected_failure(expected_failure, e)
+        continue
+    else:
+        if expected_failure:
+            fail('Failed to raise error: %s' % expected_failure[2])
+            continue
+
+    # another shortest path is fine when there are multiple
+    if any((found_shortest_path is None) != (shortest_path is None) or
+           (shortest_path and (found_shortest_path[0] != start_node or found_shortest_path[-1] != target_node or
+                               path_distance(graph, found_shortest_path) != path_distance(graph, shortest_path)))
+           for found_shortest_path in found_shortest_paths):
+        fail('Not shortest path')
+        continue
+
+    pass_()
+
+print '\n%s' % 'PartitionedGraph.rebuild_partitions'
+
+for test_name, graph_types in iter(sorted(test_graphs.iteritems())):
+
+    print '\t%s' % test_name.ljust(20),
+
+    if 'negative' in test_name:
+        print 'skipped'
+        continue
+
+    graph = graph_types['weighted_directed']
+    partitioned_graph = PartitionedGraph(graph, partition_size=2, processes=1)
+
+    # a shortcut from the last node to every other node, and a new node
+    # in its own partition that reaches the first node
+    changed_graph = {node: list(edges) for node, edges in graph.iteritems()}
+    nodes = sorted(changed_graph)
+
+    if nodes:
+        changed_graph[nodes[-1]].extend((node, 1) for node in nodes[:-1])
+        changed_graph['new node'] = [(nodes[0], 1)]
+
+    new_partition = max(partitioned_graph.partitions.values() or [-1]) + 1
+    changed_partitions = set(partitioned_graph.partitions[node] for node in nodes[-1:])
+
+    partitioned_graph.rebuild_partitions(changed_graph, changed_partitions, {'new node': new_partition} if nodes else None)
+
+    def distance(path):
+        return path_distance(changed_graph, path) if path is not None else None
+
+    # every pair's distance matches plain Dijkstra's algorithm on the changed graph
+    if any(distance(partitioned_graph.shortest_path(start_node, target_node)) !=
+           distance(shortest_path_djikstras_priority_queue(changed_graph, start_node, target_node))
+           for start_node in changed_graph for target_node in changed_graph):
+        fail('Not shortest path')
+        continue
+
+    pass_()
+
+
+# lazy Dijkstra's
+
+def settled_nodes_shortest_path(graph, start_node, target_node):
+
+    if (start_node not in graph) or (target_node not in graph):
+        raise Exception('Start or target node not in graph')
+
+    shortest_path_direct_predecessors = {}
+
+    for node, distance, direct_predecessor in settled_nodes_djikstras(graph, start_node):
+        shortest_path_direct_predecessors[node] = direct_predecessor
+        if node == target_node:
+            break
+
+    if not shortest_path_direct_predecessors.get(target_node):
+        return None
+
+    reverse_shortest_path = []
+    current_node = target_node
+
+    while current_node:
+        reverse_shortest_path.append(current_node)
+        current_node = shortest_path_direct_predecessors.get(current_node)
+
+    return list(reversed(reverse_shortest_path))
+
+def is_in_distance_order(graph, start_node):
+    distances = [distance for node, distance, direct_predecessor in settled_nodes_djikstras(graph, start_node)]
+    return distances == sorted(distances)
+
+print '\n%s' % 'settled_nodes_djikstras'
+
+for test_name, graph_types in iter(sorted(test_graphs.iteritems())):
+
+    print '\t%s' % test_name.ljust(20),
+
+    if 'negative' in test_name:
+        print 'skipped'
+        continue
+
+    graph = graph_types['weighted_directed']
+
+    start_node, target_node, shortest_path = shortest_paths[test_name][1]
+
+    expected_failure = get_expected_failure(test_name, shortest_path_djikstras_priority_queue)
+
+    try:
+        if settled_nodes_shortest_path(graph, start_node, target_node) != shortest_path:
+            fail('Not shortest path')
+            continue
+    except Exception as e:
+        verify_expected_failure(expected_failure, e)
+        continue
+    else:
+        if expected_failure:
+            fail('Failed to raise error: %s' % expected_failure[2])
+            continue
+
+    if not is_in_distance_order(graph, start_node):
+        fail('Not in distance order')
+        continue
+
+    pass_()
+
+
+print '\n%s' % 'nearest_nodes'
+
+for test_name, graph_types in iter(sorted(test_graphs.iteritems())):
+
+    print '\t%s' % test_name.ljust(20),
+
+    if 'negative' in test_name:
+        print 'skipped'
+        continue
+
+    graph = graph_types['weighted_directed']
+
+    start_node, target_node, shortest_path = shortest_paths[test_name][1]
+
+    # there's no target node, so only a missing start node fails
+    expected_failure = (test_name, 'nearest_nodes', 'Start node not in graph') if start_node not in graph else None
+
+    try:
+        all_nearest = nearest_nodes(graph, start_node)
+    except Exception as e:
+        verify_expected_failure(expected_failure, e)
+        continue
+    else:
+        if expected_failure:
+            fail('Failed to raise error: %s' % expected_failure[2])
+            continue
+
+    distances = [distance for node, distance in all_nearest]
+
+    if all_nearest[0] != (start_node, 0) or distances != sorted(distances):
+        fail('Not in distance order')
+        continue
+
+    if nearest_nodes(graph, start_node, k=0) != [] or nearest_nodes(graph, start_node, k=2) != all_nearest[:2] or \
+       nearest_nodes(graph, start_node, max_distance=10) != [pair for pair in all_nearest if pair[1] <= 10] or \
+       nearest_nodes(graph, start_node, is_match=lambda node: node != start_node) != all_nearest[1:]:
+        fail('Wrong nearest nodes')
+        continue
+
+    # stopping at the start node reports stats, without expanding the start node's edges
+    nearest_reports = []
+    stats = Stats(callback=lambda algorithm, counters, timers: nearest_reports.append(counters))
+    nearest_nodes(graph, start_node, k=1, stats=stats)
+
+    if not nearest_reports or defaultdict(int, nearest_reports.pop())['edges_checked'] != 0:
+        fail('Stats not reported when stopped early')
+        continue
+
+    pass_()
+
+print '\n%s' % 'shortest_paths_djikstras (many targets)'
+
+for test_name, graph_types in iter(sorted(test_graphs.iteritems())):
+
+    print '\t%s' % test_name.ljust(20),
+
+    if 'negative' in test_name:
+        print 'skipped'
+        continue
+
+    graph = graph_types['weighted_directed']
+
+    start_node, target_node, shortest_path = shortest_paths[test_name][1]
+
+    expected_failure = get_expected_failure(test_name, shortest_path_djikstras_priority_queue)
+
+    try:
+        paths = shortest_paths_djikstras(graph, start_node, [target_node])
+    except Exception as e:
+        verify_expected_failure(expected_failure, e)
+        continue
+    else:
+        if expected_failure:
+            fail('Failed to raise error: %s' % expected_failure[2])
+            continue
+
+    if paths[target_node][0] != shortest_path:
+        fail('Not shortest path')
+        continue
+
+    # every node within a radius has the same distance as searching for it alone
+    radius = 10
+    nodes_within_radius = shortest_paths_djikstras(graph, start_node, max_distance=radius)
+    distances = dict(nearest_nodes(graph, start_node))
+
+    if sorted(nodes_within_radius) != sorted(node for node, distance in distances.iteritems() if distance <= radius) or \
+       any(distance != distances[node] for node, (path, distance) in nodes_within_radius.iteritems()):
+        fail('Not shortest distances')
+        continue
+
+    pass_()
+
+
+# query server
+
+import json
+import socket
+import threading
+
+from query_server import QueryServer, latency_percentiles, serve
+
+print '\n%s' % 'QueryServer (batching)'
+
+for test_name, graph_types in iter(sorted(test_graphs.iteritems())):
+
+    print '\t%s' % test_name.ljust(20),
+
+    if 'negative' in test_name:
+        print 'skipped'
+        continue
+
+    graph = graph_types['weighted_directed']
+
+    start_node, target_node, shortest_path = shortest_paths[test_name][1]
+
+    # one executor thread, kept busy until every query has joined the batch, so the batch
+    # can't run (and close) early however slowly the threads start
+    query_server = QueryServer(build_compact_graph(graph), batch_window=0, executor_threads=1)
+    executor_released = threading.Event()
+    query_server.executor.apply_async(executor_released.wait)
+
+    query_target_nodes = sorted(set(graph) | set([target_node]))
+    batched_target_nodes = [node for node in query_target_nodes if (start_node in graph) and (node in graph)]
+    responses = {}
+
+    def send_query(query_target_node):
+        responses[query_target_node] = query_server.handle_request(
+            {'type': 'dijkstra', 'start': start_node, 'target': query_target_node})
+
+    threads = [threading.Thread(target=send_query, args=(node,)) for node in query_target_nodes]
+    for thread in threads:
+        thread.start()
+
+    while len(responses) + sum(len(batch.target_nodes) for batch in query_server.open_batches.values()) < \
+          len(query_target_nodes):
+        time.sleep(0.001)
+
+    executor_released.set()
+
+    for thread in threads:
+        thread.join()
+
+    query_server.close()
+    expected_paths = shortest_paths_djikstras(graph, start_node, batched_target_nodes) if batched_target_nodes else {}
+
+    if any(responses[node] != ({'path': expected_paths[node][0]} if node in expected_paths
+                               else {'error': 'Start or target node not in graph'})
+           for node in query_target_nodes):
+        fail('Not shortest path')
+        continue
+
+    # one search answers every query
+    if list(query_server.batch_sizes['dijkstra']) != ([len(batched_target_nodes)] if batched_target_nodes else []):
+        fail('Not batched')
+        continue
+
+    if query_server.stats()['dijkstra']['count'] != len(query_target_nodes):
+        fail('Latencies not recorded')
+        continue
+
+    pass_()
+
+print '\n%s' % 'QueryServer (malformed requests)'
+
+# every request goes over one connection, so a request that killed the connection's
+# thread would fail the requests after it
+graph = test_graphs['line']['weighted_directed']
+start_node, target_node, shortest_path = shortest_paths['line'][1]
+
+query_server = QueryServer(build_compact_graph(graph))
+query_server_directory = tempfile.mkdtemp()
+socket_path = os.path.join(query_server_directory, 'query_server.sock')
+socket_server = serve(query_server, socket_path)
+
+server_thread = threading.Thread(target=socket_server.serve_forever)
+server_thread.daemon = True
+server_thread.start()
+
+client = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+client.settimeout(5)
+client.connect(socket_path)
+client_responses = client.makefile('rb')
+
+for test_name, request, expected_response in [
+    ('invalid json',      'not json',                                 {'error': 'Invalid json'}),
+    ('list',              '[1]',                                      {'error': 'Request must be a json object'}),
+    ('string',            '"dijkstra"',                               {'error': 'Request must be a json object'}),
+    ('unknown type',      '{"type": "flow"}',                         {'error': 'Unknown request type: flow'}),
+    ('list type',         '{"type": [1]}',                            {'error': 'Unknown request type: [1]'}),
+    ('missing field',     '{"type": "dijkstra", "start": "A"}',       {'error': 'Missing field: target'}),
+    ('node not in graph', '{"type": "dijkstra", "start": "A", "target": "Z"}',
+                                                                      {'error': 'Start or target node not in graph'}),
+    ('valid',             json.dumps({'type': 'dijkstra', 'start': start_node, 'target': target_node}),
+                                                                      {'path': shortest_path}),
+]:
+    print '\t%s' % test_name.ljust(20),
+
+    client.sendall(request + '\n')
+
+    try:
+        response = json.loads(client_responses.readline())
+    except (socket.timeout, ValueError):
+        fail('No response')
+        continue
+
+    if response != expected_response:
+        fail('Wrong response: %s' % response)
+        continue
+
+    pass_()
+
+client_responses.close()
+client.close()
+socket_server.shutdown()
+socket_server.server_close()
+query_server.close()
+shutil.rmtree(query_server_directory)
+
+print '\n%s' % 'latency_percentiles'
+
+for test_name, latencies, expected_percentiles in [
+    ('no latencies',      [],                                     {}),
+    ('one latency',       [0.004],                                {'50': 4, '90': 4, '99': 4, '99.9': 4}),
+    ('100 latencies',     [index / 1000.0 for index in xrange(100, 0, -1)],
+                                                                  {'50': 50, '90': 90, '99': 99, '99.9': 100}),
+]:
+    print '\t%s' % test_name.ljust(20),
+
+    percentiles = latency_percentiles(latencies)
+
+    if sorted(percentiles) != sorted(expected_percentiles) or \
+       any(abs(percentiles[percentile] - milliseconds) > 1e-9
+           for percentile, milliseconds in expected_percentiles.iteritems()):
+        fail('Wrong percentiles: %s' % percentiles)
+        continue
+
+    pass_()
+
+
+# k shortest paths
+
+def all_loopless_paths(graph, start_node, target_node, path=None):
+    path = path or [start_node]
+    if path[-1] == target_node:
+        yield path
+        return
+    for direct_successor in set(successor for successor, weight in graph[path[-1]]):
+        if direct_successor not in path:
+            for loopless_path in all_loopless_paths(graph, start_node, target_node, path + [direct_successor]):
+                yield loopless_path
+
+print '\n%s' % 'k_shortest_paths'
+
+for test_name, graph_types in iter(sorted(test_graphs.iteritems())):
+
+    print '\t%s' % test_name.ljust(20),
+
+    if 'negative' in test_name:
+        print 'skipped'
+        continue
+
+    graph = graph_types['weighted_directed']
+
+    start_node, target_node, shortest_path = shortest_paths[test_name][1]
+
+    expected_failure = get_expected_failure(test_name, shortest_path_djikstras_priority_queue)
+
+    try:
+        paths = k_shortest_paths(graph, start_node, target_node, 100)
+    except Exception as e:
+        verify_expected_failure(expected_failure, e)
+        continue
+    else:
+        if expected_failure:
+            fail('Failed to raise error: %s' % expected_failure[2])
+            continue
+
+    if (paths[0] if paths else None) != shortest_path:
+        fail('Not shortest path')
+        continue
+
+    expected_distances = sorted(path_distance(graph, path) for path in all_loopless_paths(graph, start_node, target_node))[:100]
+
+    if [path_distance(graph, path) for path in paths] != expected_distances:
+        fail('Not k shortest paths')
+        continue
+
+    if len(set(tuple(path) for path in paths)) != len(paths) or any(len(set(path)) != len(path) for path in paths):
+        fail('Repeated path or loop')
+        continue
+
+    pass_()
+
+
+# instrumentation
+
+reports = []
+
+# a stats object that's empty (falsy) until it counts something, so the
+# algorithms have to check for None instead of truthiness
+
+class SizedStats(Stats):
+    def __len__(self):
+        return len(self.counters)
+
+print '\n%s' % 'shortest_path_djikstras_priority_queue (stats)'
+
+for test_name, graph_types in iter(sorted(test_graphs.iteritems())):
+
+    print '\t%s' % test_name.ljust(20),
+
+    if 'negative' in test_name:
+        print 'skipped'
+        continue
+
+    graph = graph_types['weighted_directed']
+
+    start_node, target_node, shortest_path = shortest_paths[test_name][1]
+
+    expected_failure = get_expected_failure(test_name, shortest_path_djikstras_priority_queue)
+
+    stats = SizedStats(callback=lambda algorithm, counters, timers: reports.append(counters))
+
+    try:
+        if shortest_path_djikstras_priority_queue(graph, start_node, target_node, stats=stats) != shortest_path:
+            fail('Not shortest path')
+            continue
+    except Exception as e:
+        verify_expected_failure(expected_failure, e)
+        continue
+    else:
+        if expected_failure:
+            fail('Failed to raise error: %s' % expected_failure[2])
+            continue
+
+    counters = defaultdict(int, reports.pop())
+
+    if counters['heap_pops'] != counters['nodes_visited'] + counters['stale_pops']:
+        fail('Heap pops not counted')
+        continue
+
+    if counters['heap_pushes'] != counters['edges_relaxed']:
+        fail('Heap pushes not counted')
+        continue
+
+    pass_()
+
+
+# compact graph (mapped)
+
+compact_graph_directory = tempfile.mkdtemp()
+
+def build_mapped_graph(test_name, graph):
+    path = os.path.join(compact_graph_directory, '%s.graph' % test_name.replace('/', '_'))
+    save_compact_graph(build_compact_graph(graph), path)
+    return open_compact_graph(path)
+
+print '\n%s' % 'load_edge_list'
+
+def write_edge_list(test_name, graph):
+    path = os.path.join(compact_graph_directory, '%s.txt' % test_name.replace('/', '_'))
+
+    with open(path, 'w') as edge_list:
+        for node, edges in sorted(graph.iteritems()):
+            edge_list.write('%s\n' % node)
+            for edge in edges:
+                fields = (node,) + (edge if isinstance(edge, tuple) else (edge,))
+                edge_list.write('%s\n' % ' '.join(str(field) for field in fields))
+
+    return path
+
+for test_name, graph_types in iter(sorted(test_graphs.iteritems())):
+    print '\t%s' % test_name.ljust(20),
+
+    # read one line per chunk, so every chunk boundary is exercised
+    loaded_graphs = []
+    for graph_type, weighted in (('weighted_directed', True), ('unweighted_undirected', False)):
+        graph = graph_types[graph_type]
+        compact_graph = load_edge_list(write_edge_list('%s.%s' % (test_name, graph_type), graph), chunk_size=1)
+        loaded_graphs.append((graph, compact_graph, weighted))
+
+    if any((compact_graph.weights is not None) != (weighted and compact_graph.number_of_edges > 0) or
+           dict((weighted_view if weighted else unweighted_view)(compact_graph)) != graph
+           for graph, compact_graph, weighted in loaded_graphs):
+        fail('Not the same graph')
+        continue
+
+    pass_()
+
+for djikstras_algorithm in djikstras_algorithms:
+    print '\n%s (mapped)' % djikstras_algorithm.__name__
+
+    for test_name, graph_types in iter(sorted(test_graphs.iteritems())):
+
+        print '\t%s' % test_name.ljust(20),
+
+        if 'negative' in test_name:
+            print 'skipped'
+            continue
+
+        graph = weighted_view(build_mapped_graph(test_name, graph_types['weighted_directed']))
+
+        start_node, target_node, shortest_path = shortest_paths[test_name][1]
+
+        expected_failure = get_expected_failure(test_name, djikstras_algorithm)
+
+        try:
+            if djikstras_algorithm(graph, start_node, target_node) != shortest_path:
+                fail('Not shortest path')
+                continue
+        except Exception as e:
+            verify_expected_failure(expected_failure, e)
+            continue
+        else:
+            if expected_failure:
+                fail('Failed to raise error: %s' % expected_failure[2])
+                continue
+
+        pass_()
+
+print '\n%s' % 'open_compact_graph (versions)'
+
+from compact_graph import header_struct, WEIGHTED_FLAG, SORTED_LABELS_FLAG
+
+for test_name, graph_types in iter(sorted(test_graphs.iteritems())):
+
+    print '\t%s' % test_name.ljust(20),
+
+    graph = graph_types['weighted_directed']
+    path = os.path.join(compact_graph_directory, '%s.version.graph' % test_name.replace('/', '_'))
+    save_compact_graph(build_compact_graph(graph), path)
+
+    with open(path, 'rb') as input_file:
+        data = input_file.read()
+
+    magic, version, number_of_nodes, number_of_edges, flags = header_struct.unpack_from(data, 0)
+    body = data[header_struct.size:]
+
+    def open_with_header(version, flags, body):
+        with open(path, 'wb') as output_file:
+            output_file.write(header_struct.pack(magic, version, number_of_nodes, number_of_edges, flags) + body)
+        return open_compact_graph(path)
+
+    # a flag this version doesn't know, and a version from the future
+    failures = []
+    for header_version, header_flags, message in [(version, flags | 4, 'Unknown compact graph flags'),
+                                                 (version + 1, flags, 'Not a compact graph file'),
+                                                 (1, flags, 'Unknown compact graph flags')]:
+        try:
+            open_with_header(header_version, header_flags, body)
+        except Exception as e:
+            if message not in e.message:
+                failures.append(e.message)
+        else:
+            failures.append('Failed to raise error: %s' % message)
+
+    if failures:
+        fail(failures[0])
+        continue
+
+    # version 1 files are the same without the sorted labels, which come right after
+    # the offsets, targets, weights, and label offsets
+    label_offsets_end = 4 * (number_of_nodes + 1) + 4 * number_of_edges + 4 * (number_of_nodes + 1)
+    if flags & WEIGHTED_FLAG:
+        label_offsets_end += 8 * number_of_edges
+
+    version_1_body = body[:label_offsets_end] + body[label_offsets_end + 4 * number_of_nodes:]
+    version_1_graph = open_with_header(1, flags & ~SORTED_LABELS_FLAG, version_1_body)
+
+    if dict(weighted_view(version_1_graph)) != graph or version_1_graph.sorted_label_ids is not None:
+        fail('Not the same graph')
+        continue
+
+    pass_()
+
+print '\n%s' % 'node_id (mapped)'
+
+for test_name, graph_types in iter(sorted(test_graphs.iteritems())):
+
+    print '\t%s' % test_name.ljust(20),
+
+    graph = graph_types['weighted_directed']
+    mapped_graph = build_mapped_graph(test_name, graph)
+
+    if any(mapped_graph.labels[mapped_graph.node_id(node)] != node for node in graph):
+        fail('Wrong node id')
+        continue
+
+    if mapped_graph.has_node('not a node'):
+        fail('Found node not in graph')
+        continue
+
+    # the binary search shouldn't build the label dictionary
+    if mapped_graph.node_ids is not None:
+        fail('Built label dictionary')
+        continue
+
+    pass_()
+
+
+# shared graph store
+
+import multiprocessing
+
+def shortest_path_in_worker(query):
+    start_node, target_node = query
+    try:
+        return shortest_path_djikstras_priority_queue(weighted_view(shared_graph_store.worker_graph), start_node, target_node)
+    except Exception as e:
+        return e.message
+
+print '\n%s' % 'shortest_path_djikstras_priority_queue (shared)'
+
+for test_name, graph_types in iter(sorted(test_graphs.iteritems())):
+
+    print '\t%s' % test_name.ljust(20),
+
+    if 'negative' in test_name:
+        print 'skipped'
+        continue
+
+    shared_graph_name = shared_graph_store.share_compact_graph(build_compact_graph(graph_types['weighted_directed']))
+
+    start_node, target_node, shortest_path = shortest_paths[test_name][1]
+
+    expected_failure = get_expected_failure(test_name, shortest_path_djikstras_priority_queue)
+    expected_result = expected_failure[2] if expected_failure else shortest_path
+
+    pool = multiprocessing.Pool(2, initializer=shared_graph_store.attach_worker, initargs=(shared_graph_name,))
+    worker_results = pool.map(shortest_path_in_worker, [(start_node, target_node)] * 4)
+    pool.close()
+    pool.join()
+
+    shared_graph_store.unlink_shared_graph(shared_graph_name)
+
+    if any(worker_result != expected_result for worker_result in worker_results):
+        fail('Not shortest path')
+        continue
+
+    pass_()
+
+def color_in_worker(_):
+    try:
+        return list(color_compact_graph(shared_graph_store.worker_graph))
+    except Exception as e:
+        return e.message
+
+print '\n%s' % 'color_compact_graph (shared)'
+
+for test_name, graph_types in iter(sorted(test_graphs.iteritems())):
+
+    print '\t%s' % test_name.ljust(20),
+
+    graph = graph_types['unweighted_undirected']
+    compact_graph = build_compact_graph(graph, weighted=False)
+    shared_graph_name = shared_graph_store.share_compact_graph(compact_graph)
+
+    pool = multiprocessing.Pool(2, initializer=shared_graph_store.attach_worker, initargs=(shared_graph_name,))
+    worker_results = pool.map(color_in_worker, xrange(2))
+    pool.close()
+    pool.join()
+
+    shared_graph_store.unlink_shared_graph(shared_graph_name)
+
+    expected_failure = get_expected_failure(test_name, color_graph_greedy)
+
+    if expected_failure:
+        if not all(isinstance(worker_result, str) and expected_failure[2] in worker_result
+                   for worker_result in worker_results):
+            fail('Failed to raise error: %s' % expected_failure[2])
+            continue
+        pass_()
+        continue
+
+    if any(isinstance(worker_result, str) for worker_result in worker_results):
+        fail(worker_results[0])
+        continue
+
+    d = max([len(neighbors) for neighbors in graph.itervalues()] or [0])
+    node_colors = worker_results[0]
+
+    if any(node_colors[compact_graph.node_id(node)] == node_colors[compact_graph.node_id(neighbor)]
+           for node, neighbors in graph.iteritems() for neighbor in neighbors) or \
+       max(node_colors or [1]) > d + 1:
+        fail('Not legally colored')
+        continue
+
+    pass_()
+
+
+# unweighted undirected cyclic
+
+test = 'nodes vs weight'
+add_shortest_path_tests('A', 'G', ['A', 'B', 'D', 'G'], ['A', 'C', 'E', 'F', 'G'])
+
+test = 'no directed path'
+add_shortest_path_tests('C', 'A', ['C', 'B', 'A'], None)
+
+print '\n%s' % 'shortest_path_bfs'
+
+for test_name, graph_types in iter(sorted(test_graphs.iteritems())):
+    print '\t%s' % test_name.ljust(20),
+
+    graph = graph_types['unweighted_undirected']
+
+    start_node, target_node, shortest_path = shortest_paths[test_name][1]
+
+    expected_failure = get_expected_failure(test_name, shortest_path_bfs)
+
+    try:
+        if shortest_path_bfs(graph, start_node, target_node) != shortest_path:
+            fail('Not shortest path')
+            continue
+    except Exception as e:
+        verify_expected_failure(expected_failure, e)
+        continue
+    else:
+        if expected_failure:
+            fail('Failed to raise error: %s' % expected_failure[2])
+            continue
+
+    pass_()
+
+print '\n%s' % 'shortest_paths_bfs'
+
+for test_name, graph_types in iter(sorted(test_graphs.iteritems())):
+    print '\t%s' % test_name.ljust(20),
+
+    graph = graph_types['unweighted_undirected']
+
+    start_node, target_node, shortest_path = shortest_paths[test_name][1]
+
+    expected_failure = get_expected_failure(test_name, shortest_path_bfs)
+
+    try:
+        paths = shortest_paths_bfs(graph, start_node, list(graph) + [target_node])
+        if paths[target_node] != shortest_path:
+            fail('Not shortest path')
+            continue
+    except Exception as e:
+        verify_expected_failure(expected_failure, e)
+        continue
+    else:
+        if expected_failure:
+            fail('Failed to raise error: %s' % expected_failure[2])
+            continue
+
+    if any(len(paths[node] or []) != len(shortest_path_bfs(graph, start_node, node) or []) for node in graph):
+        fail('Not shortest path')
+        continue
+
+    pass_()
+
+print '\n%s' % 'shortest_path_bfs (mapped)'
+
+for test_name, graph_types in iter(sorted(test_graphs.iteritems())):
+    print '\t%s' % test_name.ljust(20),
+
+    graph = unweighted_view(build_mapped_graph(test_name, graph_types['unweighted_undirected']))
+
+    start_node, target_node, shortest_path = shortest_paths[test_name][1]
+
+    expected_failure = get_expected_failure(test_name, shortest_path_bfs)
+
+    try:
+        if shortest_path_bfs(graph, start_node, target_node) != shortest_path:
+            fail('Not shortest path')
+            continue
+    except Exception as e:
+        verify_expected_failure(expected_failure, e)
+        continue
+    else:
+        if expected_failure:
+            fail('Failed to raise error: %s' % expected_failure[2])
+            continue
+
+    pass_()
+
+print '\n%s' % 'InternedShortestPaths.shortest_path_bfs'
+
+for test_name, graph_types in iter(sorted(test_graphs.iteritems())):
+    print '\t%s' % test_name.ljust(20),
+
+    interned_shortest_paths = InternedShortestPaths(graph_types['unweighted_undirected'])
+
+    start_node, target_node, shortest_path = shortest_paths[test_name][1]
+
+    expected_failure = get_expected_failure(test_name, shortest_path_bfs)
+
+    try:
+        interned_shortest_paths.shortest_path_bfs(target_node, start_node)
+        if interned_shortest_paths.shortest_path_bfs(start_node, target_node) != shortest_path:
+            fail('Not shortest path')
+            continue
+    except Exception as e:
+        verify_expected_failure(expected_failure, e)
+        continue
+    else:
+        if expected_failure:
+            fail('Failed to raise error: %s' % expected_failure[2])
+            continue
+
+    pass_()
+
+print '\n%s' % 'implicit_graph.shortest_path_bfs'
+
+for test_name, graph_types in iter(sorted(test_graphs.iteritems())):
+    print '\t%s' % test_name.ljust(20),
+
+    graph = graph_types['unweighted_undirected']
+
+    start_node, target_node, shortest_path = shortest_paths[test_name][1]
+
+    if implicit_graph.shortest_path_bfs(lambda node: graph.get(node, []), start_node, target_node) != shortest_path:
+        fail('Not shortest path')
+        continue
+
+    pass_()
+
+def is_path(graph, path):
+    return all(node_2 in graph[node_1] for node_1, node_2 in zip(path, path[1:]))
+
+print '\n%s' % 'PrunedLandmarkLabeling'
+
+for test_name, graph_types in iter(sorted(test_graphs.iteritems())):
+    print '\t%s' % test_name.ljust(20),
+
+    graph = graph_types['unweighted_undirected']
+
+    # query a saved and mapped copy too
+    labeling = build_pruned_landmark_labeling(graph)
+    labeling_path = os.path.join(compact_graph_directory, '%s.pll' % test_name.replace('/', '_'))
+    save_pruned_landmark_labeling(labeling, labeling_path)
+
+    start_node, target_node, shortest_path = shortest_paths[test_name][1]
+
+    expected_failure = get_expected_failure(test_name, shortest_path_bfs)
+
+    try:
+        found_shortest_paths = [labeling.shortest_path(start_node, target_node),
+                                open_pruned_landmark_labeling(labeling_path).shortest_path(start_node, target_node)]
+        distance = labeling.distance(start_node, target_node)
+    except Exception as e:
+        verify_expected_failure(expected_failure, e)
+        continue
+    else:
+        if expected_failure:
+            fail('Failed to raise error: %s' % expected_failure[2])
+            continue
+
+    # another shortest path is fine when there are multiple
+    if any((found_shortest_path is None) != (shortest_path is None) or
+           (shortest_path and (len(found_shortest_path) != len(shortest_path) or
+                               found_shortest_path[0] != start_node or found_shortest_path[-1] != target_node or
+                               not is_path(graph, found_shortest_path)))
+           for found_shortest_path in found_shortest_paths):
+        fail('Not shortest path')
+        continue
+
+    if shortest_path and distance != len(shortest_path) - 1:
+        fail('Not shortest distance')
+        continue
+
+    pass_()
+
+print '\n%s' % 'implicit_graph.GridGraph'
+
+# a grid with a wall down the middle, open only at the bottom, and no right edge
+grid = implicit_graph.GridGraph(None, 10, is_open=lambda (x, y): x != 5 or y == 9)
+
+for test_name, search, neighbors in [('bfs', implicit_graph.shortest_path_bfs, grid),
+                                     ('djikstras', implicit_graph.shortest_path_djikstras, grid.weighted_neighbors)]:
+    print '\t%s' % test_name.ljust(20),
+
+    path = search(neighbors, (0, 0), (9, 0))
+
+    # down to the gap, through it, and back up
+    if (path is None) or (len(path) != 1 + 9 + 9 + 9):
+        fail('Not shortest path')
+        continue
+
+    # the grid never ends to the right, so a search for a closed off cell has to stop
+    try:
+        search(neighbors, (0, 0), (5, 0), max_visited_nodes=1000)
+    except implicit_graph.VisitedNodeLimitError:
+        pass
+    else:
+        fail('Failed to raise error: Visited node limit reached')
+        continue
+
+    pass_()
+
+print '\n%s' % 'shortest_path_bfs_with_components'
+
+for test_name, graph_types in iter(sorted(test_graphs.iteritems())):
+    print '\t%s' % test_name.ljust(20),
+
+    graph = graph_types['unweighted_undirected']
+
+    start_node, target_node, shortest_path = shortest_paths[test_name][1]
+
+    expected_failure = get_expected_failure(test_name, shortest_path_bfs)
+
+    try:
+        if shortest_path_bfs_with_components(graph, ConnectedComponents(graph), start_node, target_node) != shortest_path:
+            fail('Not shortest path')
+            continue
+    except Exception as e:
+        verify_expected_failure(expected_failure, e)
+        continue
+    else:
+        if expected_failure:
+            fail('Failed to raise error: %s' % expected_failure[2])
+            continue
+
+    pass_()
+
+print '\n%s' % 'add_undirected_edge'
+
+for test_name, graph_types in iter(sorted(test_graphs.iteritems())):
+    print '\t%s' % test_name.ljust(20),
+
+    graph = {node: list(neighbors) for node, neighbors in graph_types['unweighted_undirected'].iteritems()}
+    connected_components = ConnectedComponents(graph)
+
+    # a new component of two nodes, added by its edge
+    add_undirected_edge(graph, connected_components, 'X', 'Y')
+
+    if connected_components.component_size('X') != 2 or \
+       any(connected_components.is_connected(node, 'X') for node in graph if node not in ('X', 'Y')):
+        fail('New component not separate')
+        continue
+
+    # join it to the first node's component
+    first_node = min(node for node in graph if node not in ('X', 'Y')) if len(graph) > 2 else 'X'
+    first_component_size = connected_components.component_size(first_node)
+
+    add_undirected_edge(graph, connected_components, first_node, 'X')
+
+    # the updated index matches one built from the changed graph
+    rebuilt_connected_components = ConnectedComponents(graph)
+
+    if any(connected_components.is_connected(a, b) != rebuilt_connected_components.is_connected(a, b)
+           for a in graph for b in graph):
+        fail('Not connected')
+        continue
+
+    if connected_components.component_size('Y') != (first_component_size + 2 if first_node != 'X' else 2):
+        fail('Wrong component size')
+        continue
+
+    if first_node != 'X' and \
+       shortest_path_bfs_with_components(graph, connected_components, first_node, 'Y') != [first_node, 'X', 'Y']:
+        fail('Not shortest path')
+        continue
+
+    pass_()
+
+print '\n%s' % 'hop_distances_multi_source_bfs'
+
+for test_name, graph_types in iter(sorted(test_graphs.iteritems())):
+    print '\t%s' % test_name.ljust(20),
+
+    graph = graph_types['unweighted_undirected']
+
+    # small batches so the graphs take more than one batch
+    nodes, distances = hop_distances_multi_source_bfs(graph, list(graph), batch_size=3)
+
+    for source_index, source in enumerate(nodes):
+        for node_index, node in enumerate(nodes):
+            shortest_path = shortest_path_bfs(graph, source, node)
+            expected_distance = 0 if source == node else (len(shortest_path) - 1 if shortest_path else None)
+
+            if distances[source_index][node_index] != expected_distance:
+                break
+        else:
+            continue
+        fail('Not shortest distance')
+        break
+    else:
+        pass_()
+
+# the sparse matrix bfs needs numpy and scipy
+try:
+    from sparse_matrix_bfs import SparseMatrixBfs
+except ImportError:
+    SparseMatrixBfs = None
+
+print '\n%s' % 'SparseMatrixBfs'
+
+for test_name, graph_types in iter(sorted(test_graphs.iteritems())):
+    print '\t%s' % test_name.ljust(20),
+
+    if SparseMatrixBfs is None:
+        print 'skipped'
+        continue
+
+    graph = graph_types['unweighted_undirected']
+
+    start_node, target_node, shortest_path = shortest_paths[test_name][1]
+
+    expected_failure = get_expected_failure(test_name, shortest_path_bfs)
+
+    try:
+        found_shortest_path = SparseMatrixBfs(graph).shortest_path_bfs(start_node, target_node)
+    except Exception as e:
+        verify_expected_failure(expected_failure, e)
+        continue
+    else:
+        if expected_failure:
+            fail('Failed to raise error: %s' % expected_failure[2])
+            continue
+
+    # another shortest path is fine when there are multiple
+    if (found_shortest_path is None) != (shortest_path is None) or \
+       (shortest_path and (len(found_shortest_path) != len(shortest_path) or
+                           found_shortest_path[0] != start_node or found_shortest_path[-1] != target_node or
+                           not is_path(graph, found_shortest_path))):
+        fail('Not shortest path')
+        continue
+
+    pass_()
+
+print '\n%s' % 'color_edge_stream'
+
+for test_name, graph_types in iter(sorted(test_graphs.iteritems())):
+    print '\t%s' % test_name.ljust(20),
+
+    graph = graph_types['unweighted_undirected']
+
+    edge_stream_path = os.path.join(compact_graph_directory, '%s.edges' % test_name.replace('/', '_'))
+    save_edge_stream(build_compact_graph(graph, weighted=False), edge_stream_path)
+
+    d = max([len(neighbors) for neighbors in graph.itervalues()] or [0])
+
+    expected_failure = get_expected_failure(test_name, color_graph_greedy)
+
+    # blocks of one edge, so every node's edges span blocks
+    try:
+        node_colors = color_edge_stream(edge_stream_path, block_size=8)
+    except Exception as e:
+        verify_expected_failure(expected_failure, e)
+        continue
+    else:
+        if expected_failure:
+            fail('Failed to raise error: %s' % expected_failure[2])
+            continue
+
+    if not is_edge_stream_legally_colored(edge_stream_path, node_colors) or max(node_colors or [1]) > d + 1:
+        fail('Not legally colored')
+        continue
+
+    pass_()
+
+shutil.rmtree(compact_graph_directory)
+
 print
 for result in ['pass', 'fail']:
     print result.ljust(6), results[result]
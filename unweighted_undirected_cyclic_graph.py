@@ -25,11 +25,14 @@ graph = {
 
 from Queue import Queue
 
-def shortest_path_bfs(graph, start_node, target_node):
+def shortest_path_bfs(graph, start_node, target_node, stats=None):
 
     if (start_node not in graph) or (target_node not in graph):
         raise Exception('Start or target node not in graph')
 
+    if stats is not None:
+        stats.start_timer('search')
+
     visited_nodes = set()
     visited_nodes_with_unvisited_neighbors = Queue()
 
@@ -43,10 +46,16 @@ def shortest_path_bfs(graph, start_node, target_node):
     while not visited_nodes_with_unvisited_neighbors.empty():
         node = visited_nodes_with_unvisited_neighbors.get()
 
+        if stats is not None:
+            stats.count('nodes_visited')
+
         # stop when we reach the target node
         if node == target_node:
             break
 
+        if stats is not None:
+            stats.count('edges_checked', len(graph[node]))
+
         for neighbor in graph[node]:
             if neighbor not in visited_nodes:
 
@@ -56,6 +65,13 @@ def shortest_path_bfs(graph, start_node, target_node):
                 visited_nodes.add(neighbor)
                 visited_nodes_with_unvisited_neighbors.put(neighbor)
 
+        if stats is not None:
+            stats.maximum('queue_max_size', visited_nodes_with_unvisited_neighbors.qsize())
+
+    if stats is not None:
+        stats.stop_timer('search')
+        stats.report('shortest_path_bfs')
+
     # if the target node doesn't have a previous node, there's no shortest path
     if not shortest_path_previous_nodes.get(target_node):
         return None
@@ -71,6 +87,61 @@ def shortest_path_bfs(graph, start_node, target_node):
     return list(reversed(reverse_shortest_path))
 
 
+# breadth first search (many target nodes)
+#
+# one search from the start node finds the shortest paths to every target node, so we stop
+# once they've all been visited instead of searching once per target node. only one thread
+# uses the queue, so we use a deque instead of the thread safe Queue
+#
+# time:   O(N+M)   one search for all the target nodes, plus the length of every path
+# space:  O(N)
+
+from collections import deque
+
+def shortest_paths_bfs(graph, start_node, target_nodes):
+
+    if (start_node not in graph) or any(target_node not in graph for target_node in target_nodes):
+        raise Exception('Start or target node not in graph')
+
+    unvisited_target_nodes = set(target_nodes)
+    unvisited_target_nodes.discard(start_node)
+
+    shortest_path_previous_nodes = {start_node: None}
+    visited_nodes_with_unvisited_neighbors = deque([start_node])
+
+    while unvisited_target_nodes and visited_nodes_with_unvisited_neighbors:
+        node = visited_nodes_with_unvisited_neighbors.popleft()
+
+        for neighbor in graph[node]:
+            if neighbor not in shortest_path_previous_nodes:
+                shortest_path_previous_nodes[neighbor] = node
+                visited_nodes_with_unvisited_neighbors.append(neighbor)
+
+                # stop when we reach the last target node
+                unvisited_target_nodes.discard(neighbor)
+
+    shortest_paths = {}
+
+    for target_node in target_nodes:
+
+        # if the target node doesn't have a previous node, there's no shortest path
+        if not shortest_path_previous_nodes.get(target_node):
+            shortest_paths[target_node] = None
+            continue
+
+        # backtrack the shortest path
+        reverse_shortest_path = []
+        current_node = target_node
+
+        while current_node:
+            reverse_shortest_path.append(current_node)
+            current_node = shortest_path_previous_nodes.get(current_node)
+
+        shortest_paths[target_node] = list(reversed(reverse_shortest_path))
+
+    return shortest_paths
+
+
 # notes:
 #
 # considering Dijkstra's, Bellman-Ford, A*
@@ -34,8 +34,9 @@ graph = {
 
 class TopologicalOrderDfs:
 
-    def __init__(self, graph):
+    def __init__(self, graph, stats=None):
         self.graph = graph
+        self.stats = stats
 
     def order_graph(self):
 
@@ -44,6 +45,9 @@ class TopologicalOrderDfs:
         self.reverse_topologically_ordered_nodes = []
         self.added_nodes = set()
 
+        if self.stats is not None:
+            self.stats.start_timer('order')
+
         # the first node might not be a predecessor of all the other
         # nodes or the graph might be disconnected, so we need to
         # iterate over all the nodes
@@ -51,10 +55,18 @@ class TopologicalOrderDfs:
             if node not in self.added_nodes:
                 self.order_node_dfs(node)
 
+        if self.stats is not None:
+            self.stats.stop_timer('order')
+            self.stats.report('TopologicalOrderDfs')
+
         return list(reversed(self.reverse_topologically_ordered_nodes))
 
     def order_node_dfs(self, node):
 
+        if self.stats is not None:
+            self.stats.count('nodes_visited')
+            self.stats.count('edges_checked', len(self.graph[node]))
+
         # recursively visit direct successors
         for direct_successor, edge_weight in self.graph[node]:
             if direct_successor not in self.added_nodes:
@@ -76,7 +88,10 @@ class TopologicalOrderDfs:
 # space:  O(N)     the output and dictionary holding the numbers of incoming edges use N space
 #                  and the set of nodes with no incoming edges uses N space in the worst case
 
-def topological_order_kahns(graph):
+def topological_order_kahns(graph, stats=None):
+
+    if stats is not None:
+        stats.start_timer('order')
 
     topologically_ordered_nodes = []
 
@@ -102,6 +117,10 @@ def topological_order_kahns(graph):
 
         topologically_ordered_nodes.append(node_with_no_incoming_edges)
 
+        if stats is not None:
+            stats.count('nodes_visited')
+            stats.count('edges_checked', len(graph[node_with_no_incoming_edges]))
+
         # since we added the node, decrement the number of incoming edges for
         # all the node's direct successors
         for direct_successor, edge_weight in graph[node_with_no_incoming_edges]:
@@ -111,6 +130,10 @@ def topological_order_kahns(graph):
             if node_to_number_of_incoming_edges[direct_successor] == 0:
                 nodes_with_no_incoming_edges.add(direct_successor)
 
+    if stats is not None:
+        stats.stop_timer('order')
+        stats.report('topological_order_kahns')
+
     return topologically_ordered_nodes
 
 
@@ -127,7 +150,7 @@ def topological_order_kahns(graph):
 
 from itertools import islice
 
-def shortest_path(graph, topologically_ordered_nodes, start_node, target_node):
+def shortest_path(graph, topologically_ordered_nodes, start_node, target_node, stats=None):
 
     # track the shortest distance to each node (we use infinity to mean we haven't found
     # a path yet because we can compare infinity with any distance and it will be longer)
@@ -144,9 +167,16 @@ def shortest_path(graph, topologically_ordered_nodes, start_node, target_node):
     except ValueError:
         raise Exception('Start or target node not in graph')
 
+    if stats is not None:
+        stats.start_timer('search')
+
     # traverse the topologically ordered nodes from the start node to the target node
     for current_node in islice(topologically_ordered_nodes, start_node_index, target_node_index):
 
+        if stats is not None:
+            stats.count('nodes_visited')
+            stats.count('edges_checked', len(graph[current_node]))
+
         for direct_successor, edge_weight in graph[current_node]:
 
             # did we find a new shortest path to the direct successor?
@@ -159,6 +189,13 @@ def shortest_path(graph, topologically_ordered_nodes, start_node, target_node):
                 shortest_path_distances[direct_successor] = distance_from_current_node
                 shortest_path_direct_predecessors[direct_successor] = current_node
 
+                if stats is not None:
+                    stats.count('edges_relaxed')
+
+    if stats is not None:
+        stats.stop_timer('search')
+        stats.report('shortest_path')
+
     # if the target node doesn't have a previous node, there's no shortest path
     if not shortest_path_direct_predecessors.get(target_node):
         return None
@@ -174,6 +211,62 @@ def shortest_path(graph, topologically_ordered_nodes, start_node, target_node):
     return list(reversed(reverse_shortest_path))
 
 
+# shortest path (many target nodes)
+#
+# traverse the topologically ordered nodes once, from the start node to the last target
+# node in the ordering, and backtrack a path to every target node
+#
+# time:   O(N+M)   one traversal for all the target nodes, plus the length of every path
+# space:  O(N)
+
+def shortest_paths(graph, topologically_ordered_nodes, start_node, target_nodes):
+
+    node_indexes = {node: index for index, node in enumerate(topologically_ordered_nodes)}
+
+    if (start_node not in node_indexes) or any(target_node not in node_indexes for target_node in target_nodes):
+        raise Exception('Start or target node not in graph')
+
+    shortest_path_distances = {start_node: 0}
+    shortest_path_direct_predecessors = {}
+
+    last_index = max([node_indexes[target_node] for target_node in target_nodes] or [0])
+
+    for current_node in islice(topologically_ordered_nodes, node_indexes[start_node], last_index):
+
+        # nodes the start node can't reach can't give shorter paths
+        if current_node not in shortest_path_distances:
+            continue
+
+        for direct_successor, edge_weight in graph[current_node]:
+
+            distance_from_current_node = shortest_path_distances[current_node] + edge_weight
+
+            if distance_from_current_node < shortest_path_distances.get(direct_successor, float('inf')):
+                shortest_path_distances[direct_successor] = distance_from_current_node
+                shortest_path_direct_predecessors[direct_successor] = current_node
+
+    paths = {}
+
+    for target_node in target_nodes:
+
+        # if the target node doesn't have a previous node, there's no shortest path
+        if not shortest_path_direct_predecessors.get(target_node):
+            paths[target_node] = None
+            continue
+
+        # backtrack the shortest path
+        reverse_shortest_path = []
+        current_node = target_node
+
+        while current_node:
+            reverse_shortest_path.append(current_node)
+            current_node = shortest_path_direct_predecessors.get(current_node)
+
+        paths[target_node] = list(reversed(reverse_shortest_path))
+
+    return paths
+
+
 # notes:
 #
 # considering Dijkstra's, Bellman-Ford, A*
@@ -27,7 +27,7 @@ graph = {
 # space:  O(N)         the unvisited nodes set holds all the nodes, and in the worst case
 #                      the shortest path dictionaries and list hold all the nodes
 
-def shortest_path_djikstras(graph, start_node, target_node):
+def shortest_path_djikstras(graph, start_node, target_node, stats=None):
 
     if (start_node not in graph) or (target_node not in graph):
         raise Exception('Start or target node not in graph')
@@ -43,15 +43,26 @@ def shortest_path_djikstras(graph, start_node, target_node):
 
     unvisited_nodes = set(graph)
 
+    if stats is not None:
+        stats.start_timer('search')
+
     while len(unvisited_nodes):
 
         # get the unvisited node with the shortest distance
         current_node = min(unvisited_nodes, key=lambda node: shortest_path_distances[node])
 
+        if stats is not None:
+            stats.count('min_scans')
+            stats.count('min_scan_nodes', len(unvisited_nodes))
+            stats.count('nodes_visited')
+
         # stop when we reach the target node
         if current_node == target_node:
             break
 
+        if stats is not None:
+            stats.count('edges_checked', len(graph[current_node]))
+
         for direct_successor, edge_weight in graph[current_node]:
 
             # did we find a new shortest path to the direct successor?
@@ -64,8 +75,15 @@ def shortest_path_djikstras(graph, start_node, target_node):
                 shortest_path_distances[direct_successor] = distance_from_current_node
                 shortest_path_direct_predecessors[direct_successor] = current_node
 
+                if stats is not None:
+                    stats.count('edges_relaxed')
+
         unvisited_nodes.remove(current_node)
 
+    if stats is not None:
+        stats.stop_timer('search')
+        stats.report('shortest_path_djikstras')
+
     # if the target node doesn't have a previous node, there's no shortest path
     if not shortest_path_direct_predecessors.get(target_node):
         return None
@@ -99,7 +117,7 @@ def shortest_path_djikstras(graph, start_node, target_node):
 
 import heapq
 
-def shortest_path_djikstras_priority_queue(graph, start_node, target_node):
+def shortest_path_djikstras_priority_queue(graph, start_node, target_node, stats=None):
 
     if (start_node not in graph) or (target_node not in graph):
         raise Exception('Start or target node not in graph')
@@ -113,11 +131,19 @@ def shortest_path_djikstras_priority_queue(graph, start_node, target_node):
     # can build the shortest path by backtracking from the target node
     shortest_path_direct_predecessors = {}
 
+    if stats is not None:
+        stats.start_timer('heapify')
+
     # set up a priority queue (binary heap) of the nodes
     # with the distance to the node as the key
     priority_queue = [(shortest_path_distances[node], node) for node in graph]
     heapq.heapify(priority_queue)
 
+    if stats is not None:
+        stats.stop_timer('heapify')
+        stats.maximum('heap_max_size', len(priority_queue))
+        stats.start_timer('search')
+
     # in Python's heapq, updating or deleting entries takes O(N) not O(logN) time.
     # we handle this limitation in Python's heap implementation by adding new
     # (distance, node) pairs instead of updating pairs. so we track the nodes we
@@ -128,14 +154,25 @@ def shortest_path_djikstras_priority_queue(graph, start_node, target_node):
 
         current_node_distance, current_node = heapq.heappop(priority_queue)
 
+        if stats is not None:
+            stats.count('heap_pops')
+
         # only visit a node once, at its shortest distance
         if current_node in visited_nodes:
+            if stats is not None:
+                stats.count('stale_pops')
             continue
 
+        if stats is not None:
+            stats.count('nodes_visited')
+
         # stop when we reach the target node
         if current_node == target_node:
             break
 
+        if stats is not None:
+            stats.count('edges_checked', len(graph[current_node]))
+
         for direct_successor, edge_weight in graph[current_node]:
 
             # did we find a new shortest path to the direct successor?
@@ -151,8 +188,284 @@ def shortest_path_djikstras_priority_queue(graph, start_node, target_node):
                 # add the new distance to the priority queue
                 heapq.heappush(priority_queue, (distance_from_current_node, direct_successor))
 
+                if stats is not None:
+                    stats.count('edges_relaxed')
+                    stats.count('heap_pushes')
+                    stats.maximum('heap_max_size', len(priority_queue))
+
         visited_nodes.add(current_node)
 
+    if stats is not None:
+        stats.stop_timer('search')
+        stats.report('shortest_path_djikstras_priority_queue')
+
+    # if the target node doesn't have a previous node, there's no shortest path
+    if not shortest_path_direct_predecessors.get(target_node):
+        return None
+
+    # backtrack the shortest path
+    reverse_shortest_path = []
+    current_node = target_node
+
+    while current_node:
+        reverse_shortest_path.append(current_node)
+        current_node = shortest_path_direct_predecessors.get(current_node)
+
+    return list(reversed(reverse_shortest_path))
+
+
+# Dijkstra's algorithm (lazy)
+#
+# yield each node as it's visited, with its shortest distance and the previous node in its
+# shortest path. nodes are visited in order of distance, so callers can stop after the
+# first k nodes they're looking for (nearest facilities) or once the distance passes a
+# radius (isochrones). the search only runs as far as the caller reads
+#
+# nodes are only pushed to the priority queue when they're discovered, so the first nodes
+# come back without heapifying the whole graph. each node is yielded before its edges are
+# relaxed, so a caller that stops at a node never pays for expanding it. stats are
+# reported when the search runs out of nodes or when the caller closes the generator
+#
+# time:   O((N+M)logN)   for the whole graph, but only for the nodes and edges within the
+#                        last distance read
+# space:  O(N+M)         the dictionaries and visited set hold every discovered node, and
+#                        the heap holds a (distance, node) pair for every shorter distance
+
+def settled_nodes_djikstras(graph, start_node, stats=None):
+
+    if start_node not in graph:
+        raise Exception('Start node not in graph')
+
+    # only discovered nodes have a distance or previous node
+    shortest_path_distances = {start_node: 0}
+    shortest_path_direct_predecessors = {start_node: None}
+
+    priority_queue = [(0, start_node)]
+    visited_nodes = set()
+
+    try:
+        while len(priority_queue):
+
+            current_node_distance, current_node = heapq.heappop(priority_queue)
+
+            if stats is not None:
+                stats.count('heap_pops')
+
+            # only visit a node once, at its shortest distance
+            if current_node in visited_nodes:
+                if stats is not None:
+                    stats.count('stale_pops')
+                continue
+
+            visited_nodes.add(current_node)
+
+            if stats is not None:
+                stats.count('nodes_visited')
+
+            # the node's distance is final, so yield it before doing any work for its successors
+            yield current_node, current_node_distance, shortest_path_direct_predecessors[current_node]
+
+            if stats is not None:
+                stats.count('edges_checked', len(graph[current_node]))
+
+            for direct_successor, edge_weight in graph[current_node]:
+
+                # did we find a new shortest path to the direct successor?
+                distance_from_current_node = current_node_distance + edge_weight
+
+                if distance_from_current_node < shortest_path_distances.get(direct_successor, float('inf')):
+
+                    # update the direct successor's shortest path
+                    shortest_path_distances[direct_successor] = distance_from_current_node
+                    shortest_path_direct_predecessors[direct_successor] = current_node
+
+                    heapq.heappush(priority_queue, (distance_from_current_node, direct_successor))
+
+                    if stats is not None:
+                        stats.count('edges_relaxed')
+                        stats.count('heap_pushes')
+                        stats.maximum('heap_max_size', len(priority_queue))
+
+    # runs when the search is done, and when the caller stops early and the generator is
+    # closed (explicitly, or when it's garbage collected)
+    finally:
+        if stats is not None:
+            stats.report('settled_nodes_djikstras')
+
+
+# nearest nodes
+#
+# read the lazy search until k nodes that match are visited, or the distance passes the
+# max distance. returns a list of (node, distance) pairs in order of distance
+
+def nearest_nodes(graph, start_node, k=None, max_distance=None, is_match=None, stats=None):
+
+    if start_node not in graph:
+        raise Exception('Start node not in graph')
+
+    nearest = []
+
+    if (k is not None) and (k <= 0):
+        return nearest
+
+    settled_nodes = settled_nodes_djikstras(graph, start_node, stats)
+
+    for node, distance, direct_predecessor in settled_nodes:
+
+        if (max_distance is not None) and (distance > max_distance):
+            break
+
+        if (is_match is None) or is_match(node):
+            nearest.append((node, distance))
+
+            if (k is not None) and (len(nearest) == k):
+                break
+
+    # stop the search now, so stats are reported before we return
+    settled_nodes.close()
+
+    return nearest
+
+
+# Dijkstra's algorithm (many target nodes)
+#
+# read the lazy search until every target node is visited, or the distance passes the
+# max distance, so one search finds the shortest paths to all the target nodes instead of
+# one search per target node. without target nodes, return every node within the max
+# distance. returns a dictionary of node: (path, distance) pairs, with (None, None) for
+# target nodes we didn't reach
+#
+# time:   O((N+M)logN)   one search, but only for the nodes and edges within the distance
+#                        of the farthest target node (or the max distance), plus the
+#                        length of every path
+# space:  O(N+M)         the search's state, and the paths
+
+def shortest_paths_djikstras(graph, start_node, target_nodes=None, max_distance=None, stats=None):
+
+    if (start_node not in graph) or \
+       ((target_nodes is not None) and any(target_node not in graph for target_node in target_nodes)):
+        raise Exception('Start or target node not in graph')
+
+    unvisited_target_nodes = set(target_nodes) if target_nodes is not None else None
+
+    shortest_path_distances = {}
+    shortest_path_direct_predecessors = {}
+
+    settled_nodes = settled_nodes_djikstras(graph, start_node, stats)
+
+    for node, distance, direct_predecessor in settled_nodes:
+
+        if (max_distance is not None) and (distance > max_distance):
+            break
+
+        shortest_path_distances[node] = distance
+        shortest_path_direct_predecessors[node] = direct_predecessor
+
+        # stop when we reach the last target node
+        if unvisited_target_nodes is not None:
+            unvisited_target_nodes.discard(node)
+
+            if not unvisited_target_nodes:
+                break
+
+    # stop the search now, so stats are reported before we return
+    settled_nodes.close()
+
+    if target_nodes is None:
+        target_nodes = shortest_path_distances
+
+    shortest_paths = {}
+
+    for target_node in target_nodes:
+
+        if target_node not in shortest_path_distances:
+            shortest_paths[target_node] = (None, None)
+            continue
+
+        # the start node has no previous node, and no path
+        if not shortest_path_direct_predecessors[target_node]:
+            shortest_paths[target_node] = (None, shortest_path_distances[target_node])
+            continue
+
+        # backtrack the shortest path
+        reverse_shortest_path = []
+        current_node = target_node
+
+        while current_node:
+            reverse_shortest_path.append(current_node)
+            current_node = shortest_path_direct_predecessors.get(current_node)
+
+        shortest_paths[target_node] = (list(reversed(reverse_shortest_path)), shortest_path_distances[target_node])
+
+    return shortest_paths
+
+
+# Dial's algorithm (bucket queue)
+#
+# when every edge weight is a small integer, distances are integers and the unvisited nodes
+# we care about always have distances between the current distance and the current
+# distance plus the largest edge weight C. so instead of a heap we keep C+1 buckets of
+# nodes, one per distance mod C+1, and visit the buckets in order. adding a node to a
+# bucket is O(1) instead of O(logN)
+#
+# time:   O(N*C+M)   where C is the largest edge weight. we look at each bucket once per
+#                    distance, up to N*C distances, and relax every edge once
+# space:  O(N+C)     the buckets hold a node for every shorter distance found, plus C+1
+#                    bucket lists
+
+def shortest_path_dials(graph, start_node, target_node, max_edge_weight=None):
+
+    if (start_node not in graph) or (target_node not in graph):
+        raise Exception('Start or target node not in graph')
+
+    if max_edge_weight is None:
+        max_edge_weight = max([edge_weight for direct_successors in graph.itervalues()
+                               for direct_successor, edge_weight in direct_successors] or [0])
+
+    number_of_buckets = max_edge_weight + 1
+    buckets = [[] for _ in xrange(number_of_buckets)]
+
+    shortest_path_distances = {start_node: 0}
+    shortest_path_direct_predecessors = {}
+    visited_nodes = set()
+
+    buckets[0].append(start_node)
+    nodes_in_buckets = 1
+    current_distance = 0
+
+    while nodes_in_buckets:
+
+        bucket = buckets[current_distance % number_of_buckets]
+
+        if not bucket:
+            current_distance += 1
+            continue
+
+        current_node = bucket.pop()
+        nodes_in_buckets -= 1
+
+        # only visit a node once, at its shortest distance (outdated
+        # entries stay in their buckets like outdated heap entries)
+        if (current_node in visited_nodes) or (shortest_path_distances[current_node] != current_distance):
+            continue
+
+        # stop when we reach the target node
+        if current_node == target_node:
+            break
+
+        visited_nodes.add(current_node)
+
+        for direct_successor, edge_weight in graph[current_node]:
+
+            distance_from_current_node = current_distance + edge_weight
+
+            if distance_from_current_node < shortest_path_distances.get(direct_successor, float('inf')):
+                shortest_path_distances[direct_successor] = distance_from_current_node
+                shortest_path_direct_predecessors[direct_successor] = current_node
+
+                buckets[distance_from_current_node % number_of_buckets].append(direct_successor)
+                nodes_in_buckets += 1
+
     # if the target node doesn't have a previous node, there's no shortest path
     if not shortest_path_direct_predecessors.get(target_node):
         return None
@@ -172,9 +485,11 @@ def shortest_path_djikstras_priority_queue(graph, start_node, target_node):
 #
 # implementing heap for O(logN) decrease_key and O(N) space
 # fibonacci heap
-# insert nodes in priority queue as they're discovered
+# insert nodes in priority queue as they're discovered (settled_nodes_djikstras)
+# closing the lazy search early drops its dictionaries and heap
+# with both target nodes and a max distance, target nodes past the distance aren't reached
 #
-# negative edges (Bellman-Ford)
+# negative edges (Bellman-Ford, see weighted_directed_cyclic_graph_negative_edges.py)
 # considering A*
 # reverse list (or insert at beginning) operations
 # expressing M in terms of N (complete)
@@ -0,0 +1,202 @@
+# find the shortest path from a start node to a target node in
+# a weighted, directed, cyclic graph that can have negative edges
+
+
+# graphs are represented by a dictionary of (string, list) pairs where the string
+# is the node label and the list holds tuples of the node's direct successors
+# (string, int) where the string is the direct successor's label and the int is
+# the weight of the edge to the direct successor
+
+graph = {
+    'A': [('B', 7)],
+    'B': [('A', 3), ('C', -9)],
+    'C': [],
+}
+
+
+# negative cycles
+#
+# if the edges of a cycle add up to a negative number, going around the cycle again always
+# gives a shorter path, so nodes reachable from the cycle have no shortest path. we raise
+# an error holding the cycle instead of returning a path
+
+class NegativeCycleError(Exception):
+
+    def __init__(self, cycle):
+        Exception.__init__(self, 'Negative cycle: %s' % ' -> '.join(cycle + cycle[:1]))
+        self.cycle = cycle
+
+
+# Bellman-Ford (queue based, SPFA)
+#
+# Bellman-Ford relaxes every edge N-1 times. most of those relaxations can't change anything
+# because the distance to the edge's node didn't change in the last round, so we keep a
+# queue of nodes whose distance changed and only relax their outgoing edges. the search
+# ends as soon as the queue is empty
+#
+# a shortest path has at most N-1 edges, so if a node's shortest path so far has N edges it
+# must go around a negative cycle. we backtrack from that node to find the cycle in the
+# previous nodes
+#
+# time:   O(NM)   where N is the number of nodes and M is the number of edges. every node
+#                 can be queued N times, but on most graphs it's closer to O(M)
+# space:  O(N)    the dictionaries, the queue, and the set of queued nodes hold every node
+#                 in the worst case
+
+from collections import deque
+
+def shortest_path_spfa(graph, start_node, target_node):
+
+    if (start_node not in graph) or (target_node not in graph):
+        raise Exception('Start or target node not in graph')
+
+    shortest_path_distances, shortest_path_direct_predecessors = shortest_path_distances_spfa(graph, [start_node])
+
+    # if the target node doesn't have a previous node, there's no shortest path
+    if not shortest_path_direct_predecessors.get(target_node):
+        return None
+
+    # backtrack the shortest path
+    reverse_shortest_path = []
+    current_node = target_node
+
+    while current_node:
+        reverse_shortest_path.append(current_node)
+        current_node = shortest_path_direct_predecessors.get(current_node)
+
+    return list(reversed(reverse_shortest_path))
+
+
+# returns the shortest distance to every node reachable from the start nodes, and the
+# previous node in each node's shortest path. starting from every node at once finds the
+# distances from a virtual node with an edge of weight 0 to every node, which is how
+# Johnson's algorithm reweights the graph
+
+def shortest_path_distances_spfa(graph, start_nodes):
+
+    shortest_path_distances = {node: 0 for node in start_nodes}
+    shortest_path_direct_predecessors = {}
+
+    # the number of edges in each node's shortest path so far
+    shortest_path_lengths = {node: 0 for node in start_nodes}
+
+    nodes_with_changed_distances = deque(start_nodes)
+    queued_nodes = set(start_nodes)
+
+    while len(nodes_with_changed_distances):
+
+        current_node = nodes_with_changed_distances.popleft()
+        queued_nodes.remove(current_node)
+
+        for direct_successor, edge_weight in graph[current_node]:
+
+            # did we find a new shortest path to the direct successor?
+            shortest_distance_so_far   = shortest_path_distances.get(direct_successor, float('inf'))
+            distance_from_current_node = shortest_path_distances[current_node] + edge_weight
+
+            if distance_from_current_node < shortest_distance_so_far:
+
+                shortest_path_distances[direct_successor] = distance_from_current_node
+                shortest_path_direct_predecessors[direct_successor] = current_node
+                shortest_path_lengths[direct_successor] = shortest_path_lengths[current_node] + 1
+
+                if shortest_path_lengths[direct_successor] >= len(graph):
+                    cycle = find_cycle(shortest_path_direct_predecessors, direct_successor)
+
+                    # the previous nodes can still lead back to a start node while
+                    # they catch up with the cycle, so keep searching until they don't
+                    if cycle:
+                        raise NegativeCycleError(cycle)
+
+                if direct_successor not in queued_nodes:
+                    nodes_with_changed_distances.append(direct_successor)
+                    queued_nodes.add(direct_successor)
+
+    return shortest_path_distances, shortest_path_direct_predecessors
+
+
+def find_cycle(shortest_path_direct_predecessors, node):
+
+    # backtrack until we see a node twice (it's on the cycle)
+    # or reach a node with no previous node (there's no cycle)
+    backtracked_nodes = set()
+
+    while node not in backtracked_nodes:
+        backtracked_nodes.add(node)
+        node = shortest_path_direct_predecessors.get(node)
+
+        if node is None:
+            return None
+
+    reverse_cycle = [node]
+    current_node = shortest_path_direct_predecessors[node]
+
+    while current_node != node:
+        reverse_cycle.append(current_node)
+        current_node = shortest_path_direct_predecessors[current_node]
+
+    return list(reversed(reverse_cycle))
+
+
+# Johnson's algorithm
+#
+# give every node a potential h (its shortest distance from a virtual node with an edge of
+# weight 0 to every node, found with Bellman-Ford once) and change every edge's weight from
+# w(u, v) to w(u, v) + h(u) - h(v). the new weights are never negative, and every path
+# from s to t changes by the same h(s) - h(t), so shortest paths stay the same and we can
+# use Dijkstra's algorithm from every start node
+#
+# time:   O(NM)              to reweight the graph once
+#         O((N+M)logN)       per shortest path, instead of O(NM)
+# space:  O(N+M)             the reweighted graph holds every edge and the potentials
+#                            hold every node
+
+from weighted_directed_cyclic_graph import shortest_path_djikstras_priority_queue, settled_nodes_djikstras
+
+class JohnsonsShortestPaths:
+
+    def __init__(self, graph):
+        self.graph = graph
+
+        # raises a NegativeCycleError if the graph has any negative cycle
+        self.potentials, _ = shortest_path_distances_spfa(graph, list(graph))
+
+        self.reweighted_graph = {
+            node: [(direct_successor, edge_weight + self.potentials[node] - self.potentials[direct_successor])
+                   for direct_successor, edge_weight in direct_successors]
+            for node, direct_successors in graph.iteritems()
+        }
+
+    def shortest_path(self, start_node, target_node):
+        return shortest_path_djikstras_priority_queue(self.reweighted_graph, start_node, target_node)
+
+    # shortest distances from the start node to every node it can reach, in the
+    # original weights
+
+    def shortest_distances(self, start_node):
+        return {
+            node: distance - self.potentials[start_node] + self.potentials[node]
+            for node, distance, direct_predecessor in settled_nodes_djikstras(self.reweighted_graph, start_node)
+        }
+
+    def all_pairs_shortest_distances(self):
+        return {start_node: self.shortest_distances(start_node) for start_node in self.graph}
+
+
+# notes:
+#
+# a negative cycle that can't reach the target node still raises an error
+# Johnson's reweighting raises an error for a negative cycle anywhere in the graph
+# negative loops are negative cycles with one node
+# SPFA is O(NM) in the worst case, the same as Bellman-Ford
+# smallest label first / large label last queue orders
+#
+# edge cases
+#     less than 2 nodes in graph
+#     start node and target node are the same
+#     start node or target node aren't in graph
+#     negative loop
+#     negative cycle (reachable and unreachable from the start node)
+#     multiple edges
+#     no path (disconnected or wrong directions)
+#     edges with weight 0